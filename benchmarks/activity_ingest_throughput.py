@@ -0,0 +1,79 @@
+"""
+Activity ingest throughput: one insert_one per event vs BufferedActivityWriter
+batching events into insert_many(ordered=False).
+
+The database is simulated: every write call sleeps --round-trip-ms, plus
+--per-event-us for each document it carries. Throughput is measured from the
+first submit until every event has been written.
+
+    python -m benchmarks.activity_ingest_throughput --events 200000
+"""
+import argparse
+import time
+
+from src.ingestion.activity_writer import BufferedActivityWriter
+
+
+def make_writer(round_trip, per_event):
+    def write(activities):
+        time.sleep(round_trip + per_event * len(activities))
+    return write
+
+
+def make_events(num_events):
+    return [
+        {"user_id": f"U{i % 5000:08d}", "product_id": f"P{i % 20000:08d}", "action_type": "VIEW",
+         "timestamp": "2025-01-01T00:00:00"}
+        for i in range(num_events)
+    ]
+
+
+def direct(events, write):
+    start = time.perf_counter()
+    for event in events:
+        write([event])
+    return len(events) / (time.perf_counter() - start)
+
+
+def buffered(events, write, flush_size):
+    writer = BufferedActivityWriter(write, max_events=len(events), flush_size=flush_size)
+    writer.start()
+
+    start = time.perf_counter()
+    for event in events:
+        writer.submit(event)
+    submit_seconds = time.perf_counter() - start
+    writer.stop()
+    total_seconds = time.perf_counter() - start
+
+    return len(events) / total_seconds, submit_seconds / len(events) * 1e6, writer.metrics()
+
+
+def run(num_events, round_trip_ms, per_event_us, flush_size):
+    write = make_writer(round_trip_ms / 1000.0, per_event_us / 1e6)
+
+    # The per-event path is slow; time a sample and extrapolate the rate
+    direct_rate = direct(make_events(min(num_events, 2000)), write)
+    buffered_rate, submit_us, metrics = buffered(make_events(num_events), write, flush_size)
+
+    print(f"{num_events} events, {round_trip_ms} ms round trip + {per_event_us} us/event simulated")
+    print(f"{'mode':>10} {'events/s':>12}")
+    print(f"{'direct':>10} {direct_rate:>12,.0f}")
+    print(f"{'buffered':>10} {buffered_rate:>12,.0f}")
+    print(f"submit cost {submit_us:.2f} us/event, {metrics['flushes']} flushes, "
+          f"avg flush {metrics['avg_flush_latency_ms']:.2f} ms, dropped {metrics['dropped']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--round-trip-ms", type=float, default=0.5)
+    parser.add_argument("--per-event-us", type=float, default=2.0)
+    parser.add_argument("--flush-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    run(args.events, args.round_trip_ms, args.per_event_us, args.flush_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+API latency under concurrent load: blocking pymongo calls on the event loop
+(the old routes) vs the async data layer that runs them on a bounded executor.
+
+GET /users is served in-process through httpx's ASGI transport by
+--clients concurrent clients sending at a combined --rate requests/s
+(open loop). Latency is measured from each request's scheduled send time, so
+time spent waiting for a blocked event loop is counted. The database call is
+simulated with a --query-ms sleep. In "blocking" mode the route awaits a
+coroutine that makes the synchronous call directly, which reproduces the
+previous behaviour.
+
+    python -m benchmarks.api_concurrency_latency --clients 500 --rate 400 --query-ms 5
+"""
+import argparse
+import asyncio
+import time
+from unittest.mock import patch
+
+import httpx
+import numpy as np
+
+from src.api.app import app
+from src.database import async_handler
+
+
+def make_query(query_seconds):
+    def get_all_users():
+        time.sleep(query_seconds)
+        return [f"U{i:08d}" for i in range(100)]
+    return get_all_users
+
+
+async def client_loop(client, client_index, num_clients, num_requests, rate, start, latencies):
+    for k in range(num_requests):
+        scheduled = start + (client_index + k * num_clients) / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        response = await client.get("/users")
+        latencies.append(time.perf_counter() - scheduled)
+        response.raise_for_status()
+
+
+async def measure(num_clients, requests_per_client, rate):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, i, num_clients, requests_per_client, rate, start, latencies)
+            for i in range(num_clients)
+        ))
+        elapsed = time.perf_counter() - start
+    return np.array(latencies) * 1000, len(latencies) / elapsed
+
+
+def run(num_clients, requests_per_client, rate, query_ms):
+    query = make_query(query_ms / 1000.0)
+
+    async def blocking_get_all_users():
+        return query()
+
+    results = {}
+    with patch("src.database.storage.get_all_users", query):
+        with patch("src.api.routes.get_all_users", blocking_get_all_users):
+            results["blocking"] = asyncio.run(measure(num_clients, requests_per_client, rate))
+        results["executor"] = asyncio.run(measure(num_clients, requests_per_client, rate))
+    async_handler.shutdown_executor()
+
+    print(f"{num_clients} concurrent clients x {requests_per_client} requests at {rate} req/s, "
+          f"{query_ms} ms simulated query, {async_handler.DB_EXECUTOR_WORKERS} executor threads")
+    print(f"{'mode':>9} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    for name, (latencies, throughput) in results.items():
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{name:>9} {p50:>9.1f} {p99:>9.1f} {throughput:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=400.0)
+    parser.add_argument("--query-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    run(args.clients, args.requests, args.rate, args.query_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Recommendation throughput vs number of worker processes sharing one
+memory-mapped model snapshot (what `API_WORKERS=N` runs under uvicorn).
+
+A snapshot is trained once and published to a temporary MODEL_DIR; each worker
+process loads it with HybridRecommender.load (no training) and serves
+recommend() calls in a closed loop for a fixed duration. HTTP overhead is
+left out so the numbers isolate the GIL-bound scoring path.
+
+    python -m benchmarks.api_worker_throughput --workers 1 2 4
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.synthetic import make_products, make_activities, patched_data_layer
+from src.models.hybrid import HybridRecommender
+from src.models.snapshots import current_snapshot, publish_snapshot
+
+
+def serve(model_dir, products, activities, user_ids, top_k, duration, start_barrier, results):
+    with patched_data_layer(products, activities), contextlib.redirect_stdout(io.StringIO()):
+        recommender = HybridRecommender.load(current_snapshot(model_dir)[1], use_cache=False)
+        rng = random.Random(os.getpid())
+
+        start_barrier.wait()
+        served = 0
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            recommender.recommend(rng.choice(user_ids), top_k=top_k)
+            served += 1
+
+    results.put(served)
+
+
+def measure(num_workers, model_dir, products, activities, user_ids, top_k, duration):
+    start_barrier = multiprocessing.Barrier(num_workers)
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=serve,
+            args=(model_dir, products, activities, user_ids, top_k, duration, start_barrier, results)
+        )
+        for _ in range(num_workers)
+    ]
+
+    for worker in workers:
+        worker.start()
+    served = sum(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+
+    return served / duration
+
+
+def run(num_products, num_users, worker_counts, duration, top_k):
+    products = make_products(num_products)
+    activities = make_activities(num_users, products)
+    user_ids = sorted({a["user_id"] for a in activities})
+    model_dir = tempfile.mkdtemp()
+
+    try:
+        with patched_data_layer(products, activities), contextlib.redirect_stdout(io.StringIO()):
+            recommender = HybridRecommender(use_cache=False)
+            recommender.train()
+            publish_snapshot(model_dir, recommender)
+
+        print(f"{num_products} products, {num_users} users, {duration}s per run, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+        baseline = None
+        for num_workers in worker_counts:
+            throughput = measure(num_workers, model_dir, products, activities, user_ids, top_k, duration)
+            baseline = baseline or throughput
+            print(f"{num_workers:>8} {throughput:>10.1f} {throughput / baseline:>7.2f}x")
+    finally:
+        shutil.rmtree(model_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    run(args.products, args.users, args.workers, args.duration, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
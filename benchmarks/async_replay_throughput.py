@@ -0,0 +1,69 @@
+"""
+Throughput of AsyncStreamingService and how responsive the event loop stays.
+
+Replays synthetic activities as fast as possible into the in-memory storage
+backend with different shard counts. A heartbeat coroutine ticks every 10 ms
+on the same loop throughout; its worst delay shows how much the replay would
+hold up API requests served by that loop.
+
+    python -m benchmarks.async_replay_throughput --events 200000 --shards 1 4 8
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from benchmarks.replay_throughput import make_activities
+from src.database import storage
+from src.database.async_handler import shutdown_executor
+from src.database.backends import InMemoryBackend
+from src.ingestion.stream_handler import StreamingService
+from src.ingestion.async_stream_handler import AsyncStreamingService
+
+
+async def heartbeat(delays, interval=0.01):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        delays.append(time.perf_counter() - start - interval)
+
+
+async def replay(activities, shards, speed_factor):
+    source = StreamingService(load_mode="memory")
+    source.activities = activities
+    service = AsyncStreamingService(source, shards=shards)
+
+    delays = []
+    ticker = asyncio.create_task(heartbeat(delays))
+    await service.start(speed_factor=speed_factor)
+    await service.wait()
+    ticker.cancel()
+    return service.status(), max(delays, default=0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--interval-ms", type=float, default=100.0, help="Simulated time between activities")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--speed-factor", type=float, default=0, help="0 = as fast as possible")
+    args = parser.parse_args()
+
+    activities = make_activities(args.events, args.interval_ms)
+
+    print(f"{'shards':>6} {'events':>8} {'ev/s':>10} {'max lag s':>10} {'loop stall ms':>14}")
+    for shards in args.shards:
+        previous = storage.set_backend(InMemoryBackend())
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                status, stall = asyncio.run(replay(activities, shards, args.speed_factor))
+        finally:
+            storage.set_backend(previous)
+            shutdown_executor()
+        print(f"{shards:>6} {status['events']:>8} {status['events_per_second']:>10.0f} "
+              f"{status['max_lag_seconds']:>10.2f} {stall * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Training time of implicit ALS vs the truncated-svds path on generated
+interaction data at multiples of the simulator's default size
+(NUM_USERS x NUM_PRODUCTS with ~SIMULATION_DAYS * AVG_ACTIONS_PER_USER_PER_DAY
+actions per user).
+
+    python -m benchmarks.collab_als_vs_svd --scales 10 100 1000
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from src.models.als import ImplicitALSRecommender
+from src.models.collaborative import CollaborativeFilteringRecommender
+from src.config import NUM_USERS, NUM_PRODUCTS, SIMULATION_DAYS, AVG_ACTIONS_PER_USER_PER_DAY
+
+
+def make_interactions(scale, seed=42):
+    """Poisson actions per user over Zipf-like product popularity; BUY=5, VIEW=1."""
+    rng = np.random.default_rng(seed)
+    num_users, num_products = NUM_USERS * scale, NUM_PRODUCTS * scale
+    
+    actions = rng.poisson(SIMULATION_DAYS * AVG_ACTIONS_PER_USER_PER_DAY, size=num_users)
+    rows = np.repeat(np.arange(num_users, dtype=np.int32), actions)
+    popularity = 1.0 / np.arange(1, num_products + 1) ** 0.8
+    cols = rng.choice(num_products, size=rows.size, p=popularity / popularity.sum()).astype(np.int32)
+    data = np.where(rng.random(rows.size) < 0.2, 5.0, 1.0)
+    
+    return csr_matrix((data, (rows, cols)), shape=(num_users, num_products))
+
+
+def time_fit(recommender, matrix):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        recommender._fit(matrix)
+    return time.perf_counter() - start
+
+
+def run(scales, factors, iterations, threads):
+    print(f"{'scale':>6} {'users':>9} {'products':>9} {'nnz':>11} | {'svds s':>8} {'us/nnz':>7} | {'als s':>8} {'us/nnz':>7}")
+    for scale in scales:
+        matrix = make_interactions(scale)
+        
+        svd_s = time_fit(CollaborativeFilteringRecommender(num_factors=factors), matrix)
+        als_s = time_fit(ImplicitALSRecommender(num_factors=factors, iterations=iterations, num_threads=threads), matrix)
+        
+        per_nnz = 1e6 / matrix.nnz
+        print(f"{scale:>6} {matrix.shape[0]:>9} {matrix.shape[1]:>9} {matrix.nnz:>11} | "
+              f"{svd_s:>8.2f} {svd_s * per_nnz:>7.3f} | {als_s:>8.2f} {als_s * per_nnz:>7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="*", type=int, default=[10, 100])
+    parser.add_argument("--factors", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=15)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+    
+    run(args.scales, args.factors, args.iterations, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Peak-memory benchmark for collaborative filtering training.
+
+Compares the dense SVD path (toarray + svds) with the sparse path that only
+centers the stored entries, on synthetic user-item matrices of growing size.
+
+    python -m benchmarks.collab_training_memory
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from src.models.collaborative import CollaborativeFilteringRecommender
+
+DEFAULT_SIZES = [(500, 1000), (1000, 4000), (2000, 8000), (4000, 16000)]
+
+
+def make_interactions(num_users, num_products, per_user=20, seed=42):
+    rng = np.random.default_rng(seed)
+    rows = np.repeat(np.arange(num_users), per_user)
+    cols = rng.integers(0, num_products, size=rows.size)
+    data = np.where(rng.random(rows.size) < 0.2, 5.0, 1.0)
+    return csr_matrix((data, (rows, cols)), shape=(num_users, num_products))
+
+
+def measure(factorize, matrix):
+    tracemalloc.start()
+    start = time.perf_counter()
+    factorize(matrix)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024), elapsed
+
+
+def run(sizes, num_factors=20, skip_dense_above=None):
+    recommender = CollaborativeFilteringRecommender(num_factors=num_factors)
+    
+    print(f"{'users':>8} {'products':>9} {'nnz':>9} | {'dense MiB':>10} {'dense s':>8} | {'sparse MiB':>10} {'sparse s':>8}")
+    for num_users, num_products in sizes:
+        matrix = make_interactions(num_users, num_products)
+        recommender.global_mean = matrix.data.mean()
+        
+        sparse_mib, sparse_s = measure(recommender._factorize_sparse, matrix)
+        
+        if skip_dense_above and num_users * num_products > skip_dense_above:
+            dense = f"{'skipped':>10} {'-':>8}"
+        else:
+            dense_mib, dense_s = measure(recommender._factorize_dense, matrix)
+            dense = f"{dense_mib:>10.1f} {dense_s:>8.2f}"
+        
+        print(f"{num_users:>8} {num_products:>9} {matrix.nnz:>9} | {dense} | {sparse_mib:>10.1f} {sparse_s:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="*", default=None,
+                        help="Matrix sizes as USERSxPRODUCTS, e.g. 1000x5000")
+    parser.add_argument("--factors", type=int, default=20)
+    parser.add_argument("--skip-dense-above", type=int, default=200_000_000,
+                        help="Skip the dense path when users*products exceeds this")
+    args = parser.parse_args()
+    
+    sizes = DEFAULT_SIZES
+    if args.sizes:
+        sizes = [tuple(int(x) for x in size.lower().split("x")) for size in args.sizes]
+    
+    run(sizes, num_factors=args.factors, skip_dense_above=args.skip_dense_above)
+
+
+if __name__ == "__main__":
+    main()
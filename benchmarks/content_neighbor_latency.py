@@ -0,0 +1,69 @@
+"""
+Content-based recommend latency vs catalog size: exact scoring against the
+whole catalog compared with the precomputed item-to-item neighbor index.
+
+    python -m benchmarks.content_neighbor_latency --catalog-sizes 1000 5000 20000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_products
+from src.models.content_based import ContentBasedRecommender
+
+
+def time_requests(recommender, histories, top_k):
+    latencies = []
+    for history in histories:
+        recommender._get_user_product_interactions = lambda user_id, user_activity=None, history=history: history
+        start = time.perf_counter()
+        recommender.recommend("bench-user", top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def run(catalog_sizes, num_requests, history_length, num_neighbors, top_k):
+    print(f"{'products':>9} {'build s':>8} | {'exact p50 ms':>12} {'exact p99 ms':>12} | {'nbr p50 ms':>10} {'nbr p99 ms':>10}")
+    
+    for num_products in catalog_sizes:
+        products = make_products(num_products)
+        rng = random.Random(num_products)
+        histories = [
+            {p["product_id"]: rng.choice([1.0, 3.0]) for p in rng.sample(products, history_length)}
+            for _ in range(num_requests)
+        ]
+        
+        recommender = ContentBasedRecommender(retrieval="exact", num_neighbors=num_neighbors)
+        recommender.products = products
+        recommender._preprocess_products()
+        recommender.is_trained = True
+        
+        exact = time_requests(recommender, histories, top_k)
+        
+        start = time.perf_counter()
+        recommender.build_neighbor_index()
+        build_s = time.perf_counter() - start
+        recommender.retrieval = "neighbors"
+        neighbors = time_requests(recommender, histories, top_k)
+        
+        print(f"{num_products:>9} {build_s:>8.2f} | "
+              f"{np.percentile(exact, 50):>12.2f} {np.percentile(exact, 99):>12.2f} | "
+              f"{np.percentile(neighbors, 50):>10.2f} {np.percentile(neighbors, 99):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog-sizes", nargs="*", type=int, default=[1000, 5000, 20000, 50000])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--history", type=int, default=20, help="Interacted products per simulated user")
+    parser.add_argument("--neighbors", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    
+    run(args.catalog_sizes, args.requests, args.history, args.neighbors, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Update throughput and recommend latency of the co-occurrence model.
+
+Builds a CoOccurrenceRecommender from synthetic activity on the in-memory
+storage backend, then replays --events more activities through
+record_activity (the path every ingested event takes) and times recommend()
+for a sample of users. Also reports how many events it takes for a freshly
+trending pair to reach the top of a user's list.
+
+    python -m benchmarks.cooccurrence_latency --users 20000 --events 200000
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks.synthetic import make_products, make_activities
+from src.database import storage
+from src.database.backends import InMemoryBackend
+from src.models.cooccurrence import CoOccurrenceRecommender
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    backend = InMemoryBackend()
+    products = make_products(args.products)
+    activities = make_activities(args.users, products)
+    # Spread over the last day, so training decays them but keeps them
+    start_time = datetime.now() - timedelta(days=1)
+    step = timedelta(days=1) / len(activities)
+    for i, activity in enumerate(activities):
+        activity["timestamp"] = (start_time + i * step).isoformat()
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend.insert_products(products)
+        backend.insert_activities(activities)
+
+    previous = storage.set_backend(backend)
+    try:
+        model = CoOccurrenceRecommender(interaction_store=None)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            model.train()
+        print(f"train from {len(activities)} activities: {time.perf_counter() - start:.2f}s, {model.stats()}")
+
+        rng = random.Random(1)
+        user_ids = backend.get_all_users()
+        product_ids = [product["product_id"] for product in products]
+        events = [
+            {"user_id": rng.choice(user_ids), "product_id": rng.choice(product_ids),
+             "action_type": "BUY" if rng.random() < 0.2 else "VIEW"}
+            for _ in range(args.events)
+        ]
+        start = time.perf_counter()
+        for event in events:
+            model.record_activity(event)
+        elapsed = time.perf_counter() - start
+        print(f"record_activity: {len(events) / elapsed:,.0f} events/s, {model.stats()}")
+
+        latencies = []
+        for user_id in rng.choices(user_ids, k=args.requests):
+            start = time.perf_counter()
+            model.recommend(user_id, top_k=args.top_k)
+            latencies.append(time.perf_counter() - start)
+        p50, p99 = np.percentile(np.array(latencies) * 1000, [50, 99])
+        print(f"recommend: p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+
+        # A new pair bought together by a handful of users
+        seed_product, trending = product_ids[0], "P-TRENDING"
+        probe = "U-PROBE"
+        model.record_activity({"user_id": probe, "product_id": seed_product, "action_type": "VIEW"})
+        for i in range(1, 101):
+            user_id = f"U-TREND{i}"
+            model.record_activity({"user_id": user_id, "product_id": seed_product, "action_type": "VIEW"})
+            model.record_activity({"user_id": user_id, "product_id": trending, "action_type": "BUY"})
+            recs = model.recommend(probe, top_k=args.top_k)
+            if recs and recs[0]["product_id"] == trending:
+                print(f"trending pair ranked first after {i} users bought it")
+                break
+        else:
+            print("trending pair not ranked first after 100 users")
+    finally:
+        storage.set_backend(previous)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+HybridRecommender latency: sequential sub-recommenders vs the concurrent mode
+that fetches user activity once and runs both scorers on a thread pool.
+
+A fixed per-query latency is injected into the activity lookup to stand in
+for the Mongo round trip.
+
+    python -m benchmarks.hybrid_latency --query-latency-ms 5
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_products, make_activities, patched_data_layer
+from src.models.hybrid import HybridRecommender
+
+
+def time_requests(recommender, user_ids, top_k):
+    latencies = []
+    for user_id in user_ids:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            recommender.recommend(user_id, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def run(num_products, num_users, num_requests, query_latency_ms, top_k):
+    products = make_products(num_products)
+    activities = make_activities(num_users, products)
+    user_ids = sorted({a["user_id"] for a in activities})
+    sample = random.Random(0).choices(user_ids, k=num_requests)
+    
+    with patched_data_layer(products, activities, query_latency=query_latency_ms / 1000.0):
+        recommender = HybridRecommender()
+        with contextlib.redirect_stdout(io.StringIO()):
+            recommender.train()
+        
+        recommender.concurrent = False
+        sequential = time_requests(recommender, sample, top_k)
+        recommender.concurrent = True
+        concurrent = time_requests(recommender, sample, top_k)
+    
+    print(f"{num_products} products, {num_users} users, {query_latency_ms} ms simulated activity query")
+    print(f"{'mode':>11} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for name, latencies in (("sequential", sequential), ("concurrent", concurrent)):
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        print(f"{name:>11} {p50:>8.2f} {p90:>8.2f} {p99:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--query-latency-ms", type=float, default=5.0)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+    
+    run(args.products, args.users, args.requests, args.query_latency_ms, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Recommendation latency with and without the in-memory interaction store.
+
+Runs HybridRecommender on the in-memory storage backend, with --query-ms
+added to every activity query to stand in for a database round trip, and
+compares per-request latency when users' interactions are read from the
+database versus from a loaded InteractionStore.
+
+    python -m benchmarks.interaction_store_latency --users 5000 --query-ms 2
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_products, make_activities
+from src.database import storage
+from src.database.backends import InMemoryBackend
+from src.models.hybrid import HybridRecommender
+from src.models.interaction_store import InteractionStore
+
+
+class SlowActivityBackend(InMemoryBackend):
+    """InMemoryBackend whose activity queries take query_seconds longer."""
+
+    def __init__(self, query_seconds):
+        super().__init__()
+        self.query_seconds = query_seconds
+        self.activity_queries = 0
+
+    def get_user_activity(self, *args, **kwargs):
+        self.activity_queries += 1
+        time.sleep(self.query_seconds)
+        return super().get_user_activity(*args, **kwargs)
+
+    def get_users_activity(self, *args, **kwargs):
+        self.activity_queries += 1
+        time.sleep(self.query_seconds)
+        return super().get_users_activity(*args, **kwargs)
+
+
+def measure(recommender, sample, top_k):
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for user_id in sample:
+            start = time.perf_counter()
+            recommender.recommend(user_id, top_k=top_k)
+            latencies.append(time.perf_counter() - start)
+    return np.array(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--query-ms", type=float, default=2.0)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    backend = SlowActivityBackend(args.query_ms / 1000)
+    products = make_products(args.products)
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend.insert_products(products)
+        backend.insert_activities(make_activities(args.users, products))
+
+    previous = storage.set_backend(backend)
+    try:
+        store = InteractionStore()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            store.load()
+        print(f"store load {time.perf_counter() - start:.2f}s: {store.stats()}")
+
+        sample = random.Random(0).choices(backend.get_all_users(), k=args.requests)
+        for label, interaction_store in (("database", InteractionStore()), ("store", store)):
+            recommender = HybridRecommender(use_cache=False, interaction_store=interaction_store)
+            with contextlib.redirect_stdout(io.StringIO()):
+                recommender.train()
+
+            backend.activity_queries = 0
+            latencies = measure(recommender, sample, args.top_k)
+            p50, p99 = np.percentile(latencies, [50, 99])
+            print(f"{label:>8}: p50 {p50:.2f} ms, p99 {p99:.2f} ms, "
+                  f"{backend.activity_queries / len(sample):.2f} activity queries/request")
+    finally:
+        storage.set_backend(previous)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+End-to-end recommendation throughput on the in-memory storage backend.
+
+Runs the full HybridRecommender pipeline (activity lookup, both scorers,
+product details, persisting results) against InMemoryBackend, so numbers are
+repeatable and free of database noise. Nothing in the data layer is mocked.
+
+    python -m benchmarks.pipeline_throughput --products 20000 --users 5000
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_products, make_activities
+from src.database import storage
+from src.database.backends import InMemoryBackend
+from src.models.hybrid import HybridRecommender
+
+
+def run(num_products, num_users, num_requests, batch_size, top_k):
+    backend = InMemoryBackend()
+    products = make_products(num_products)
+    activities = make_activities(num_users, products)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend.insert_products(products)
+        backend.insert_activities(activities)
+    load_seconds = time.perf_counter() - start
+
+    previous = storage.set_backend(backend)
+    try:
+        recommender = HybridRecommender(serve_stored=False, use_cache=False)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            recommender.train()
+        train_seconds = time.perf_counter() - start
+
+        user_ids = backend.get_all_users()
+        sample = random.Random(0).choices(user_ids, k=num_requests)
+
+        latencies = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for user_id in sample:
+                start = time.perf_counter()
+                recommender.get_formatted_recommendations(user_id, top_k=top_k)
+                latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            for offset in range(0, len(sample), batch_size):
+                batch = list(dict.fromkeys(sample[offset:offset + batch_size]))
+                recommender.get_formatted_batch_recommendations(batch, top_k=top_k)
+            batch_seconds = time.perf_counter() - start
+    finally:
+        storage.set_backend(previous)
+
+    latencies = np.array(latencies) * 1000
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"{num_products} products, {num_users} users, {len(activities)} activities")
+    print(f"load {load_seconds:.2f}s, train {train_seconds:.2f}s")
+    print(f"single-user: {len(sample) / (latencies.sum() / 1000):.0f} users/s, p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    print(f"batch of {batch_size}: {len(sample) / batch_seconds:.0f} users/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=20000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=250)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    run(args.products, args.users, args.requests, args.batch_size, args.top_k)
+
+
+if __name__ == "__main__":
+    main()
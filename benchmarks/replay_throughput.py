@@ -0,0 +1,73 @@
+"""
+Sustained replay rate of StreamingService, per-event vs batched.
+
+Replays synthetic activities spaced --interval-ms apart (simulated time)
+into the in-memory storage backend at each --speed-factor and reports the
+achieved events/s and the final and maximum lag behind simulated time. A
+speed factor of 0 is the batched as-fast-as-possible mode.
+
+    python -m benchmarks.replay_throughput --events 50000 --speed-factors 1000 100000 0
+"""
+import argparse
+import contextlib
+import io
+from datetime import datetime, timedelta
+
+from src.database import storage
+from src.database.backends import InMemoryBackend
+from src.ingestion.stream_handler import StreamingService
+
+
+def make_activities(num_events, interval_ms):
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "user_id": f"U{i % 5000:08d}",
+            "product_id": f"P{i % 20000:08d}",
+            "action_type": "VIEW",
+            "timestamp": (start + timedelta(milliseconds=i * interval_ms)).isoformat()
+        }
+        for i in range(num_events)
+    ]
+
+
+def replay(activities, speed_factor, replay_mode, max_seconds):
+    previous = storage.set_backend(InMemoryBackend())
+    try:
+        service = StreamingService(load_mode="memory")
+        service.activities = activities
+        with contextlib.redirect_stdout(io.StringIO()):
+            service.start_streaming(speed_factor=speed_factor, replay_mode=replay_mode)
+            service.stream_thread.join(timeout=max_seconds)
+            if service.streaming:
+                service.stop_streaming()
+        return service.replay_stats()
+    finally:
+        storage.set_backend(previous)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--interval-ms", type=float, default=100.0, help="Simulated time between activities")
+    parser.add_argument("--speed-factors", type=float, nargs="+", default=[1000, 100000, 0])
+    parser.add_argument("--max-seconds", type=float, default=60.0, help="Stop a replay that runs longer")
+    args = parser.parse_args()
+
+    activities = make_activities(args.events, args.interval_ms)
+    target_rate = 1000.0 / args.interval_ms
+
+    print(f"{'mode':>8} {'speed':>8} {'target ev/s':>12} {'events':>8} {'ev/s':>10} {'lag s':>8} {'max lag s':>10}")
+    for speed_factor in args.speed_factors:
+        modes = ("event", "batched") if speed_factor > 0 else ("batched",)
+        for replay_mode in modes:
+            stats = replay(activities, speed_factor, replay_mode, args.max_seconds)
+            target = f"{target_rate * speed_factor:.0f}" if speed_factor > 0 else "max"
+            lag = stats["lag_seconds"]
+            print(f"{replay_mode:>8} {speed_factor:>8.0f} {target:>12} {stats['events']:>8} "
+                  f"{stats['events_per_second']:>10.0f} {lag if lag is not None else 0:>8.2f} "
+                  f"{stats['max_lag_seconds']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Peak Python memory of activity replay in "memory" vs "incremental" load mode.
+
+Writes a synthetic activity file (JSON array or NDJSON) of increasing size,
+then replays it through StreamingService with storage writes and event
+publishing patched out, recording the tracemalloc peak for each mode.
+
+    python -m benchmarks.stream_load_memory --users 2000 5000 20000
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from unittest.mock import patch
+
+from benchmarks.synthetic import make_products, make_activities
+from src.ingestion.stream_handler import StreamingService
+
+
+def write_files(directory, num_users, ndjson):
+    products = make_products(200)
+    activities = make_activities(num_users, products)
+    activities.sort(key=lambda a: a["timestamp"])
+
+    product_file = os.path.join(directory, "products.json")
+    activity_file = os.path.join(directory, "activity.jsonl" if ndjson else "activity.json")
+    with open(product_file, "w") as f:
+        json.dump(products, f)
+    with open(activity_file, "w") as f:
+        if ndjson:
+            for activity in activities:
+                f.write(json.dumps(activity) + "\n")
+        else:
+            json.dump(activities, f)
+    return product_file, activity_file, len(activities)
+
+
+def _discard(*args, **kwargs):
+    return True
+
+
+def replay(product_file, activity_file, load_mode):
+    service = StreamingService(activity_file=activity_file, product_file=product_file, load_mode=load_mode)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    # Plain no-op stubs: a Mock would keep every call's arguments alive
+    with patch("src.ingestion.stream_handler.insert_products", new=_discard), \
+            patch("src.ingestion.stream_handler.insert_activity", new=_discard), \
+            patch("src.ingestion.stream_handler.publish_activity", new=_discard), \
+            patch("src.ingestion.stream_handler.time.sleep", new=_discard), \
+            contextlib.redirect_stdout(io.StringIO()):
+        service.load_data()
+        service.streaming = True
+        service._stream_activities(speed_factor=1e9)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[2000, 5000, 20000])
+    parser.add_argument("--ndjson", action="store_true", help="Write line-delimited JSON instead of an array")
+    args = parser.parse_args()
+
+    print(f"{'activities':>10} {'mode':>12} {'peak MB':>9} {'seconds':>8}")
+    for num_users in args.users:
+        with tempfile.TemporaryDirectory() as directory:
+            product_file, activity_file, count = write_files(directory, num_users, args.ndjson)
+            for load_mode in ("memory", "incremental"):
+                peak, seconds = replay(product_file, activity_file, load_mode)
+                print(f"{count:>10} {load_mode:>12} {peak / 2**20:>9.1f} {seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Synthetic catalog/activity generators and a patched data layer for benchmarks."""
+import random
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import numpy as np
+
+CATEGORIES = ["Electronics", "Clothing", "Home & Kitchen", "Books", "Sports",
+              "Beauty", "Toys", "Grocery", "Automotive", "Health"]
+
+
+def make_products(num_products, vocabulary_size=5000, words_per_description=25, seed=42):
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(vocabulary_size)]
+    brands = [f"Brand{i}" for i in range(200)]
+    
+    return [
+        {
+            "product_id": f"P{i:08d}",
+            "product_name": f"Product {i}",
+            "category": rng.choice(CATEGORIES),
+            "brand": rng.choice(brands),
+            "price": round(rng.uniform(9.99, 999.99), 2),
+            "description": " ".join(rng.choices(vocabulary, k=words_per_description)),
+        }
+        for i in range(num_products)
+    ]
+
+
+def make_activities(num_users, products, per_user=20, buy_rate=0.2, seed=42):
+    rng = random.Random(seed)
+    activities = []
+    for u in range(num_users):
+        user_id = f"U{u:08d}"
+        for product in rng.sample(products, min(per_user, len(products))):
+            activities.append({
+                "user_id": user_id,
+                "action_type": "BUY" if rng.random() < buy_rate else "VIEW",
+                "product_id": product["product_id"],
+                "timestamp": f"2025-01-01T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00",
+                "category": product["category"],
+                "price": product["price"],
+            })
+    return activities
+
+
+def interaction_arrays(activities, action_weights, default_weight=1.0):
+    """Same output shape as mongo_handler.load_interaction_arrays."""
+    user_index, product_index = {}, {}
+    rows, cols, data = [], [], []
+    for activity in activities:
+        rows.append(user_index.setdefault(activity["user_id"], len(user_index)))
+        cols.append(product_index.setdefault(activity["product_id"], len(product_index)))
+        data.append(action_weights.get(activity["action_type"], default_weight))
+    return (list(user_index), list(product_index),
+            np.array(rows, dtype=np.int32), np.array(cols, dtype=np.int32), np.array(data))
+
+
+def patched_data_layer(products, activities, query_latency=0.0):
+    """Patch the model modules' data functions with in-process fakes.
+    
+    query_latency (seconds) is slept on every per-user activity query to
+    simulate a database round trip.
+    """
+    by_user = {}
+    for activity in activities:
+        by_user.setdefault(activity["user_id"], []).append(activity)
+    
+    def get_user_activity(user_id=None, limit=None, **kwargs):
+        if query_latency:
+            time.sleep(query_latency)
+        return list(by_user.get(user_id, []))
+    
+    def iter_activity_batches(fields=None, batch_size=10000):
+        ordered = sorted(activities, key=lambda a: a["timestamp"])
+        for start in range(0, len(ordered), batch_size):
+            yield ordered[start:start + batch_size]
+    
+    def load_interaction_arrays(action_weights, default_weight=1.0, batch_size=10000):
+        return interaction_arrays(activities, action_weights, default_weight)
+    
+    stack = ExitStack()
+    stack.enter_context(patch("src.models.content_based.get_all_products", lambda **kwargs: list(products)))
+    stack.enter_context(patch("src.models.content_based.get_user_activity", get_user_activity))
+    stack.enter_context(patch("src.models.collaborative.load_interaction_arrays", load_interaction_arrays))
+    stack.enter_context(patch("src.models.hybrid.get_user_activity", get_user_activity))
+    stack.enter_context(patch("src.models.cooccurrence.get_user_activity", get_user_activity))
+    stack.enter_context(patch("src.models.cooccurrence.iter_activity_batches", iter_activity_batches))
+    return stack
@@ -1,5 +1,7 @@
 # src/api/app.py
 
+import time
+
 import uvicorn
 
 from fastapi import FastAPI
@@ -7,9 +9,19 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from src.api.routes import router
 from src.models.hybrid import HybridRecommender
+from src.models.retraining import RetrainingScheduler
+from src.models.interaction_store import get_interaction_store
+from src.models.snapshots import SnapshotWatcher, RetrainLeader, current_snapshot, publish_snapshot, snapshot_lock
 from src.ingestion.stream_handler import StreamingService
-from src.database.mongo_handler import init_db
-from src.config import API_HOST, API_PORT
+from src.ingestion.async_stream_handler import AsyncStreamingService
+from src.ingestion.activity_writer import BufferedActivityWriter
+from src.database.storage import init_db
+from src.database.async_handler import shutdown_executor
+from src.ingestion import activity_events
+from src.config import (
+    API_HOST, API_PORT, API_WORKERS, RETRAIN_ENABLED, MODEL_DIR, MODEL_SNAPSHOT_ENABLED, ACTIVITY_BUFFER_ENABLED,
+    INTERACTION_STORE_ENABLED
+)
 
 
 app = FastAPI(
@@ -28,8 +40,64 @@ app.add_middleware(
 )
 
 
+def publish_written(activities):
+    """Activity writer callback: publish buffered activities once their batch is stored."""
+    for activity in activities:
+        activity_events.publish(activity)
+
+
+interaction_store = get_interaction_store()
 recommender = HybridRecommender()
-stream_service = StreamingService()
+activity_writer = BufferedActivityWriter(on_written=publish_written)
+stream_service = StreamingService(activity_writer=activity_writer)
+async_stream_service = AsyncStreamingService(stream_service)
+
+
+def on_activity(activity):
+    """Activity listener: fold the event into the live model and drop the user's cached results."""
+    app.state.recommender.record_activity(activity)
+
+
+def swap_recommender(new_recommender):
+    """Publish a freshly trained model; requests pick it up on their next lookup."""
+    # The co-occurrence counts are kept current by the activity stream; models are
+    # trained or loaded without them, so the live ones carry over
+    new_recommender.cooccurrence_recommender = app.state.recommender.cooccurrence_recommender
+    app.state.recommender = new_recommender
+
+
+def publish_recommender(new_recommender):
+    """Swap in a retrained model and publish it as a snapshot for the other workers."""
+    swap_recommender(new_recommender)
+    if MODEL_SNAPSHOT_ENABLED:
+        version = publish_snapshot(MODEL_DIR, new_recommender)
+        if version:
+            snapshot_watcher.mark_loaded(version)
+
+
+def model_has_drifted():
+    return app.state.recommender.needs_retrain()
+
+
+def build_retrain_model():
+    """Model for a background retrain; it shares the live co-occurrence model instead of rebuilding it."""
+    return HybridRecommender(cooccurrence_recommender=app.state.recommender.cooccurrence_recommender)
+
+
+def start_retraining():
+    """Run the retraining scheduler in this worker, fed by the activity it ingests."""
+    activity_events.subscribe(retraining_scheduler.record_activity)
+    retraining_scheduler.start()
+
+
+retraining_scheduler = RetrainingScheduler(build_retrain_model, publish_recommender, drift_check=model_has_drifted)
+retrain_leader = RetrainLeader(MODEL_DIR)
+# Followers keep trying for the leader lock, so retraining survives the leader's exit
+snapshot_watcher = SnapshotWatcher(
+    MODEL_DIR, swap_recommender,
+    leader=retrain_leader if RETRAIN_ENABLED else None, on_leader=start_retraining
+)
+
 
 @app.on_event("startup")
 async def startup_event():
@@ -37,22 +105,82 @@ async def startup_event():
    
     init_db()
     
+    if ACTIVITY_BUFFER_ENABLED:
+        activity_writer.start()
     
     stream_service.load_data()
     
+    # The store is updated before on_activity so recomputed results already see the event
+    if INTERACTION_STORE_ENABLED:
+        activity_events.subscribe(interaction_store.record_activity)
+        interaction_store.load()
+    activity_events.subscribe(on_activity)
+    
   
-    recommender.train()
+    start = time.perf_counter()
+    if MODEL_SNAPSHOT_ENABLED:
+        # Workers start together; the first to take the lock trains and publishes,
+        # the rest find the snapshot and memory-map it
+        with snapshot_lock(MODEL_DIR):
+            version, path = current_snapshot(MODEL_DIR)
+            if version is not None:
+                app.state.recommender = HybridRecommender.load(path)
+                app.state.recommender.cooccurrence_recommender.train()
+                print(f"Loaded model snapshot {version} in {time.perf_counter() - start:.3f}s.")
+            elif recommender.train():
+                version = publish_snapshot(MODEL_DIR, recommender)
+        
+        if version is not None:
+            retraining_scheduler.mark_trained(time.perf_counter() - start)
+            snapshot_watcher.mark_loaded(version)
+        snapshot_watcher.start()
+    elif recommender.train():
+        retraining_scheduler.mark_trained(time.perf_counter() - start)
+    
+    # With several workers only the leader retrains; the others follow its snapshots
+    # and the snapshot watcher retries the lock for them
+    if RETRAIN_ENABLED and (not MODEL_SNAPSHOT_ENABLED or retrain_leader.acquire()):
+        start_retraining()
     
     print("API startup complete. Services initialized.")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background services and flush buffered activity."""
+    if stream_service.streaming:
+        stream_service.stop_streaming()
+    if async_stream_service.running:
+        await async_stream_service.stop(drain=True, timeout=10)
+    activity_writer.stop(timeout=10)
+    retraining_scheduler.stop(timeout=5)
+    snapshot_watcher.stop(timeout=5)
+    retrain_leader.release()
+    shutdown_executor(wait=False)
+
+
 app.include_router(router)
 
 
 app.state.recommender = recommender
 app.state.stream_service = stream_service
-
-def main():
+app.state.async_stream_service = async_stream_service
+app.state.activity_writer = activity_writer
+app.state.interaction_store = interaction_store
+app.state.retraining_scheduler = retraining_scheduler
+app.state.snapshot_watcher = snapshot_watcher
+app.state.retrain_leader = retrain_leader
+
+def main(workers=API_WORKERS):
+    """Run the API; workers > 1 is the production mode (no auto-reload)."""
+    if workers > 1:
+        uvicorn.run(
+            "src.api.app:app",
+            host=API_HOST,
+            port=API_PORT,
+            workers=workers
+        )
+        return
   
     uvicorn.run(
         "src.api.app:app",
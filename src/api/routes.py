@@ -5,6 +5,13 @@ from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
+import threading
+
+from src.config import BATCH_MAX_USERS, MODEL_SNAPSHOT_ENABLED
+from src.database.async_handler import (
+    get_all_users, get_user_activity, insert_activity, get_recommendation_user_ids, run_in_db_executor
+)
+from src.ingestion.activity_events import publish as publish_activity
 
 router = APIRouter()
 
@@ -21,6 +28,13 @@ class RecommendationResponse(BaseModel):
     user_id: str
     recommended_products: List[ProductRecommendation]
 
+class BatchRecommendationRequest(BaseModel):
+    user_ids: List[str]
+    limit: int = 10
+
+class BatchRecommendationResponse(BaseModel):
+    results: List[RecommendationResponse]
+
 class UserActivity(BaseModel):
     user_id: str
     action_type: str
@@ -37,15 +51,13 @@ async def root():
 @router.get("/users")
 async def get_users():
     """Get a list of all users in the system."""
-    from src.database.mongo_handler import get_all_users
-    users = get_all_users()
+    users = await get_all_users()
     return {"count": len(users), "users": users[:50]}  # Limit to first 50 users
 
 @router.get("/recommendation-status")
 async def get_recommendation_status():
     """Get status of recommendations in the system."""
-    from src.database.mongo_handler import db, COLLECTION_RECOMMENDATIONS
-    users_with_recs = list(db[COLLECTION_RECOMMENDATIONS].distinct("user_id"))
+    users_with_recs = list(await get_recommendation_user_ids())
     return {
         "users_with_recommendations": len(users_with_recs),
         "sample_users": users_with_recs[:5] if users_with_recs else []
@@ -59,15 +71,13 @@ async def generate_recommendations(user_id: str, request: Request):
     if not recommender:
         raise HTTPException(status_code=500, detail="Recommendation service not initialized")
     
-    
-    from src.database.mongo_handler import get_user_activity
-    user_activities = get_user_activity(user_id=user_id)
+    user_activities = await get_user_activity(user_id=user_id, fields=["product_id"], sort=False)
     
     if not user_activities:
         raise HTTPException(status_code=404, detail=f"User {user_id} has no activity data")
     
 
-    recommendations = recommender.generate_recommendations(user_id)
+    recommendations = await run_in_db_executor(recommender.generate_recommendations, user_id)
     
     return {
         "user_id": user_id,
@@ -76,6 +86,27 @@ async def generate_recommendations(user_id: str, request: Request):
         "message": "Recommendations generated successfully" if recommendations else "Failed to generate recommendations"
     }
 
+@router.post("/recommendations/batch", response_model=BatchRecommendationResponse)
+async def get_batch_recommendations(batch: BatchRecommendationRequest, request: Request):
+    """
+    Get recommendations for many users in one request.
+    
+    Users are scored together, activity and product details are fetched with
+    one query each, and results are persisted with a single bulk write.
+    """
+    recommender = request.app.state.recommender
+    
+    if not recommender:
+        raise HTTPException(status_code=500, detail="Recommendation service not initialized")
+    
+    if len(batch.user_ids) > BATCH_MAX_USERS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_USERS} users per batch request")
+    
+    user_ids = list(dict.fromkeys(batch.user_ids))
+    results = await run_in_db_executor(recommender.get_formatted_batch_recommendations, user_ids, top_k=batch.limit)
+    
+    return {"results": results}
+
 @router.get("/recommendations/{user_id}", response_model=RecommendationResponse)
 async def get_recommendations(user_id: str, request: Request, limit: int = 10):
     """
@@ -90,7 +121,7 @@ async def get_recommendations(user_id: str, request: Request, limit: int = 10):
     if not recommender:
         raise HTTPException(status_code=500, detail="Recommendation service not initialized")
     
-    recommendations = recommender.get_formatted_recommendations(user_id, top_k=limit)
+    recommendations = await run_in_db_executor(recommender.get_formatted_recommendations, user_id, top_k=limit)
     
     if not recommendations["recommended_products"]:
         raise HTTPException(status_code=404, detail=f"No recommendations found for user {user_id}")
@@ -105,8 +136,6 @@ async def add_activity(activity: UserActivity, request: Request):
     Args:
         activity: User activity data
     """
-    from src.database.mongo_handler import insert_activity
-    
 
     if not activity.timestamp:
         activity.timestamp = datetime.now().isoformat()
@@ -114,34 +143,173 @@ async def add_activity(activity: UserActivity, request: Request):
   
     activity_dict = activity.dict()
     
-   
-    success = insert_activity(activity_dict)
+    writer = getattr(request.app.state, "activity_writer", None)
+    if writer is not None and writer.is_running:
+        # Enqueue without blocking; only when the buffer is full wait for room off the event loop
+        accepted = writer.try_submit(activity_dict)
+        if not accepted:
+            accepted = await run_in_db_executor(writer.submit, activity_dict)
+        
+        if not accepted:
+            raise HTTPException(status_code=503, detail="Activity buffer full, retry later")
+        # The writer publishes it once its batch is stored
+        return {"message": "Activity added successfully"}
+    
+    success = await insert_activity(activity_dict)
     
     if not success:
         raise HTTPException(status_code=500, detail="Failed to insert activity")
     
+    # Listeners fold the event into the models and may query the database; keep them off the event loop
+    await run_in_db_executor(publish_activity, activity_dict)
+    
     return {"message": "Activity added successfully"}
 
+@router.get("/ingestion-stats")
+async def get_ingestion_stats(request: Request):
+    """Buffered activity writer metrics: queue depth, flush latency, dropped events."""
+    writer = getattr(request.app.state, "activity_writer", None)
+    
+    if not writer:
+        raise HTTPException(status_code=500, detail="Activity writer not initialized")
+    
+    return writer.metrics()
+
+@router.get("/cache-stats")
+async def get_cache_stats(request: Request):
+    """Hit rate, eviction and size counters of the recommendation cache."""
+    recommender = request.app.state.recommender
+    
+    if not recommender or recommender.cache is None:
+        return {"enabled": False}
+    
+    return {"enabled": True, **recommender.cache.stats()}
+
+@router.get("/model-status")
+async def get_model_status(request: Request):
+    """Background retraining metrics plus the model snapshot this worker is serving."""
+    scheduler = request.app.state.retraining_scheduler
+    
+    if not scheduler:
+        raise HTTPException(status_code=500, detail="Retraining scheduler not initialized")
+    
+    status = scheduler.status()
+    
+    watcher = getattr(request.app.state, "snapshot_watcher", None)
+    if watcher:
+        status["snapshot"] = watcher.status()
+    
+    leader = getattr(request.app.state, "retrain_leader", None)
+    if leader:
+        status["retrain_leader"] = leader.is_leader
+    
+    store = getattr(request.app.state, "interaction_store", None)
+    if store:
+        status["interaction_store"] = store.stats()
+    
+    recommender = request.app.state.recommender
+    if recommender:
+        status["cooccurrence"] = recommender.cooccurrence_recommender.stats()
+    
+    return status
+
+@router.post("/retrain")
+async def retrain_model(request: Request):
+    """Trigger a background retrain; the new model is swapped in when complete."""
+    scheduler = request.app.state.retraining_scheduler
+    
+    if not scheduler:
+        raise HTTPException(status_code=500, detail="Retraining scheduler not initialized")
+    
+    # Only the retrain leader publishes snapshots; a follower may take over if the leader has gone
+    leader = getattr(request.app.state, "retrain_leader", None)
+    if MODEL_SNAPSHOT_ENABLED and leader is not None and not leader.is_leader:
+        watcher = getattr(request.app.state, "snapshot_watcher", None)
+        if not (watcher is not None and watcher.check_leader()) and not leader.acquire():
+            raise HTTPException(status_code=409, detail="Retraining is run by another worker")
+    
+    threading.Thread(target=scheduler.retrain_now, daemon=True).start()
+    
+    return {"message": "Retraining started"}
+
 @router.post("/start-streaming")
-async def start_streaming(request: Request, speed_factor: int = 100):
+async def start_streaming(request: Request, speed_factor: int = 100, replay_mode: str = None):
     """
     Start streaming simulated user activity data.
     
     Args:
-        speed_factor: How many times faster than real-time
+        speed_factor: How many times faster than real-time (0 = as fast as possible)
+        replay_mode: "event" or "batched"; defaults to STREAM_REPLAY_MODE
     """
     stream_service = request.app.state.stream_service
     
     if not stream_service:
         raise HTTPException(status_code=500, detail="Streaming service not initialized")
     
-    success = stream_service.start_streaming(speed_factor=speed_factor)
+    success = stream_service.start_streaming(speed_factor=speed_factor, replay_mode=replay_mode)
     
     if not success:
         raise HTTPException(status_code=500, detail="Failed to start streaming")
     
     return {"message": f"Streaming started with speed factor {speed_factor}x"}
 
+@router.get("/streaming-stats")
+async def get_streaming_stats(request: Request):
+    """Replay progress: events sent, sustained events/s and lag behind simulated time."""
+    stream_service = request.app.state.stream_service
+    
+    if not stream_service:
+        raise HTTPException(status_code=500, detail="Streaming service not initialized")
+    
+    return stream_service.replay_stats()
+
+@router.post("/start-async-streaming")
+async def start_async_streaming(request: Request, speed_factor: int = 100, shards: int = None):
+    """
+    Replay activity as concurrent asyncio streams sharded by user.
+    
+    Args:
+        speed_factor: How many times faster than real-time (0 = as fast as possible)
+        shards: Number of concurrent streams; defaults to STREAM_SHARDS
+    """
+    service = request.app.state.async_stream_service
+    
+    if not service:
+        raise HTTPException(status_code=500, detail="Async streaming service not initialized")
+    
+    if shards is not None and shards < 1:
+        raise HTTPException(status_code=400, detail="shards must be at least 1")
+    
+    if not await service.start(speed_factor=speed_factor, shards=shards):
+        raise HTTPException(status_code=409, detail="Async streaming is already running or data failed to load")
+    
+    return {"message": f"Async streaming started with {len(service.streams)} streams at {speed_factor}x"}
+
+@router.post("/stop-async-streaming")
+async def stop_async_streaming(request: Request, drain: bool = True):
+    """Stop the async replay; waits until every stream has finished its in-flight (and, with drain, buffered) writes."""
+    service = request.app.state.async_stream_service
+    
+    if not service:
+        raise HTTPException(status_code=500, detail="Async streaming service not initialized")
+    
+    if not service.running:
+        raise HTTPException(status_code=409, detail="Async streaming is not running")
+    
+    await service.stop(drain=drain)
+    
+    return {"message": "Async streaming stopped", **service.status()}
+
+@router.get("/async-streaming-status")
+async def get_async_streaming_status(request: Request):
+    """Progress, throughput and lag of each async replay stream."""
+    service = request.app.state.async_stream_service
+    
+    if not service:
+        raise HTTPException(status_code=500, detail="Async streaming service not initialized")
+    
+    return service.status()
+
 @router.post("/stop-streaming")
 async def stop_streaming(request: Request):
     """Stop streaming simulated user activity data."""
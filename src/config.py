@@ -5,6 +5,8 @@ load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 MONGO_DB = os.getenv("MONGO_DB", "ecommerce_recommendations")
+# "mongo", or "memory" for the process-local backend used in tests and benchmarks
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo")
 
 COLLECTION_PRODUCTS = "products"
 COLLECTION_USER_ACTIVITY = "user_activity"
@@ -12,15 +14,153 @@ COLLECTION_RECOMMENDATIONS = "recommendations"
 
 API_HOST = os.getenv("API_HOST", "0.0.0.0")
 API_PORT = int(os.getenv("API_PORT", "8000"))
+# Worker processes; more than one disables auto-reload (production mode)
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+BATCH_MAX_USERS = 10000
+
+# Threads used by the async data layer to run blocking pymongo calls off the event loop
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "32"))
+
+# Products per bulk_write (and per stored-hash lookup) when syncing the catalog
+PRODUCT_SYNC_CHUNK_SIZE = 1000
+
+# Activity replay: "memory" loads the whole activity file and sorts it once;
+# "incremental" streams it in STREAM_READ_CHUNK_BYTES reads and requires it to
+# be sorted by timestamp already (NDJSON or a JSON array)
+STREAM_LOAD_MODE = os.getenv("STREAM_LOAD_MODE", "memory")
+STREAM_READ_CHUNK_BYTES = 1 << 20
+
+# Replay pacing: "event" sleeps before every activity and inserts it alone;
+# "batched" groups activities into STREAM_BATCH_WINDOW_SECONDS wall-clock
+# buckets (at most STREAM_BATCH_MAX_EVENTS each), one bulk insert per bucket.
+# A speed factor of 0 replays as fast as possible in batched mode.
+STREAM_REPLAY_MODE = os.getenv("STREAM_REPLAY_MODE", "event")
+STREAM_BATCH_WINDOW_SECONDS = 0.05
+STREAM_BATCH_MAX_EVENTS = 5000
+
+# Asyncio replay on the API event loop: activities are sharded by user across
+# STREAM_SHARDS concurrent streams, each fed by a queue of STREAM_SHARD_QUEUE_SIZE;
+# the reader pulls STREAM_READ_BATCH records per executor call
+STREAM_SHARDS = int(os.getenv("STREAM_SHARDS", "4"))
+STREAM_SHARD_QUEUE_SIZE = 10000
+STREAM_READ_BATCH = 1000
+
+# Write-behind activity ingestion: events are queued and written with
+# insert_many(ordered=False) every ACTIVITY_FLUSH_SIZE events or
+# ACTIVITY_FLUSH_INTERVAL_SECONDS; a full queue blocks producers for up to
+# ACTIVITY_BUFFER_BLOCK_SECONDS before the event is dropped. Buffered events reach
+# the activity listeners (models, cache) only once their batch has been written
+ACTIVITY_BUFFER_ENABLED = os.getenv("ACTIVITY_BUFFER_ENABLED", "true").lower() == "true"
+ACTIVITY_BUFFER_MAX_EVENTS = 100000
+ACTIVITY_FLUSH_SIZE = 5000
+ACTIVITY_FLUSH_INTERVAL_SECONDS = 0.5
+ACTIVITY_BUFFER_BLOCK_SECONDS = 1.0
+
+# Per-user interaction counts held in memory, loaded at startup and updated from
+# every ingested activity; the models read users' interactions from it. Off by
+# default with several workers, since each only sees the activity it ingests
+INTERACTION_STORE_ENABLED = os.getenv(
+    "INTERACTION_STORE_ENABLED", "true" if API_WORKERS == 1 else "false"
+).lower() == "true"
 
 TOP_K_RECOMMENDATIONS = 10
 
+# Read-through serving from COLLECTION_RECOMMENDATIONS: a stored document is
+# served if younger than the TTL, or if it is newer than the user's last activity.
+SERVE_STORED_RECOMMENDATIONS = os.getenv("SERVE_STORED_RECOMMENDATIONS", "false").lower() == "true"
+RECOMMENDATION_TTL_SECONDS = int(os.getenv("RECOMMENDATION_TTL_SECONDS", "3600"))
+
+# In-process LRU cache in front of HybridRecommender.get_formatted_recommendations.
+# Ingested activity invalidates it only in the worker that received the event, so
+# it is off by default with several workers (others would serve stale results)
+RECOMMENDATION_CACHE_ENABLED = os.getenv(
+    "RECOMMENDATION_CACHE_ENABLED", "true" if API_WORKERS == 1 else "false"
+).lower() == "true"
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "10000"))
+RECOMMENDATION_CACHE_TTL_SECONDS = int(os.getenv("RECOMMENDATION_CACHE_TTL_SECONDS", "300"))
+
 CONTENT_BASED_WEIGHT = 0.6
 COLLABORATIVE_WEIGHT = 0.4
 
+# Item co-occurrence model, updated from every ingested activity. Its normalized
+# scores are added on top of the content/collaborative blend with this weight
+COOCCURRENCE_WEIGHT = float(os.getenv("COOCCURRENCE_WEIGHT", "0.2"))
+# Recent products per user each new event is paired with, and users tracked
+COOCCURRENCE_HISTORY_SIZE = 20
+COOCCURRENCE_MAX_USERS = 200000
+# Neighbors kept per product. Every COOCCURRENCE_PRUNE_EVERY events that many
+# products drop pairs whose decayed score is below COOCCURRENCE_MIN_SCORE
+COOCCURRENCE_MAX_NEIGHBORS = 50
+COOCCURRENCE_HALF_LIFE_SECONDS = 7 * 24 * 3600
+COOCCURRENCE_PRUNE_EVERY = 1000
+COOCCURRENCE_MIN_SCORE = 0.05
+
+HYBRID_CONCURRENT = os.getenv("HYBRID_CONCURRENT", "false").lower() == "true"
+HYBRID_MAX_WORKERS = 4
+
 CONTENT_MIN_INTERACTIONS = 2
+CONTENT_RETRIEVAL = os.getenv("CONTENT_RETRIEVAL", "exact")  # "exact" or "neighbors"
+CONTENT_NUM_NEIGHBORS = 50
+CONTENT_NEIGHBOR_BLOCK_BYTES = 256 * 1024 * 1024
+CONTENT_BATCH_SIZE = 256
 
 COLLAB_NUM_FACTORS = 20
+COLLAB_ALGORITHM = os.getenv("COLLAB_ALGORITHM", "svd")  # "svd" or "als"
+COLLAB_SPARSE_TRAINING = True
+COLLAB_BULK_LOAD = True
+COLLAB_BATCH_SIZE = 256
+# Score buffers up to this size are kept for reuse by each serving thread; larger
+# (batch, n_items) buffers are allocated per call so idle threads hold no big arrays
+COLLAB_SCORE_BUFFER_MAX_BYTES = 8 * 1024 * 1024
+# Retrieval backend: "exact" scores every item, "ivf" probes an approximate
+# k-means inverted-file index built at train time (more nprobe = better recall)
+COLLAB_RETRIEVAL = os.getenv("COLLAB_RETRIEVAL", "exact")
+COLLAB_IVF_NLIST = 0  # 0 = sqrt(number of items)
+COLLAB_IVF_NPROBE = int(os.getenv("COLLAB_IVF_NPROBE", "8"))
+COLLAB_IVF_KMEANS_ITERATIONS = 10
+COLLAB_IVF_SAMPLE_PER_LIST = 256
+# Fold every ingested activity into the live collaborative model. Like the cache
+# this only reaches the ingesting worker, so it is off by default with several
+# workers; users the model does not know are still folded in when requested
+COLLAB_FOLD_IN_ACTIVITY = os.getenv(
+    "COLLAB_FOLD_IN_ACTIVITY", "true" if API_WORKERS == 1 else "false"
+).lower() == "true"
+# Fold-in drift limits beyond which a full collaborative retrain is requested
+COLLAB_DRIFT_MAX_NEW_USER_RATIO = 0.1
+COLLAB_DRIFT_MAX_INTERACTION_RATIO = 0.2
+COLLAB_DRIFT_MAX_UNKNOWN_PRODUCT_RATIO = 0.05
+# Folded interactions needed before the unknown product ratio is trusted
+COLLAB_DRIFT_MIN_FOLDED_INTERACTIONS = 100
+# Folded-in users kept between retrains; the least recently folded are dropped
+# beyond this, which also requests a retrain
+COLLAB_FOLD_IN_MAX_USERS = 100000
+
+# Implicit-feedback ALS (COLLAB_ALGORITHM = "als")
+ALS_ITERATIONS = 15
+ALS_REGULARIZATION = 0.1
+ALS_ALPHA = 40.0
+ALS_CG_STEPS = 3
+ALS_BLOCK_SIZE = 4096
+ALS_NUM_THREADS = 4
+
+# Trained model snapshots: loaded (memory-mapped) at API startup if present,
+# otherwise the models are trained and saved there
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+MODEL_SNAPSHOT_ENABLED = os.getenv("MODEL_SNAPSHOT_ENABLED", "true").lower() == "true"
+# Versioned snapshots under MODEL_DIR/snapshots; every API worker polls the
+# CURRENT pointer and hot-swaps to newly published versions. Followers also try
+# to take over retraining on every poll, in case the leader worker has died
+MODEL_RELOAD_POLL_SECONDS = 5
+MODEL_SNAPSHOTS_KEEP = 3
+
+# Background retraining with hot-swap in the API (0 disables a trigger)
+RETRAIN_ENABLED = os.getenv("RETRAIN_ENABLED", "true").lower() == "true"
+RETRAIN_INTERVAL_SECONDS = int(os.getenv("RETRAIN_INTERVAL_SECONDS", "3600"))
+RETRAIN_ACTIVITY_THRESHOLD = int(os.getenv("RETRAIN_ACTIVITY_THRESHOLD", "10000"))
+RETRAIN_DRIFT_CHECK_SECONDS = 60
+# A failed retrain is retried after this long, doubling with each consecutive
+# failure up to RETRAIN_INTERVAL_SECONDS
+RETRAIN_RETRY_SECONDS = 30
 
 PRECISION_K = 5
 EVALUATION_TEST_SIZE = 0.2
@@ -0,0 +1,66 @@
+"""
+Async data-access layer for the FastAPI routes.
+
+Each function mirrors the src.database.storage function of the same name but
+runs it on a bounded thread pool, so a slow query occupies one executor thread
+instead of blocking the event loop for every concurrent request. The storage
+function is looked up at call time, so patching it in tests also affects the
+async wrapper.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from src.database import storage
+from src.config import DB_EXECUTOR_WORKERS
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+        return _executor
+
+
+def shutdown_executor(wait=True):
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+async def run_in_db_executor(func, *args, **kwargs):
+    """Await a blocking call (a query, or model code that queries) on the database executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def _async(name):
+    sync_func = getattr(storage, name)
+
+    @functools.wraps(sync_func)
+    async def wrapper(*args, **kwargs):
+        return await run_in_db_executor(getattr(storage, name), *args, **kwargs)
+
+    return wrapper
+
+
+insert_products = _async("insert_products")
+insert_activity = _async("insert_activity")
+insert_activities = _async("insert_activities")
+save_recommendations = _async("save_recommendations")
+save_recommendations_bulk = _async("save_recommendations_bulk")
+get_user_activity = _async("get_user_activity")
+get_last_activity_timestamp = _async("get_last_activity_timestamp")
+get_users_activity = _async("get_users_activity")
+get_all_users = _async("get_all_users")
+get_all_products = _async("get_all_products")
+get_product_details = _async("get_product_details")
+get_recommendations = _async("get_recommendations")
+get_recommendation_user_ids = _async("get_recommendation_user_ids")
@@ -0,0 +1,332 @@
+"""
+Storage backends behind the data-access functions in src.database.storage.
+
+StorageBackend declares the interface (the functions mongo_handler has always
+exposed) as abstract methods, so an incomplete backend fails when created.
+MongoBackend delegates to mongo_handler; InMemoryBackend keeps everything in
+indexed Python structures for tests and local benchmarks.
+"""
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+
+import numpy as np
+
+from src.database import mongo_handler
+
+
+def _project(document, fields):
+    """Copy of document, restricted to fields when given (like a find() projection)."""
+    if fields is None:
+        return dict(document)
+    return {field: document[field] for field in fields if field in document}
+
+
+class StorageBackend(ABC):
+    """Interface shared by all storage backends."""
+
+    @abstractmethod
+    def init_db(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_products(self, products):
+        """Upsert products by product_id."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_activity(self, activity):
+        """Store one activity, stamping a timestamp if it has none."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_activities(self, activities, ordered=True):
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_recommendations(self, user_id, recommendations, top_k=None):
+        """Upsert a user's recommendations; top_k (the number requested) is stored when given."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def save_recommendations_bulk(self, recommendations_by_user, top_k=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_user_activity(self, user_id=None, limit=None, fields=None, sort=True):
+        """Activities for user_id (all users if None), newest first.
+
+        fields limits the returned keys; sort=False allows any order.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def iter_activity_batches(self, fields=None, batch_size=10000):
+        """Yield all activity oldest first, in lists of up to batch_size."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_last_activity_timestamp(self, user_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_users_activity(self, user_ids, fields=None, sort=True):
+        """Dict of user_id -> activities (newest first), [] for unknown users."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def load_interaction_arrays(self, action_weights, default_weight=1.0, batch_size=10000):
+        """(user_ids, product_ids, rows, cols, data) over all activity, ids in first-seen order."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_users(self):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_all_products(self, fields=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_product_details(self, product_ids, fields=None):
+        """Dict of product_id -> product for the ids that exist."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_recommendations(self, user_id):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_recommendation_user_ids(self):
+        raise NotImplementedError
+
+
+class MongoBackend(StorageBackend):
+    """MongoDB storage; the client is created on first use."""
+
+    def init_db(self):
+        return mongo_handler.init_db()
+
+    def insert_products(self, products):
+        return mongo_handler.insert_products(products)
+
+    def insert_activity(self, activity):
+        return mongo_handler.insert_activity(activity)
+
+    def insert_activities(self, activities, ordered=True):
+        return mongo_handler.insert_activities(activities, ordered=ordered)
+
+    def save_recommendations(self, user_id, recommendations, top_k=None):
+        return mongo_handler.save_recommendations(user_id, recommendations, top_k=top_k)
+
+    def save_recommendations_bulk(self, recommendations_by_user, top_k=None):
+        return mongo_handler.save_recommendations_bulk(recommendations_by_user, top_k=top_k)
+
+    def get_user_activity(self, user_id=None, limit=None, fields=None, sort=True):
+        return mongo_handler.get_user_activity(user_id=user_id, limit=limit, fields=fields, sort=sort)
+
+    def iter_activity_batches(self, fields=None, batch_size=10000):
+        return mongo_handler.iter_activity_batches(fields=fields, batch_size=batch_size)
+
+    def get_last_activity_timestamp(self, user_id):
+        return mongo_handler.get_last_activity_timestamp(user_id)
+
+    def get_users_activity(self, user_ids, fields=None, sort=True):
+        return mongo_handler.get_users_activity(user_ids, fields=fields, sort=sort)
+
+    def load_interaction_arrays(self, action_weights, default_weight=1.0, batch_size=10000):
+        return mongo_handler.load_interaction_arrays(action_weights, default_weight, batch_size)
+
+    def get_all_users(self):
+        return mongo_handler.get_all_users()
+
+    def get_all_products(self, fields=None):
+        return mongo_handler.get_all_products(fields=fields)
+
+    def get_product_details(self, product_ids, fields=None):
+        return mongo_handler.get_product_details(product_ids, fields=fields)
+
+    def get_recommendations(self, user_id):
+        return mongo_handler.get_recommendations(user_id)
+
+    def get_recommendation_user_ids(self):
+        return mongo_handler.get_recommendation_user_ids()
+
+
+class InMemoryBackend(StorageBackend):
+    """Process-local storage with the same semantics as MongoBackend.
+
+    Activities are indexed per user in timestamp order, products and stored
+    recommendations are dicts keyed by id. Reads return copies, like
+    documents fetched from a database.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.products = {}
+        self.recommendations = {}
+        # Insertion order, for load_interaction_arrays
+        self.activities = []
+        # user_id -> (timestamps ascending, activities in the same order)
+        self._user_timestamps = {}
+        self._user_activities = {}
+
+    def init_db(self):
+        print("In-memory storage initialized")
+
+    def insert_products(self, products):
+        if not products:
+            return False
+
+        with self._lock:
+            for product in products:
+                stored = self.products.setdefault(product["product_id"], {})
+                stored.update(product)
+        return True
+
+    def _add_activity(self, activity):
+        if "timestamp" not in activity:
+            activity["timestamp"] = datetime.now().isoformat()
+
+        document = dict(activity)
+        self.activities.append(document)
+
+        timestamps = self._user_timestamps.setdefault(document["user_id"], [])
+        activities = self._user_activities.setdefault(document["user_id"], [])
+        position = bisect_right(timestamps, document["timestamp"])
+        timestamps.insert(position, document["timestamp"])
+        activities.insert(position, document)
+
+    def insert_activity(self, activity):
+        if not activity:
+            return False
+
+        with self._lock:
+            self._add_activity(activity)
+        return True
+
+    def insert_activities(self, activities, ordered=True):
+        if not activities:
+            return False
+
+        with self._lock:
+            for activity in activities:
+                self._add_activity(activity)
+        return True
+
+    def save_recommendations(self, user_id, recommendations, top_k=None):
+        if not recommendations:
+            return False
+
+        return self.save_recommendations_bulk({user_id: recommendations}, top_k=top_k)
+
+    def save_recommendations_bulk(self, recommendations_by_user, top_k=None):
+        fields = {"timestamp": datetime.now().isoformat()}
+        if top_k is not None:
+            fields["top_k"] = top_k
+        documents = {
+            user_id: {"user_id": user_id, "recommended_products": recommendations, **fields}
+            for user_id, recommendations in recommendations_by_user.items()
+            if recommendations
+        }
+
+        if not documents:
+            return False
+
+        with self._lock:
+            self.recommendations.update(documents)
+        return True
+
+    def get_user_activity(self, user_id=None, limit=None, fields=None, sort=True):
+        with self._lock:
+            if user_id:
+                activities = self._user_activities.get(user_id, [])
+                activities = activities[::-1] if sort else activities
+            elif sort:
+                activities = sorted(self.activities, key=lambda a: a["timestamp"], reverse=True)
+            else:
+                activities = self.activities
+
+            if limit:
+                activities = activities[:limit]
+
+            return [_project(activity, fields) for activity in activities]
+
+    def iter_activity_batches(self, fields=None, batch_size=10000):
+        with self._lock:
+            activities = sorted(self.activities, key=lambda a: a["timestamp"])
+
+        for start in range(0, len(activities), batch_size):
+            yield [_project(activity, fields) for activity in activities[start:start + batch_size]]
+
+    def get_last_activity_timestamp(self, user_id):
+        with self._lock:
+            timestamps = self._user_timestamps.get(user_id)
+            return timestamps[-1] if timestamps else None
+
+    def get_users_activity(self, user_ids, fields=None, sort=True):
+        if fields is not None:
+            fields = ("user_id", *fields)
+
+        with self._lock:
+            results = {}
+            for user_id in user_ids:
+                activities = self._user_activities.get(user_id, [])
+                results[user_id] = [
+                    _project(activity, fields) for activity in (reversed(activities) if sort else activities)
+                ]
+            return results
+
+    def load_interaction_arrays(self, action_weights, default_weight=1.0, batch_size=10000):
+        user_index = {}
+        product_index = {}
+        rows = array("i")
+        cols = array("i")
+        data = array("d")
+
+        with self._lock:
+            for activity in self.activities:
+                rows.append(user_index.setdefault(activity["user_id"], len(user_index)))
+                cols.append(product_index.setdefault(activity["product_id"], len(product_index)))
+                data.append(action_weights.get(activity.get("action_type"), default_weight))
+
+        return (
+            list(user_index),
+            list(product_index),
+            np.frombuffer(rows, dtype=np.int32),
+            np.frombuffer(cols, dtype=np.int32),
+            np.frombuffer(data, dtype=np.float64)
+        )
+
+    def get_all_users(self):
+        with self._lock:
+            return list(self._user_activities)
+
+    def get_all_products(self, fields=None):
+        with self._lock:
+            return [_project(product, fields) for product in self.products.values()]
+
+    def get_product_details(self, product_ids, fields=None):
+        if not product_ids:
+            return {}
+
+        if fields is not None:
+            fields = ("product_id", *fields)
+
+        with self._lock:
+            return {
+                product_id: _project(self.products[product_id], fields)
+                for product_id in product_ids
+                if product_id in self.products
+            }
+
+    def get_recommendations(self, user_id):
+        with self._lock:
+            document = self.recommendations.get(user_id)
+            return dict(document) if document else None
+
+    def get_recommendation_user_ids(self):
+        with self._lock:
+            return list(self.recommendations)
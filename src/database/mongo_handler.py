@@ -1,30 +1,51 @@
 
-from pymongo import MongoClient, ASCENDING
+import hashlib
+import json
+import threading
+from array import array
+
+import numpy as np
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
 from datetime import datetime
 
-from src.config import MONGO_URI, MONGO_DB, COLLECTION_PRODUCTS, COLLECTION_USER_ACTIVITY, COLLECTION_RECOMMENDATIONS
+from src.config import (
+    MONGO_URI, MONGO_DB, COLLECTION_PRODUCTS, COLLECTION_USER_ACTIVITY, COLLECTION_RECOMMENDATIONS,
+    PRODUCT_SYNC_CHUNK_SIZE
+)
+
 
+client = None
+db = None
+_connect_lock = threading.Lock()
 
-client = MongoClient(MONGO_URI)
-db = client[MONGO_DB]
+def get_db():
+    """Connect on first use, so importing this module never opens a client."""
+    global client, db
+    if db is None:
+        with _connect_lock:
+            if db is None:
+                client = MongoClient(MONGO_URI)
+                db = client[MONGO_DB]
+    return db
 
 def init_db():
 
     try:
 
-        db[COLLECTION_PRODUCTS].drop_indexes()
-        db[COLLECTION_USER_ACTIVITY].drop_indexes()
-        db[COLLECTION_RECOMMENDATIONS].drop_indexes()
+        get_db()[COLLECTION_PRODUCTS].drop_indexes()
+        get_db()[COLLECTION_USER_ACTIVITY].drop_indexes()
+        get_db()[COLLECTION_RECOMMENDATIONS].drop_indexes()
     
-        db[COLLECTION_PRODUCTS].create_index([("product_id", ASCENDING)], unique=True)
+        get_db()[COLLECTION_PRODUCTS].create_index([("product_id", ASCENDING)], unique=True)
         
 
-        db[COLLECTION_USER_ACTIVITY].create_index([("user_id", ASCENDING)])
-        db[COLLECTION_USER_ACTIVITY].create_index([("product_id", ASCENDING)])
-        db[COLLECTION_USER_ACTIVITY].create_index([("timestamp", ASCENDING)])
+        get_db()[COLLECTION_USER_ACTIVITY].create_index([("user_id", ASCENDING)])
+        get_db()[COLLECTION_USER_ACTIVITY].create_index([("product_id", ASCENDING)])
+        get_db()[COLLECTION_USER_ACTIVITY].create_index([("timestamp", ASCENDING)])
+        get_db()[COLLECTION_USER_ACTIVITY].create_index([("user_id", ASCENDING), ("timestamp", DESCENDING)])
         
        
-        db[COLLECTION_RECOMMENDATIONS].create_index([("user_id", ASCENDING)], unique=True)
+        get_db()[COLLECTION_RECOMMENDATIONS].create_index([("user_id", ASCENDING)], unique=True)
         
         print("Database indexes initialized successfully")
     except Exception as e:
@@ -32,19 +53,51 @@ def init_db():
     
         pass
 
-def insert_products(products):
- 
+def product_content_hash(product):
+    """Stable hash of a product's fields, used to skip unchanged catalog entries."""
+    content = {key: value for key, value in product.items() if key not in ("_id", "content_hash")}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def insert_products(products, chunk_size=PRODUCT_SYNC_CHUNK_SIZE):
+    """Upsert products in unordered bulk_write chunks.
+    
+    Each stored product carries a content_hash; products whose hash matches
+    the stored one are skipped, so re-syncing an unchanged catalog only
+    reads hashes.
+    """
     if not products:
         return False
     
-
-    for product in products:
-        db[COLLECTION_PRODUCTS].update_one(
-            {"product_id": product["product_id"]},
-            {"$set": product},
-            upsert=True
-        )
+    collection = get_db()[COLLECTION_PRODUCTS]
+    upserted, unchanged = 0, 0
+    
+    for start in range(0, len(products), chunk_size):
+        chunk = products[start:start + chunk_size]
+        
+        stored_hashes = {
+            doc["product_id"]: doc.get("content_hash")
+            for doc in collection.find(
+                {"product_id": {"$in": [product["product_id"] for product in chunk]}},
+                {"_id": 0, "product_id": 1, "content_hash": 1}
+            )
+        }
+        
+        operations = []
+        for product in chunk:
+            content_hash = product_content_hash(product)
+            if stored_hashes.get(product["product_id"]) == content_hash:
+                unchanged += 1
+                continue
+            
+            document = {key: value for key, value in product.items() if key != "_id"}
+            document["content_hash"] = content_hash
+            operations.append(UpdateOne({"product_id": product["product_id"]}, {"$set": document}, upsert=True))
+        
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+            upserted += len(operations)
     
+    print(f"Product sync: {upserted} upserted, {unchanged} unchanged.")
     return True
 
 def insert_activity(activity):
@@ -56,19 +109,19 @@ def insert_activity(activity):
     if "timestamp" not in activity:
         activity["timestamp"] = datetime.now().isoformat()
     
-    db[COLLECTION_USER_ACTIVITY].insert_one(activity)
+    get_db()[COLLECTION_USER_ACTIVITY].insert_one(activity)
     return True
 
-def insert_activities(activities):
+def insert_activities(activities, ordered=True):
 
     if not activities:
         return False
     
-    db[COLLECTION_USER_ACTIVITY].insert_many(activities)
+    get_db()[COLLECTION_USER_ACTIVITY].insert_many(activities, ordered=ordered)
     return True
 
-def save_recommendations(user_id, recommendations):
-
+def save_recommendations(user_id, recommendations, top_k=None):
+    """Upsert a user's recommendations; top_k is the number that was requested, if known."""
     if not recommendations:
         return False
     
@@ -77,9 +130,11 @@ def save_recommendations(user_id, recommendations):
         "recommended_products": recommendations,
         "timestamp": datetime.now().isoformat()
     }
+    if top_k is not None:
+        recommendation_doc["top_k"] = top_k
     
     # Upsert to ensure one document per user
-    db[COLLECTION_RECOMMENDATIONS].update_one(
+    get_db()[COLLECTION_RECOMMENDATIONS].update_one(
         {"user_id": user_id},
         {"$set": recommendation_doc},
         upsert=True
@@ -87,33 +142,152 @@ def save_recommendations(user_id, recommendations):
     
     return True
 
-def get_user_activity(user_id=None, limit=None):
+def save_recommendations_bulk(recommendations_by_user, top_k=None):
+    """Upsert recommendation documents for many users with one unordered bulk_write."""
+    timestamp = datetime.now().isoformat()
+    fields = {"timestamp": timestamp}
+    if top_k is not None:
+        fields["top_k"] = top_k
+    operations = [
+        UpdateOne(
+            {"user_id": user_id},
+            {"$set": {"user_id": user_id, "recommended_products": recommendations, **fields}},
+            upsert=True
+        )
+        for user_id, recommendations in recommendations_by_user.items()
+        if recommendations
+    ]
+    
+    if not operations:
+        return False
+    
+    get_db()[COLLECTION_RECOMMENDATIONS].bulk_write(operations, ordered=False)
+    return True
+
+def _projection(fields, required=()):
+    """find() projection returning only fields (plus required ones), or None for whole documents."""
+    if fields is None:
+        return None
+    
+    projection = {"_id": 0}
+    for field in (*required, *fields):
+        projection[field] = 1
+    return projection
 
+def get_user_activity(user_id=None, limit=None, fields=None, sort=True):
+    """Activities newest first; fields limits the returned keys, sort=False skips the timestamp sort."""
     query = {}
     if user_id:
         query["user_id"] = user_id
     
-    cursor = db[COLLECTION_USER_ACTIVITY].find(query).sort("timestamp", -1)
+    cursor = get_db()[COLLECTION_USER_ACTIVITY].find(query, projection=_projection(fields))
+    if sort:
+        cursor = cursor.sort("timestamp", -1)
     
     if limit:
         cursor = cursor.limit(limit)
     
     return list(cursor)
 
+def iter_activity_batches(fields=None, batch_size=10000):
+    """Yield all activity oldest first, in lists of up to batch_size, from one streaming cursor."""
+    cursor = get_db()[COLLECTION_USER_ACTIVITY].find(
+        {},
+        projection=_projection(fields),
+        batch_size=batch_size
+    ).sort("timestamp", ASCENDING)
+    
+    batch = []
+    for activity in cursor:
+        batch.append(activity)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def get_last_activity_timestamp(user_id):
+    """Timestamp of the user's most recent activity, or None."""
+    activity = get_db()[COLLECTION_USER_ACTIVITY].find_one(
+        {"user_id": user_id},
+        projection={"_id": 0, "timestamp": 1},
+        sort=[("timestamp", DESCENDING)]
+    )
+    return activity["timestamp"] if activity else None
+
+def get_users_activity(user_ids, fields=None, sort=True):
+    """Fetch activity for many users with a single $in query.
+    
+    Returns a dict of user_id -> activities (newest first unless sort=False),
+    with an empty list for users that have no activity.
+    """
+    activities = {user_id: [] for user_id in user_ids}
+    if not activities:
+        return activities
+    
+    cursor = get_db()[COLLECTION_USER_ACTIVITY].find(
+        {"user_id": {"$in": list(activities)}},
+        projection=_projection(fields, required=("user_id",))
+    )
+    if sort:
+        cursor = cursor.sort("timestamp", -1)
+    for activity in cursor:
+        activities[activity["user_id"]].append(activity)
+    
+    return activities
+
+def load_interaction_arrays(action_weights, default_weight=1.0, batch_size=10000):
+    """Load every (user, product, weight) triple in a single projected cursor pass.
+    
+    Streams the cursor straight into typed COO buffers instead of building a
+    list of activity dicts. Returns (user_ids, product_ids, rows, cols, data)
+    where user_ids/product_ids are in first-seen order and rows/cols index them.
+    """
+    cursor = get_db()[COLLECTION_USER_ACTIVITY].find(
+        {},
+        projection={"_id": 0, "user_id": 1, "product_id": 1, "action_type": 1},
+        batch_size=batch_size
+    )
+    
+    user_index = {}
+    product_index = {}
+    rows = array("i")
+    cols = array("i")
+    data = array("d")
+    
+    for doc in cursor:
+        user_idx = user_index.setdefault(doc["user_id"], len(user_index))
+        product_idx = product_index.setdefault(doc["product_id"], len(product_index))
+        
+        rows.append(user_idx)
+        cols.append(product_idx)
+        data.append(action_weights.get(doc.get("action_type"), default_weight))
+    
+    return (
+        list(user_index),
+        list(product_index),
+        np.frombuffer(rows, dtype=np.int32),
+        np.frombuffer(cols, dtype=np.int32),
+        np.frombuffer(data, dtype=np.float64)
+    )
+
 def get_all_users():
    
-    return db[COLLECTION_USER_ACTIVITY].distinct("user_id")
+    return get_db()[COLLECTION_USER_ACTIVITY].distinct("user_id")
 
-def get_all_products():
+def get_all_products(fields=None):
  
-    return list(db[COLLECTION_PRODUCTS].find())
+    return list(get_db()[COLLECTION_PRODUCTS].find({}, projection=_projection(fields)))
 
-def get_product_details(product_ids):
+def get_product_details(product_ids, fields=None):
   
     if not product_ids:
         return {}
     
-    products = db[COLLECTION_PRODUCTS].find({"product_id": {"$in": product_ids}})
+    products = get_db()[COLLECTION_PRODUCTS].find(
+        {"product_id": {"$in": product_ids}},
+        projection=_projection(fields, required=("product_id",))
+    )
     
  
     product_map = {}
@@ -124,4 +298,8 @@ def get_product_details(product_ids):
 
 def get_recommendations(user_id):
    
-    return db[COLLECTION_RECOMMENDATIONS].find_one({"user_id": user_id})
\ No newline at end of file
+    return get_db()[COLLECTION_RECOMMENDATIONS].find_one({"user_id": user_id})
+
+def get_recommendation_user_ids():
+    
+    return get_db()[COLLECTION_RECOMMENDATIONS].distinct("user_id")
\ No newline at end of file
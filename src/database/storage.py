@@ -0,0 +1,110 @@
+"""
+Data-access functions used by the models, ingestion and API.
+
+Each function forwards to the active storage backend, chosen by
+STORAGE_BACKEND ("mongo" or "memory") on first use or installed explicitly
+with set_backend().
+"""
+import threading
+
+from src.database.backends import MongoBackend, InMemoryBackend
+from src.config import STORAGE_BACKEND
+
+BACKENDS = {
+    "mongo": MongoBackend,
+    "memory": InMemoryBackend
+}
+
+# Field sets for callers that only need part of a document; pass as fields=
+INTERACTION_FIELDS = ("product_id", "action_type")
+PRODUCT_DISPLAY_FIELDS = ("product_id", "product_name", "category", "price")
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown storage backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend(STORAGE_BACKEND)
+    return _backend
+
+
+def set_backend(backend):
+    """Install backend for all storage calls; returns the previous one."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
+
+
+def init_db():
+    return get_backend().init_db()
+
+
+def insert_products(products):
+    return get_backend().insert_products(products)
+
+
+def insert_activity(activity):
+    return get_backend().insert_activity(activity)
+
+
+def insert_activities(activities, ordered=True):
+    return get_backend().insert_activities(activities, ordered=ordered)
+
+
+def save_recommendations(user_id, recommendations, top_k=None):
+    return get_backend().save_recommendations(user_id, recommendations, top_k=top_k)
+
+
+def save_recommendations_bulk(recommendations_by_user, top_k=None):
+    return get_backend().save_recommendations_bulk(recommendations_by_user, top_k=top_k)
+
+
+def get_user_activity(user_id=None, limit=None, fields=None, sort=True):
+    return get_backend().get_user_activity(user_id=user_id, limit=limit, fields=fields, sort=sort)
+
+
+def iter_activity_batches(fields=None, batch_size=10000):
+    return get_backend().iter_activity_batches(fields=fields, batch_size=batch_size)
+
+
+def get_last_activity_timestamp(user_id):
+    return get_backend().get_last_activity_timestamp(user_id)
+
+
+def get_users_activity(user_ids, fields=None, sort=True):
+    return get_backend().get_users_activity(user_ids, fields=fields, sort=sort)
+
+
+def load_interaction_arrays(action_weights, default_weight=1.0, batch_size=10000):
+    return get_backend().load_interaction_arrays(action_weights, default_weight, batch_size)
+
+
+def get_all_users():
+    return get_backend().get_all_users()
+
+
+def get_all_products(fields=None):
+    return get_backend().get_all_products(fields=fields)
+
+
+def get_product_details(product_ids, fields=None):
+    return get_backend().get_product_details(product_ids, fields=fields)
+
+
+def get_recommendations(user_id):
+    return get_backend().get_recommendations(user_id)
+
+
+def get_recommendation_user_ids():
+    return get_backend().get_recommendation_user_ids()
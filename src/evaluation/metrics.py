@@ -2,7 +2,7 @@
 import numpy as np
 from datetime import datetime
 
-from src.database.mongo_handler import get_user_activity, get_all_users, get_product_details
+from src.database.storage import get_user_activity, get_all_users, get_product_details
 from src.models.hybrid import HybridRecommender
 from src.config import PRECISION_K
 
@@ -23,7 +23,7 @@ def precision_at_k(actual, predicted, k):
 def category_precision_at_k(actual_ids, predicted_ids, k):
     
     all_ids = list(set(actual_ids + predicted_ids[:k]))
-    product_details = get_product_details(all_ids)
+    product_details = get_product_details(all_ids, fields=["category"])
     
     
     actual_categories = set()
@@ -50,7 +50,7 @@ def split_user_activities(test_size=0.2, action_type=None, min_activities=10):
     
     for user_id in user_ids:
         
-        activities = get_user_activity(user_id=user_id)
+        activities = get_user_activity(user_id=user_id, fields=["product_id", "action_type", "timestamp"], sort=False)
         
         
         if action_type:
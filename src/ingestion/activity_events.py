@@ -0,0 +1,40 @@
+"""
+In-process fan-out of newly ingested user activity.
+
+Ingestion points (POST /activity, StreamingService, the buffered activity
+writer) publish each activity after it has been written; caches and
+incremental models subscribe to it.
+
+Listeners only see activity ingested by their own process. With several API
+workers the others never hear of it, which is why the recommendation cache
+and live collaborative fold-in default to off there (see src.config).
+"""
+import threading
+
+_listeners = []
+_lock = threading.Lock()
+
+
+def subscribe(listener):
+    """Register a callable invoked with every published activity dict."""
+    with _lock:
+        if listener not in _listeners:
+            _listeners.append(listener)
+
+
+def unsubscribe(listener):
+    with _lock:
+        if listener in _listeners:
+            _listeners.remove(listener)
+
+
+def publish(activity):
+    """Deliver an activity to every listener; a failing listener never blocks the others."""
+    with _lock:
+        listeners = list(_listeners)
+    
+    for listener in listeners:
+        try:
+            listener(activity)
+        except Exception as e:
+            print(f"Error in activity listener {listener}: {e}")
@@ -0,0 +1,94 @@
+"""
+Incremental readers for activity and product files.
+
+Both line-delimited JSON (.ndjson / .jsonl, one object per line) and a
+regular JSON array are read in fixed-size chunks and yielded one object at a
+time, so memory use does not grow with the file size.
+"""
+import json
+
+from src.config import STREAM_READ_CHUNK_BYTES
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+def _iter_ndjson(f):
+    for line_number, line in enumerate(f, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}") from None
+
+
+def _iter_json_array(f, chunk_bytes):
+    """Yield the elements of a top-level JSON array, decoding one element at a time."""
+    buffer = ""
+    position = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between elements
+        while position < len(buffer) and buffer[position] in _WHITESPACE + ",":
+            position += 1
+
+        if not started and position < len(buffer):
+            if buffer[position] != "[":
+                raise ValueError("Expected a JSON array or line-delimited JSON")
+            started = True
+            position += 1
+            continue
+
+        if started and position < len(buffer) and buffer[position] == "]":
+            return
+
+        if position < len(buffer):
+            try:
+                item, end = _decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError("Truncated or invalid JSON array") from None
+            else:
+                # A value ending exactly at the buffer end (e.g. a number) may continue in the next chunk
+                if end < len(buffer) or eof:
+                    yield item
+                    position = end
+                    continue
+
+        if eof:
+            if not started:
+                return
+            raise ValueError("Unterminated JSON array")
+
+        # Need more input: drop what has been consumed and append the next chunk
+        chunk = f.read(chunk_bytes)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_json_records(path, chunk_bytes=STREAM_READ_CHUNK_BYTES):
+    """Yield records from path one at a time (NDJSON by suffix, else a JSON array)."""
+    with open(path, "r") as f:
+        if path.endswith(NDJSON_SUFFIXES):
+            yield from _iter_ndjson(f)
+        else:
+            yield from _iter_json_array(f, chunk_bytes)
+
+
+def iter_chunks(records, chunk_size):
+    """Group an iterable into lists of at most chunk_size items."""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
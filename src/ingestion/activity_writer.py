@@ -0,0 +1,198 @@
+"""
+Write-behind buffering of user activity.
+
+Producers (POST /activity, StreamingService) enqueue activities and return
+immediately; a background thread drains the queue and writes batches with a
+single unordered insert_many. A batch is flushed once it reaches flush_size
+events or flush_interval seconds after its first event, whichever comes first.
+Each successfully written batch is passed to on_written (the API publishes it
+to the activity listeners there), so dropped or failed events are never seen
+by the models.
+"""
+import queue
+import threading
+import time
+from datetime import datetime
+
+from src.database.storage import insert_activities
+from src.config import (
+    ACTIVITY_BUFFER_MAX_EVENTS, ACTIVITY_FLUSH_SIZE, ACTIVITY_FLUSH_INTERVAL_SECONDS, ACTIVITY_BUFFER_BLOCK_SECONDS
+)
+
+STOP_POLL_SECONDS = 0.1
+
+
+class BufferedActivityWriter:
+    """Bounded queue of activities flushed in batches by a background thread.
+
+    When the queue is full, submit() blocks for up to block_seconds
+    (backpressure) and then drops the event, counting it in metrics().
+    """
+
+    def __init__(self, writer=None, max_events=ACTIVITY_BUFFER_MAX_EVENTS, flush_size=ACTIVITY_FLUSH_SIZE,
+                 flush_interval=ACTIVITY_FLUSH_INTERVAL_SECONDS, block_seconds=ACTIVITY_BUFFER_BLOCK_SECONDS,
+                 on_written=None):
+        self.writer = writer or (lambda activities: insert_activities(activities, ordered=False))
+        self.on_written = on_written
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.block_seconds = block_seconds
+
+        self._queue = queue.Queue(maxsize=max_events)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.flushes = 0
+        self.last_flush_latency = None
+        self.max_flush_latency = 0.0
+        self._total_flush_latency = 0.0
+
+    @property
+    def is_running(self):
+        return bool(self._thread and self._thread.is_alive())
+
+    @property
+    def is_full(self):
+        return self._queue.full()
+
+    def submit(self, activity):
+        """Queue an activity for writing. Returns False if it was dropped."""
+        if self.try_submit(activity):
+            return True
+
+        try:
+            self._queue.put(activity, timeout=self.block_seconds)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def try_submit(self, activity):
+        """Queue an activity without blocking. Returns False if the queue is full; nothing is dropped then."""
+        if "timestamp" not in activity:
+            activity["timestamp"] = datetime.now().isoformat()
+
+        try:
+            self._queue.put_nowait(activity)
+        except queue.Full:
+            return False
+
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def _next_batch(self):
+        """Wait for the first event, then collect until flush_size or the flush window closes.
+        
+        Waits are capped at STOP_POLL_SECONDS so stop() is noticed promptly.
+        """
+        try:
+            batch = [self._queue.get(timeout=min(self.flush_interval, STOP_POLL_SECONDS))]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopped.is_set():
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=min(remaining, STOP_POLL_SECONDS)))
+                except queue.Empty:
+                    pass
+
+        return batch
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        try:
+            self.writer(batch)
+            ok = True
+        except Exception as e:
+            print(f"Error writing {len(batch)} buffered activities: {e}")
+            ok = False
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            self.flushes += 1
+            self.last_flush_latency = latency
+            self.max_flush_latency = max(self.max_flush_latency, latency)
+            self._total_flush_latency += latency
+            if ok:
+                self.written += len(batch)
+            else:
+                self.failed += len(batch)
+
+        if ok and self.on_written is not None:
+            try:
+                self.on_written(batch)
+            except Exception as e:
+                print(f"Error publishing {len(batch)} written activities: {e}")
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.flush_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+
+        self._drain()
+
+    def start(self):
+        if self.is_running:
+            return False
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="activity-writer")
+        self._thread.daemon = True
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=None):
+        """Stop the writer thread after flushing everything still queued."""
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        else:
+            self._drain()
+        return True
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "running": self.is_running,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "submitted": self.submitted,
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "flushes": self.flushes,
+                "last_flush_latency_ms": self.last_flush_latency * 1000 if self.last_flush_latency is not None else None,
+                "avg_flush_latency_ms": self._total_flush_latency / self.flushes * 1000 if self.flushes else None,
+                "max_flush_latency_ms": self.max_flush_latency * 1000
+            }
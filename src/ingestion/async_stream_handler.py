@@ -0,0 +1,335 @@
+"""
+Asyncio replay of the activity stream on the API's event loop.
+
+A reader task pulls activities from a StreamingService's source (its loaded
+list or an incremental file reader) on the database executor and routes them
+by user to one of several ReplayStream tasks through bounded queues. Every
+stream paces its activities against the same simulated clock, groups them
+into batch_window buckets and writes each bucket with one bulk insert on the
+executor. stop() is cooperative: streams finish the write in flight, flush
+(or drop) what they have buffered, and stop() returns once all have exited.
+
+Like StreamingService's batched replay, the bulk inserts bypass the buffered
+activity writer, and activities are published only once they are written.
+"""
+import asyncio
+import time
+import zlib
+from datetime import datetime
+from itertools import islice
+
+from src.database.storage import insert_activities
+from src.database.async_handler import run_in_db_executor
+from src.ingestion.activity_events import publish as publish_activity
+from src.config import (
+    STREAM_SHARDS, STREAM_SHARD_QUEUE_SIZE, STREAM_READ_BATCH, STREAM_BATCH_WINDOW_SECONDS, STREAM_BATCH_MAX_EVENTS
+)
+
+
+def shard_for_user(user_id, shards):
+    """Stable shard index for user_id; unlike hash() it is the same in every process."""
+    return zlib.crc32(str(user_id).encode()) % shards
+
+
+def _write_batch(batch):
+    """Stamp, bulk insert and publish a batch; runs on the executor.
+    
+    Returns the number of activities written: the batch size, or 0 when the
+    insert failed and nothing was published.
+    """
+    ingestion_timestamp = datetime.now().isoformat()
+    activities = [dict(activity, ingestion_timestamp=ingestion_timestamp) for activity in batch]
+    try:
+        written = insert_activities(activities, ordered=False)
+    except Exception as e:
+        print(f"Error inserting {len(activities)} activities: {e}")
+        written = False
+    
+    if not written:
+        return 0
+    for activity in activities:
+        publish_activity(activity)
+    return len(activities)
+
+
+class ReplayStream:
+    """Progress of one shard of an asynchronous replay."""
+
+    def __init__(self, shard):
+        self.shard = shard
+        self.state = "pending"
+        self.events = 0
+        self.batches = 0
+        self.dropped_events = 0
+        self.simulated_timestamp = None
+        self.lag_seconds = None
+        self.max_lag_seconds = 0.0
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+
+    def record_batch(self, count, batch_timestamp, lag):
+        self.events += count
+        self.batches += 1
+        self.simulated_timestamp = batch_timestamp.isoformat()
+        if lag is not None:
+            self.lag_seconds = lag
+            self.max_lag_seconds = max(self.max_lag_seconds, lag)
+
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def status(self):
+        elapsed = self.elapsed()
+        return {
+            "shard": self.shard,
+            "state": self.state,
+            "events": self.events,
+            "batches": self.batches,
+            "dropped_events": self.dropped_events,
+            "elapsed_seconds": elapsed,
+            "events_per_second": self.events / elapsed if elapsed > 0 else None,
+            "simulated_timestamp": self.simulated_timestamp,
+            "lag_seconds": self.lag_seconds,
+            "max_lag_seconds": self.max_lag_seconds,
+            "error": self.error
+        }
+
+
+class AsyncStreamingService:
+    """Replays a StreamingService's activities as concurrent asyncio streams sharded by user.
+
+    Must be started and stopped from the event loop it runs on. A speed factor
+    of 0 replays as fast as possible.
+    """
+
+    def __init__(self, source, shards=STREAM_SHARDS, batch_window=STREAM_BATCH_WINDOW_SECONDS,
+                 batch_max_events=STREAM_BATCH_MAX_EVENTS, queue_size=STREAM_SHARD_QUEUE_SIZE,
+                 read_batch=STREAM_READ_BATCH):
+        self.source = source
+        self.shards = shards
+        self.batch_window = batch_window
+        self.batch_max_events = batch_max_events
+        self.queue_size = queue_size
+        self.read_batch = read_batch
+
+        self.speed_factor = None
+        self.streams = []
+        self.out_of_order_activities = 0
+        self.read_error = None
+
+        self._queues = []
+        self._tasks = []
+        self._reader = None
+        self._stop_event = None
+        self._drain = True
+        self._started_at = None
+        self._first_timestamp = None
+        self._last_timestamp = None
+
+    @property
+    def running(self):
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self, speed_factor=100, shards=None):
+        """Start the replay; raises ValueError if shards is less than 1."""
+        shards = self.shards if shards is None else shards
+        if shards < 1:
+            raise ValueError(f"shards must be at least 1, got {shards}")
+
+        if self.running:
+            print("Async streaming is already running.")
+            return False
+
+        if not self.source.incremental and not self.source.activities:
+            if not await run_in_db_executor(self.source.load_data):
+                return False
+
+        self.speed_factor = speed_factor
+        self.out_of_order_activities = 0
+        self.read_error = None
+        self._stop_event = asyncio.Event()
+        self._drain = True
+        self._first_timestamp = None
+        self._last_timestamp = None
+        self._started_at = time.perf_counter()
+
+        self.streams = [ReplayStream(shard) for shard in range(shards)]
+        self._queues = [asyncio.Queue(maxsize=self.queue_size) for _ in range(shards)]
+        self._reader = asyncio.create_task(self._read())
+        self._tasks = [
+            asyncio.create_task(self._run_stream(stream, queue))
+            for stream, queue in zip(self.streams, self._queues)
+        ]
+
+        print(f"Started {shards} async replay streams with speed factor {speed_factor}x.")
+        return True
+
+    async def wait(self):
+        """Wait for every stream to finish without stopping them."""
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def stop(self, drain=True, timeout=None):
+        """Stop all streams and wait for them to exit.
+
+        A write already in flight always completes. With drain=True every
+        stream also writes the activities it has buffered but not sent yet.
+        Returns False if nothing was running or if timeout expired first, in
+        which case the remaining streams are cancelled.
+        """
+        if not self.running:
+            print("Async streaming is not running.")
+            return False
+
+        self._drain = drain
+        self._stop_event.set()
+        self._reader.cancel()
+        for queue in self._queues:
+            # Wakes a stream blocked on an empty queue; one with a full queue sees the stop flag
+            try:
+                queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+
+        _, pending = await asyncio.wait(self._tasks + [self._reader], timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        print("Async streaming stopped.")
+        return not pending
+
+    def _read_batch(self, iterator):
+        """Next read_batch activities as (activity, timestamp, due); runs on the executor."""
+        items = []
+        for activity in islice(iterator, self.read_batch):
+            timestamp = datetime.fromisoformat(activity["timestamp"])
+
+            # Input is assumed sorted; late events are sent immediately and counted
+            if self._last_timestamp and timestamp < self._last_timestamp:
+                self.out_of_order_activities += 1
+                timestamp = self._last_timestamp
+            if self._first_timestamp is None:
+                self._first_timestamp = timestamp
+            self._last_timestamp = timestamp
+
+            due = None
+            if self.speed_factor > 0:
+                due = (timestamp - self._first_timestamp).total_seconds() / self.speed_factor
+            items.append((activity, timestamp, due))
+        return items
+
+    async def _read(self):
+        try:
+            iterator = iter(self.source.activity_source())
+            while not self._stop_event.is_set():
+                items = await run_in_db_executor(self._read_batch, iterator)
+                if not items:
+                    break
+                for item in items:
+                    await self._queues[shard_for_user(item[0]["user_id"], len(self._queues))].put(item)
+        except Exception as e:
+            print(f"Error reading activities: {e}")
+            self.read_error = str(e)
+
+        for queue in self._queues:
+            await queue.put(None)
+
+    async def _wait_until(self, due):
+        """Sleep until due seconds into the replay; False if stopped first."""
+        if due is not None:
+            delay = self._started_at + due - time.perf_counter()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        return not self._stop_event.is_set()
+
+    async def _flush(self, stream, batch, batch_timestamp, due):
+        count = await run_in_db_executor(_write_batch, batch)
+        if not count:
+            stream.dropped_events += len(batch)
+            return
+
+        lag = time.perf_counter() - self._started_at - due if due is not None else None
+        stream.record_batch(count, batch_timestamp, lag)
+
+    async def _run_stream(self, stream, queue):
+        stream.state = "running"
+        stream.started_at = time.perf_counter()
+        batch = []
+        batch_bucket = batch_due = batch_timestamp = None
+
+        try:
+            while True:
+                # Nothing else queued for this shard: send what is buffered once it is due
+                if batch and queue.empty():
+                    if not await self._wait_until(batch_due):
+                        break
+                    await self._flush(stream, batch, batch_timestamp, batch_due)
+                    batch = []
+
+                item = await queue.get()
+                if item is None:
+                    break
+
+                activity, timestamp, due = item
+                if self._stop_event.is_set():
+                    # Already taken off the queue: keep it for the final drain
+                    if self._drain:
+                        batch.append(activity)
+                        batch_due, batch_timestamp = due, timestamp
+                    break
+
+                bucket = int(due // self.batch_window) if due is not None else None
+                if batch and (bucket != batch_bucket or len(batch) >= self.batch_max_events):
+                    if not await self._wait_until(batch_due):
+                        break
+                    await self._flush(stream, batch, batch_timestamp, batch_due)
+                    batch = []
+
+                batch.append(activity)
+                batch_bucket, batch_due, batch_timestamp = bucket, due, timestamp
+
+            # At the end of input wait for the last batch; when stopped, drain it right away
+            if batch and (await self._wait_until(batch_due) or self._drain):
+                await self._flush(stream, batch, batch_timestamp, batch_due)
+
+            stream.state = "stopped" if self._stop_event.is_set() else "completed"
+        except asyncio.CancelledError:
+            stream.state = "cancelled"
+            raise
+        except Exception as e:
+            print(f"Error in replay stream {stream.shard}: {e}")
+            stream.state = "failed"
+            stream.error = str(e)
+            # Keep consuming so the reader is never blocked on this shard's queue
+            while not self._stop_event.is_set() and await queue.get() is not None:
+                pass
+        finally:
+            stream.finished_at = time.perf_counter()
+
+    def status(self):
+        """Overall and per-stream progress: events sent, events/s and lag behind simulated time."""
+        streams = [stream.status() for stream in self.streams]
+        events = sum(stream["events"] for stream in streams)
+        elapsed = max((stream.elapsed() for stream in self.streams), default=0.0)
+
+        return {
+            "running": self.running,
+            "speed_factor": self.speed_factor,
+            "shards": len(self.streams),
+            "events": events,
+            "dropped_events": sum(stream["dropped_events"] for stream in streams),
+            "elapsed_seconds": elapsed,
+            "events_per_second": events / elapsed if elapsed > 0 else None,
+            "max_lag_seconds": max((stream["max_lag_seconds"] for stream in streams), default=0.0),
+            "out_of_order_activities": self.out_of_order_activities,
+            "read_error": self.read_error,
+            "streams": streams
+        }
@@ -5,21 +5,74 @@ import threading
 import random
 from datetime import datetime
 
-from src.database.mongo_handler import insert_activity, insert_products
+from src.database.storage import insert_activity, insert_activities, insert_products
+from src.ingestion.activity_events import publish as publish_activity
+from src.ingestion.activity_reader import iter_json_records, iter_chunks
+from src.config import (
+    STREAM_LOAD_MODE, STREAM_REPLAY_MODE, STREAM_BATCH_WINDOW_SECONDS, STREAM_BATCH_MAX_EVENTS,
+    PRODUCT_SYNC_CHUNK_SIZE
+)
+
+REPLAY_MODES = ("event", "batched")
+
+# Longest single sleep while pacing a batched replay, so stop_streaming is not held up
+STOP_POLL_SECONDS = 0.1
 
 class StreamingService:
-    """Simulates streaming user activity data."""
+    """Simulates streaming user activity data.
+    
+    In "memory" load mode the activity file is loaded and sorted once by
+    load_data. In "incremental" mode nothing is kept in memory: each replay
+    reads the file record by record (NDJSON or a JSON array) and expects it
+    to be sorted by timestamp already.
+    
+    The "event" replay mode sleeps before every activity and inserts it on
+    its own. The "batched" mode maps each activity to the wall-clock time it
+    is due at, groups activities into batch_window buckets and writes each
+    bucket with a single bulk insert; with speed_factor 0 it does not sleep
+    at all. Both modes track how far the replay lags behind simulated time.
     
-    def __init__(self, activity_file="data/user_activity.json", product_file="data/product_catalog.json"):
+    Batched replay inserts directly even when an activity_writer is running:
+    its buckets already are bulk writes, and queueing them event by event
+    would only split them up again. Activities are published only once
+    they are written: by the replay after a direct insert, or by the
+    activity_writer (its on_written callback) after it flushes them.
+    """
+    
+    def __init__(self, activity_file="data/user_activity.json", product_file="data/product_catalog.json",
+                 activity_writer=None, load_mode=STREAM_LOAD_MODE, replay_mode=STREAM_REPLAY_MODE,
+                 batch_window=STREAM_BATCH_WINDOW_SECONDS, batch_max_events=STREAM_BATCH_MAX_EVENTS):
         self.activity_file = activity_file
         self.product_file = product_file
+        self.activity_writer = activity_writer
+        self.load_mode = load_mode
+        self.replay_mode = replay_mode
+        self.batch_window = batch_window
+        self.batch_max_events = batch_max_events
         self.activities = []
+        self.out_of_order_activities = 0
         self.streaming = False
         self.stream_thread = None
+        
+        self._stats_lock = threading.Lock()
+        self._stats = self._new_stats(replay_mode, None)
+    
+    @property
+    def incremental(self):
+        return self.load_mode == "incremental"
     
     def load_data(self):
     
         try:
+            if self.incremental:
+                num_products = 0
+                for products in iter_chunks(iter_json_records(self.product_file), PRODUCT_SYNC_CHUNK_SIZE):
+                    insert_products(products)
+                    num_products += len(products)
+                print(f"Loaded {num_products} products.")
+                print(f"Activities will be streamed incrementally from {self.activity_file}.")
+                return True
+            
             with open(self.product_file, "r") as f:
                 products = json.load(f)
                 insert_products(products)
@@ -29,30 +82,132 @@ class StreamingService:
                 self.activities = json.load(f)
                 print(f"Loaded {len(self.activities)} user activities.")
             
+            # Sort once here rather than on every replay
+            self.activities.sort(key=lambda x: x["timestamp"])
+            
             return True
         except Exception as e:
             print(f"Error loading data: {e}")
             return False
     
-    def _stream_activities(self, speed_factor=10):
+    def activity_source(self):
+        """Activities in timestamp order: the loaded list, or a fresh reader over the file."""
+        if self.incremental:
+            return iter_json_records(self.activity_file)
+        return self.activities
+    
+    def _new_stats(self, replay_mode, speed_factor):
+        return {
+            "replay_mode": replay_mode,
+            "speed_factor": speed_factor,
+            "events": 0,
+            "batches": 0,
+            "started_at": None,
+            "finished_at": None,
+            "simulated_timestamp": None,
+            "lag_seconds": None,
+            "max_lag_seconds": 0.0,
+            "dropped_events": 0
+        }
+    
+    def _record_sent(self, count, activity_timestamp, due):
+        """Count a write of count activities; due is the wall-clock offset (None when unpaced)."""
+        with self._stats_lock:
+            stats = self._stats
+            stats["events"] += count
+            stats["batches"] += 1
+            stats["simulated_timestamp"] = activity_timestamp.isoformat()
+            if due is not None:
+                lag = time.perf_counter() - stats["started_at"] - due
+                stats["lag_seconds"] = lag
+                stats["max_lag_seconds"] = max(stats["max_lag_seconds"], lag)
+    
+    def _record_dropped(self, count):
+        """Count activities that were not written and so were not published."""
+        with self._stats_lock:
+            self._stats["dropped_events"] += count
+    
+    def replay_stats(self):
+        """Progress of the current or last replay: events sent, sustained events/s and lag."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        
+        if stats["started_at"] is not None:
+            end = stats["finished_at"] if stats["finished_at"] is not None else time.perf_counter()
+            elapsed = end - stats["started_at"]
+            stats["elapsed_seconds"] = elapsed
+            stats["events_per_second"] = stats["events"] / elapsed if elapsed > 0 else None
+        else:
+            stats["elapsed_seconds"] = 0.0
+            stats["events_per_second"] = None
+        
+        del stats["started_at"], stats["finished_at"]
+        stats["streaming"] = self.streaming
+        stats["out_of_order_activities"] = self.out_of_order_activities
+        return stats
+    
+    def _iter_timed_activities(self):
+        """Yield (activity, timestamp), clamping late activities to the previous timestamp."""
+        prev_timestamp = None
+        for activity in self.activity_source():
+            curr_timestamp = datetime.fromisoformat(activity["timestamp"])
+            
+            # Incremental input is assumed sorted; late events are sent immediately and counted
+            if prev_timestamp and curr_timestamp < prev_timestamp:
+                self.out_of_order_activities += 1
+                curr_timestamp = prev_timestamp
+            
+            yield activity, curr_timestamp
+            prev_timestamp = curr_timestamp
+    
+    def _stream_activities(self, speed_factor=10, replay_mode=None):
  
-        if not self.activities:
+        if not self.incremental and not self.activities:
             print("No activities to stream.")
+            self.streaming = False
             return
         
-        print(f"Starting streaming with speed factor {speed_factor}x...")
+        replay_mode = replay_mode or self.replay_mode
+        if speed_factor <= 0:
+            replay_mode = "batched"
+        
+        with self._stats_lock:
+            self._stats = self._new_stats(replay_mode, speed_factor)
+            self._stats["started_at"] = time.perf_counter()
+        self.out_of_order_activities = 0
         
-     
-        self.activities.sort(key=lambda x: x["timestamp"])
+        if speed_factor > 0:
+            print(f"Starting {replay_mode} streaming with speed factor {speed_factor}x...")
+        else:
+            print("Starting batched streaming as fast as possible...")
+        
+        try:
+            if replay_mode == "batched":
+                self._replay_batched(speed_factor)
+            else:
+                self._replay_events(speed_factor)
+        finally:
+            with self._stats_lock:
+                self._stats["finished_at"] = time.perf_counter()
+            self.streaming = False
         
+        stats = self.replay_stats()
+        if self.out_of_order_activities:
+            print(f"Warning: {self.out_of_order_activities} activities were out of timestamp order.")
+        print(f"Streaming completed: {stats['events']} activities in {stats['elapsed_seconds']:.2f}s, "
+              f"max lag {stats['max_lag_seconds']:.2f}s, {stats['dropped_events']} dropped.")
+    
+    def _replay_events(self, speed_factor):
+        
+        first_timestamp = None
         prev_timestamp = None
         
-        for activity in self.activities:
+        for activity, curr_timestamp in self._iter_timed_activities():
             if not self.streaming:
                 break
             
-            curr_timestamp = datetime.fromisoformat(activity["timestamp"])
-            
+            if first_timestamp is None:
+                first_timestamp = curr_timestamp
     
             if prev_timestamp:
                 time_diff = (curr_timestamp - prev_timestamp).total_seconds()
@@ -64,31 +219,125 @@ class StreamingService:
             
             activity_copy = activity.copy()
             activity_copy["ingestion_timestamp"] = datetime.now().isoformat()
-            insert_activity(activity_copy)
+            buffered = self._uses_writer()
+            # Listeners (interaction store, fold-in, co-occurrence) must only see stored activity
+            if not self._write_activity(activity_copy, buffered):
+                self._record_dropped(1)
+                prev_timestamp = curr_timestamp
+                continue
+            if not buffered:
+                publish_activity(activity_copy)
             
        
             if random.random() < 0.01:  
                 print(f"Ingested: {activity_copy}")
             
+            due = (curr_timestamp - first_timestamp).total_seconds() / speed_factor
+            self._record_sent(1, curr_timestamp, due)
             prev_timestamp = curr_timestamp
+    
+    def _replay_batched(self, speed_factor):
         
-        self.streaming = False
-        print("Streaming completed.")
+        paced = speed_factor > 0
+        first_timestamp = None
+        batch = []
+        batch_bucket = None
+        batch_due = None
+        batch_timestamp = None
+        
+        for activity, curr_timestamp in self._iter_timed_activities():
+            if not self.streaming:
+                return
+            
+            if first_timestamp is None:
+                first_timestamp = curr_timestamp
+            
+            due = (curr_timestamp - first_timestamp).total_seconds() / speed_factor if paced else None
+            bucket = int(due // self.batch_window) if paced else None
+            
+            if batch and (bucket != batch_bucket or len(batch) >= self.batch_max_events):
+                if not self._flush_batch(batch, batch_timestamp, batch_due):
+                    return
+                batch = []
+            
+            batch.append(activity)
+            batch_bucket = bucket
+            batch_due = due
+            batch_timestamp = curr_timestamp
+        
+        if batch and self.streaming:
+            self._flush_batch(batch, batch_timestamp, batch_due)
+    
+    def _flush_batch(self, batch, batch_timestamp, due):
+        """Wait until the batch's last activity is due, then bulk insert and publish it.
+        
+        The insert bypasses activity_writer (see the class docstring). A batch
+        that fails to insert is counted as dropped and not published.
+        Returns False if streaming was stopped while waiting.
+        """
+        if due is not None:
+            with self._stats_lock:
+                started_at = self._stats["started_at"]
+            while True:
+                remaining = started_at + due - time.perf_counter()
+                if remaining <= 0:
+                    break
+                if not self.streaming:
+                    return False
+                time.sleep(min(remaining, STOP_POLL_SECONDS))
+        
+        ingestion_timestamp = datetime.now().isoformat()
+        activities = [dict(activity, ingestion_timestamp=ingestion_timestamp) for activity in batch]
+        try:
+            written = insert_activities(activities, ordered=False)
+        except Exception as e:
+            print(f"Error inserting {len(activities)} activities: {e}")
+            written = False
+        
+        if not written:
+            self._record_dropped(len(activities))
+            return True
+        
+        for activity in activities:
+            publish_activity(activity)
+        
+        self._record_sent(len(activities), batch_timestamp, due)
+        return True
+    
+    def _uses_writer(self):
+        return self.activity_writer is not None and self.activity_writer.is_running
     
-    def start_streaming(self, speed_factor=10):
+    def _write_activity(self, activity, buffered):
+        """Queue the activity on the buffered writer (which publishes it once flushed), else insert directly.
+        
+        Returns False if the writer dropped it or the insert failed.
+        """
+        if buffered:
+            return self.activity_writer.submit(activity)
+        try:
+            return insert_activity(activity)
+        except Exception as e:
+            print(f"Error inserting activity: {e}")
+            return False
+    
+    def start_streaming(self, speed_factor=10, replay_mode=None):
        
         if self.streaming:
             print("Streaming is already running.")
             return False
         
-        if not self.activities:
+        if replay_mode is not None and replay_mode not in REPLAY_MODES:
+            print(f"Unknown replay mode {replay_mode!r}, expected one of {REPLAY_MODES}.")
+            return False
+        
+        if not self.incremental and not self.activities:
             if not self.load_data():
                 return False
         
         self.streaming = True
         self.stream_thread = threading.Thread(
             target=self._stream_activities,
-            args=(speed_factor,)
+            args=(speed_factor, replay_mode)
         )
         self.stream_thread.daemon = True
         self.stream_thread.start()
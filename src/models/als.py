@@ -0,0 +1,144 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from src.models.collaborative import CollaborativeFilteringRecommender
+from src.config import (
+    ALS_ITERATIONS, ALS_REGULARIZATION, ALS_ALPHA, ALS_CG_STEPS, ALS_BLOCK_SIZE, ALS_NUM_THREADS
+)
+
+
+class ImplicitALSRecommender(CollaborativeFilteringRecommender):
+    """Implicit-feedback alternating least squares (Hu, Koren & Volinsky).
+    
+    Interaction weights become confidences c = 1 + alpha * r on a binary
+    preference. Each half-step solves every row's regularized least-squares
+    system with a few warm-started conjugate-gradient steps, vectorized over
+    blocks of rows and run on a thread pool, so an iteration costs
+    O(nnz * factors + rows * factors^2).
+    """
+    
+    score_scale = 1.0
+    
+    def __init__(self, num_factors=20, iterations=ALS_ITERATIONS, regularization=ALS_REGULARIZATION,
+                 alpha=ALS_ALPHA, cg_steps=ALS_CG_STEPS, block_size=ALS_BLOCK_SIZE,
+                 num_threads=ALS_NUM_THREADS, random_state=42, **kwargs):
+        super().__init__(num_factors=num_factors, **kwargs)
+        self.iterations = iterations
+        self.regularization = regularization
+        self.alpha = alpha
+        self.cg_steps = cg_steps
+        self.block_size = block_size
+        self.num_threads = num_threads
+        self.random_state = random_state
+        # (item_factors, F'F + reg I) for fold-in, replaced as one tuple
+        self._fold_in_basis = None
+    
+    def _persisted_params(self):
+        params = super()._persisted_params()
+        params.update({
+            "iterations": self.iterations,
+            "regularization": self.regularization,
+            "alpha": self.alpha,
+            "cg_steps": self.cg_steps
+        })
+        return params
+    
+    def _fit(self, matrix):
+        user_items = matrix.tocsr().astype(np.float64)
+        item_users = user_items.T.tocsr()
+        
+        rng = np.random.default_rng(self.random_state)
+        num_users, num_items = user_items.shape
+        users = rng.normal(scale=0.01, size=(num_users, self.num_factors))
+        items = rng.normal(scale=0.01, size=(num_items, self.num_factors))
+        
+        with ThreadPoolExecutor(max_workers=self.num_threads, thread_name_prefix="als") as executor:
+            for _ in range(self.iterations):
+                self._update_factors(executor, user_items, users, items)
+                self._update_factors(executor, item_users, items, users)
+        
+        self.global_mean = 0
+        self.user_factors = users
+        self.item_factors = items
+        self.sigma = None
+    
+    def _update_factors(self, executor, interactions, target, fixed):
+        """Re-solve every row of target against the fixed factors, block by block."""
+        gram = fixed.T @ fixed
+        futures = [
+            executor.submit(self._solve_block, interactions, target, fixed, gram, start,
+                            min(start + self.block_size, interactions.shape[0]))
+            for start in range(0, interactions.shape[0], self.block_size)
+        ]
+        for future in futures:
+            future.result()
+    
+    def _solve_block(self, interactions, target, fixed, gram, start, end):
+        """Batched conjugate gradient for rows start:end, warm-started from target.
+        
+        For row u: (F'F + F' (C_u - I) F + reg I) x_u = F' C_u p_u, where only
+        the row's stored entries contribute to the sparse correction terms.
+        """
+        indptr = interactions.indptr[start:end + 1]
+        offset = indptr[0]
+        columns = interactions.indices[offset:indptr[-1]]
+        confidence = 1.0 + self.alpha * interactions.data[offset:indptr[-1]]
+        num_rows = end - start
+        
+        # Segment-sum operator mapping each stored entry to its row; its data
+        # is overwritten with per-entry weights before each product
+        weighted = csr_matrix(
+            (np.ones(len(columns)), np.arange(len(columns)), indptr - offset),
+            shape=(num_rows, len(columns))
+        )
+        row_of_entry = np.repeat(np.arange(num_rows), np.diff(indptr))
+        neighbors = fixed[columns]
+        
+        def apply(vectors):
+            weighted.data = (confidence - 1.0) * np.einsum("ij,ij->i", neighbors, vectors[row_of_entry])
+            return vectors @ gram + self.regularization * vectors + weighted @ neighbors
+        
+        x = target[start:end]
+        weighted.data = confidence
+        residual = weighted @ neighbors - apply(x)
+        direction = residual.copy()
+        rs_old = np.einsum("ij,ij->i", residual, residual)
+        
+        for _ in range(self.cg_steps):
+            applied = apply(direction)
+            denominator = np.einsum("ij,ij->i", direction, applied)
+            step = np.divide(rs_old, denominator, out=np.zeros_like(rs_old), where=denominator > 1e-20)
+            x += step[:, None] * direction
+            residual -= step[:, None] * applied
+            rs_new = np.einsum("ij,ij->i", residual, residual)
+            ratio = np.divide(rs_new, rs_old, out=np.zeros_like(rs_new), where=rs_old > 1e-20)
+            direction = residual + ratio[:, None] * direction
+            rs_old = rs_new
+        
+        target[start:end] = x
+    
+    def _prepare_fold_in(self):
+        items = self.item_factors
+        self._fold_in_basis = (items, items.T @ items + self.regularization * np.eye(items.shape[1]))
+        return self._fold_in_basis
+    
+    def _project(self, product_weights):
+        """Exact least-squares fold-in of one row against the fixed item factors.
+        
+        Only the row's own entries are computed per call; the Gram matrix
+        comes from _prepare_fold_in.
+        """
+        indices = np.fromiter(product_weights.keys(), dtype=np.intp, count=len(product_weights))
+        weights = np.fromiter(product_weights.values(), dtype=np.float64, count=len(product_weights))
+        
+        basis = self._fold_in_basis
+        if basis is None or basis[0] is not self.item_factors:
+            basis = self._prepare_fold_in()
+        items, gram = basis
+        
+        neighbors = items[indices]
+        confidence = 1.0 + self.alpha * weights
+        system = gram + (neighbors.T * (confidence - 1.0)) @ neighbors
+        return np.linalg.solve(system, neighbors.T @ confidence)
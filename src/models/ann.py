@@ -0,0 +1,132 @@
+"""
+Approximate maximum-inner-product retrieval over item factors.
+
+IVFIndex partitions the items with k-means (the coarse quantizer) and keeps
+one inverted list of item indices per centroid. A query scores the centroids,
+then exactly scores only the items in its nprobe best lists, so per-request
+work drops from n_items to roughly n_items * nprobe / nlist. Raising nprobe
+trades latency for recall.
+"""
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from src.models.ranking import top_k_indices
+from src.config import COLLAB_IVF_NPROBE, COLLAB_IVF_KMEANS_ITERATIONS, COLLAB_IVF_SAMPLE_PER_LIST
+
+ASSIGN_BLOCK_SIZE = 65536
+
+
+def _assign(vectors, centroids):
+    """Nearest centroid (squared L2) for each vector, computed in blocks."""
+    half_norms = 0.5 * np.einsum("ij,ij->i", centroids, centroids)
+    assignments = np.empty(len(vectors), dtype=np.intp)
+
+    for start in range(0, len(vectors), ASSIGN_BLOCK_SIZE):
+        block = vectors[start:start + ASSIGN_BLOCK_SIZE]
+        # argmin ||x - c||^2 == argmax (x.c - ||c||^2 / 2)
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T - half_norms, axis=1)
+
+    return assignments
+
+
+def _kmeans(vectors, nlist, iterations, rng):
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        membership = csr_matrix(
+            (np.ones(len(vectors)), (assignments, np.arange(len(vectors)))),
+            shape=(nlist, len(vectors))
+        )
+        counts = np.asarray(membership.sum(axis=1)).ravel()
+        sums = membership @ vectors
+
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+
+        # Re-seed empty clusters with random points so every list stays usable
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file index: k-means centroids plus per-centroid item lists (CSR layout)."""
+
+    def __init__(self, centroids, list_indptr, list_items):
+        self.centroids = centroids
+        self.list_indptr = list_indptr
+        self.list_items = list_items
+
+    @property
+    def nlist(self):
+        return self.centroids.shape[0]
+
+    @classmethod
+    def build(cls, item_factors, nlist=None, iterations=COLLAB_IVF_KMEANS_ITERATIONS,
+              sample_per_list=COLLAB_IVF_SAMPLE_PER_LIST, random_state=42):
+        """Cluster item_factors into nlist lists (default sqrt(n_items)).
+
+        k-means runs on a sample of at most sample_per_list points per list;
+        every item is then assigned to its nearest centroid.
+        """
+        item_factors = np.asarray(item_factors, dtype=np.float64)
+        num_items = item_factors.shape[0]
+        nlist = int(nlist or max(1, round(np.sqrt(num_items))))
+        nlist = max(1, min(nlist, num_items))
+
+        rng = np.random.default_rng(random_state)
+        if num_items > nlist * sample_per_list:
+            sample = item_factors[rng.choice(num_items, nlist * sample_per_list, replace=False)]
+        else:
+            sample = item_factors
+
+        centroids = _kmeans(sample, nlist, iterations, rng)
+        assignments = _assign(item_factors, centroids)
+
+        list_items = np.argsort(assignments, kind="stable").astype(np.int64)
+        list_indptr = np.zeros(nlist + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignments, minlength=nlist), out=list_indptr[1:])
+
+        return cls(centroids, list_indptr, list_items)
+
+    def _probe(self, query_vectors, nprobe):
+        """Indices of the nprobe highest inner-product centroids per query."""
+        centroid_scores = query_vectors @ self.centroids.T
+        nprobe = min(nprobe, self.nlist)
+        if nprobe == self.nlist:
+            return np.broadcast_to(np.arange(self.nlist), centroid_scores.shape)
+        return np.argpartition(centroid_scores, self.nlist - nprobe, axis=1)[:, self.nlist - nprobe:]
+
+    def search(self, item_factors, query_vectors, seen_indices, top_k, nprobe=COLLAB_IVF_NPROBE):
+        """Approximate top-k items by inner product for each query.
+
+        Items in seen_indices[row] are excluded. Returns one
+        (item_indices, scores) pair per query, best first.
+        """
+        results = []
+        for query, lists, seen in zip(query_vectors, self._probe(query_vectors, nprobe), seen_indices):
+            candidates = np.concatenate([
+                self.list_items[self.list_indptr[l]:self.list_indptr[l + 1]] for l in lists
+            ])
+            if len(seen):
+                candidates = candidates[~np.isin(candidates, seen)]
+
+            scores = item_factors[candidates] @ query
+            top = top_k_indices(scores, top_k)
+            results.append((candidates[top], scores[top]))
+
+        return results
+
+    def arrays(self):
+        return {
+            "centroids": self.centroids,
+            "list_indptr": self.list_indptr,
+            "list_items": self.list_items
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["centroids"], arrays["list_indptr"], arrays["list_items"])
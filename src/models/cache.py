@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from src.config import RECOMMENDATION_CACHE_SIZE, RECOMMENDATION_CACHE_TTL_SECONDS
+
+
+class RecommendationCache:
+    """Bounded LRU cache of formatted recommendations keyed by (user_id, top_k).
+    
+    Entries expire after ttl_seconds and all entries of a user can be dropped
+    at once when new activity for that user arrives.
+    
+    A result computed while the user was being invalidated must not be
+    cached. Callers read generation(user_id) before computing and pass it
+    to put(), which skips the write if the user was invalidated since. The
+    invalidation counters of the max_size most recently invalidated users
+    are kept; for older users, put() compares against the newest counter
+    that was dropped.
+    """
+    
+    def __init__(self, max_size=RECOMMENDATION_CACHE_SIZE, ttl_seconds=RECOMMENDATION_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._keys_by_user = defaultdict(set)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+        # Invalidation clock, and the clock value at each user's latest invalidation
+        self._clock = 0
+        self._invalidated_at = OrderedDict()
+        self._invalidated_floor = 0
+    
+    def get(self, user_id, top_k):
+        key = (user_id, top_k)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def generation(self, user_id):
+        """Token to pass to put() for a result computed from now on."""
+        with self._lock:
+            return self._clock
+    
+    def put(self, user_id, top_k, value, generation=None):
+        """Cache value; skipped (returns False) if user_id was invalidated after generation."""
+        key = (user_id, top_k)
+        with self._lock:
+            if generation is not None:
+                invalidated_at = self._invalidated_at.get(user_id, self._invalidated_floor)
+                if invalidated_at > generation:
+                    self.stale_puts += 1
+                    return False
+            
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            self._keys_by_user[user_id].add(top_k)
+            
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+    
+    def invalidate_user(self, user_id):
+        """Drop every cached entry for user_id. Returns the number removed."""
+        with self._lock:
+            self._clock += 1
+            self._invalidated_at[user_id] = self._clock
+            self._invalidated_at.move_to_end(user_id)
+            if len(self._invalidated_at) > self.max_size:
+                _, self._invalidated_floor = self._invalidated_at.popitem(last=False)
+            
+            top_ks = self._keys_by_user.pop(user_id, ())
+            for top_k in top_ks:
+                self._entries.pop((user_id, top_k), None)
+            self.invalidations += len(top_ks)
+            return len(top_ks)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+    
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        user_id, top_k = key
+        top_ks = self._keys_by_user.get(user_id)
+        if top_ks is not None:
+            top_ks.discard(top_k)
+            if not top_ks:
+                del self._keys_by_user[user_id]
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts
+            }
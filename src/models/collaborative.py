@@ -1,16 +1,52 @@
 
+import threading
+from collections import OrderedDict
+
 import numpy as np
 from scipy.sparse import csr_matrix
 from scipy.sparse.linalg import svds
 
-from src.database.mongo_handler import get_user_activity, get_all_users
-from src.config import TOP_K_RECOMMENDATIONS
+from src.database.storage import get_user_activity, get_all_users, load_interaction_arrays, INTERACTION_FIELDS
+from src.models.ranking import top_k_indices_2d
+from src.models.persistence import save_arrays, load_arrays
+from src.models.ann import IVFIndex
+from src.models.interaction_store import get_interaction_store
+from src.config import (
+    TOP_K_RECOMMENDATIONS, COLLAB_SPARSE_TRAINING, COLLAB_BULK_LOAD, COLLAB_BATCH_SIZE,
+    COLLAB_RETRIEVAL, COLLAB_IVF_NLIST, COLLAB_IVF_NPROBE, COLLAB_SCORE_BUFFER_MAX_BYTES, INTERACTION_STORE_ENABLED,
+    COLLAB_DRIFT_MAX_NEW_USER_RATIO, COLLAB_DRIFT_MAX_INTERACTION_RATIO, COLLAB_DRIFT_MAX_UNKNOWN_PRODUCT_RATIO,
+    COLLAB_DRIFT_MIN_FOLDED_INTERACTIONS, COLLAB_FOLD_IN_MAX_USERS
+)
+
+ACTION_WEIGHTS = {"BUY": 5.0, "VIEW": 1.0}
+HISTORY_FIELDS = (*INTERACTION_FIELDS, "timestamp")
+
+
+def _same_activity(a, b):
+    return (
+        a.get("timestamp") is not None and a.get("timestamp") == b.get("timestamp")
+        and a["product_id"] == b["product_id"] and a.get("action_type") == b.get("action_type")
+    )
+
 
 class CollaborativeFilteringRecommender:
-   
     
-    def __init__(self, num_factors=20):
+    # Predicted ratings are divided by this to map them into [0, 1]
+    score_scale = 5.0
+    
+    def __init__(self, num_factors=20, sparse_training=COLLAB_SPARSE_TRAINING, bulk_load=COLLAB_BULK_LOAD,
+                 retrieval=COLLAB_RETRIEVAL, ivf_nlist=COLLAB_IVF_NLIST, ivf_nprobe=COLLAB_IVF_NPROBE,
+                 interaction_store=None):
         self.num_factors = num_factors
+        self.sparse_training = sparse_training
+        self.bulk_load = bulk_load
+        self.retrieval = retrieval
+        self.ivf_nlist = ivf_nlist
+        self.ivf_nprobe = ivf_nprobe
+        self.ann_index = None
+        if interaction_store is None and INTERACTION_STORE_ENABLED:
+            interaction_store = get_interaction_store()
+        self.interaction_store = interaction_store
         self.user_id_to_index = {}
         self.product_id_to_index = {}
         self.index_to_user_id = {}
@@ -18,8 +54,23 @@ class CollaborativeFilteringRecommender:
         self.user_item_matrix = None
         self.user_factors = None
         self.item_factors = None
+        self.sigma = None
         self.global_mean = 0
         self.is_trained = False
+        self._buffers = threading.local()
+        self.score_buffer_max_bytes = COLLAB_SCORE_BUFFER_MAX_BYTES
+        self.max_folded_users = COLLAB_FOLD_IN_MAX_USERS
+        self._fold_lock = threading.Lock()
+        self._reset_fold_in()
+    
+    def _reset_fold_in(self):
+        # Least recently folded user first
+        self._folded_rows = OrderedDict()
+        self._folded_factors = {}
+        self.folded_new_users = 0
+        self.folded_interactions = 0
+        self.unknown_product_interactions = 0
+        self.folded_evictions = 0
     
     def _create_user_item_matrix(self, user_activities):
         
@@ -40,7 +91,7 @@ class CollaborativeFilteringRecommender:
             product_idx = self.product_id_to_index[activity["product_id"]]
             
             
-            weight = 5.0 if activity["action_type"] == "BUY" else 1.0
+            weight = ACTION_WEIGHTS["BUY"] if activity["action_type"] == "BUY" else ACTION_WEIGHTS["VIEW"]
             
             rows.append(user_idx)
             cols.append(product_idx)
@@ -54,96 +105,518 @@ class CollaborativeFilteringRecommender:
         
         return matrix
     
-    def train(self):
-        """Train collaborative filtering model."""
-       
+    def _create_user_item_matrix_from_arrays(self, user_ids, product_ids, rows, cols, data):
+        """Build the CSR matrix from COO arrays produced by the bulk loader.
+        
+        Ids are re-indexed in sorted order so the result matches
+        _create_user_item_matrix on the same activities.
+        """
+        user_order = np.argsort(np.asarray(user_ids, dtype=object))
+        product_order = np.argsort(np.asarray(product_ids, dtype=object))
+        
+        user_rank = np.empty(len(user_ids), dtype=np.int32)
+        user_rank[user_order] = np.arange(len(user_ids), dtype=np.int32)
+        product_rank = np.empty(len(product_ids), dtype=np.int32)
+        product_rank[product_order] = np.arange(len(product_ids), dtype=np.int32)
+        
+        sorted_user_ids = [user_ids[i] for i in user_order]
+        sorted_product_ids = [product_ids[i] for i in product_order]
+        
+        self.user_id_to_index = {user_id: i for i, user_id in enumerate(sorted_user_ids)}
+        self.product_id_to_index = {product_id: i for i, product_id in enumerate(sorted_product_ids)}
+        self.index_to_user_id = dict(enumerate(sorted_user_ids))
+        self.index_to_product_id = dict(enumerate(sorted_product_ids))
+        
+        return csr_matrix(
+            (data, (user_rank[rows], product_rank[cols])),
+            shape=(len(user_ids), len(product_ids))
+        )
+    
+    def _load_user_item_matrix(self):
+        """Single cursor pass over user activity, streamed into COO arrays."""
+        user_ids, product_ids, rows, cols, data = load_interaction_arrays(ACTION_WEIGHTS)
+        
+        if not user_ids:
+            print("No user activities found in database.")
+            return None
+        
+        return self._create_user_item_matrix_from_arrays(user_ids, product_ids, rows, cols, data)
+    
+    def _fetch_user_item_matrix(self):
+        """Original loader: one get_user_activity query per user."""
         user_ids = get_all_users()
         
         if not user_ids:
             print("No users found in database.")
-            return False
+            return None
         
-       
         all_activities = []
         for user_id in user_ids:
-            activities = get_user_activity(user_id=user_id)
+            activities = get_user_activity(user_id=user_id, fields=("user_id", *INTERACTION_FIELDS), sort=False)
             all_activities.extend(activities)
         
         if not all_activities:
             print("No user activities found in database.")
-            return False
+            return None
         
-       
-        self.user_item_matrix = self._create_user_item_matrix(all_activities)
-        
-       
-        self.global_mean = np.mean(self.user_item_matrix.data) if self.user_item_matrix.nnz > 0 else 0
-        
-       
-        matrix_dense = self.user_item_matrix.toarray()
+        return self._create_user_item_matrix(all_activities)
+    
+    def _factorize_dense(self, matrix):
+        """Original SVD path: densify, center observed entries, factorize."""
+        matrix_dense = matrix.toarray()
         mask = matrix_dense != 0
         matrix_dense[mask] -= self.global_mean
         
-      
         k = min(self.num_factors, min(matrix_dense.shape) - 1)
-        U, sigma, Vt = svds(matrix_dense, k=k)
+        return svds(matrix_dense, k=k)
+    
+    def _factorize_sparse(self, matrix):
+        """SVD on the CSR matrix with only the stored entries centered.
+        
+        Equivalent to the dense path (which also only shifts non-zero cells)
+        but peak memory scales with nnz instead of users x products.
+        """
+        centered = matrix.astype(np.float64, copy=True)
+        centered.data -= self.global_mean
+        
+        k = min(self.num_factors, min(centered.shape) - 1)
+        return svds(centered, k=k)
+    
+    def _fit(self, matrix):
+        """Factorize the interaction matrix into user_factors / item_factors."""
+        self.global_mean = np.mean(matrix.data) if matrix.nnz > 0 else 0
+        
+        if self.sparse_training:
+            U, sigma, Vt = self._factorize_sparse(matrix)
+        else:
+            U, sigma, Vt = self._factorize_dense(matrix)
         
-       
         self.user_factors = U
         self.item_factors = Vt.T
+        self.sigma = sigma
+    
+    def train(self):
+        """Train collaborative filtering model."""
+        if self.bulk_load:
+            matrix = self._load_user_item_matrix()
+        else:
+            matrix = self._fetch_user_item_matrix()
+        
+        if matrix is None:
+            return False
+        
+        self.user_item_matrix = matrix
+        self._fit(matrix)
+        self._prepare_fold_in()
+        self._reset_fold_in()
+        
+        if self.retrieval == "ivf":
+            self.ann_index = IVFIndex.build(self.item_factors, nlist=self.ivf_nlist)
+            print(f"Built IVF index with {self.ann_index.nlist} lists over {self.item_factors.shape[0]} items.")
+        else:
+            self.ann_index = None
         
         self.is_trained = True
         print(f"Collaborative filtering trained on {self.user_item_matrix.shape[0]} users and {self.user_item_matrix.shape[1]} products.")
         
         return True
     
-    def recommend(self, user_id, top_k=TOP_K_RECOMMENDATIONS):
-      
+    def _persisted_params(self):
+        """Constructor arguments stored alongside the model's arrays."""
+        return {
+            "num_factors": self.num_factors,
+            "retrieval": self.retrieval,
+            "ivf_nlist": self.ivf_nlist,
+            "ivf_nprobe": self.ivf_nprobe
+        }
+    
+    def save(self, path):
+        """Write factors, id maps and the CSR interaction matrix to directory path."""
         if not self.is_trained:
-            if not self.train():
-                return []
+            print("Cannot save an untrained collaborative model.")
+            return False
         
-       
-        if user_id not in self.user_id_to_index:
-            print(f"User {user_id} not found in training data.")
-            return []
+        matrix = self.user_item_matrix
+        arrays = {
+            "user_factors": self.user_factors,
+            "item_factors": self.item_factors,
+            "user_ids": np.array([self.index_to_user_id[i] for i in range(matrix.shape[0])]),
+            "product_ids": np.array([self.index_to_product_id[i] for i in range(matrix.shape[1])]),
+            "interactions_data": matrix.data,
+            "interactions_indices": matrix.indices,
+            "interactions_indptr": matrix.indptr
+        }
+        if self.sigma is not None:
+            arrays["sigma"] = self.sigma
+        if self.ann_index is not None:
+            arrays.update({f"ivf_{name}": array for name, array in self.ann_index.arrays().items()})
+        
+        save_arrays(path, type(self).__name__, arrays, {
+            "params": self._persisted_params(),
+            "global_mean": float(self.global_mean),
+            "shape": list(matrix.shape)
+        })
+        return True
+    
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Restore a model saved with save(); arrays are memory-mapped read-only by default."""
+        arrays, metadata = load_arrays(path, expected_models=[cls.__name__], mmap=mmap)
         
+        model = cls(**metadata["params"])
+        model.user_factors = arrays["user_factors"]
+        model.item_factors = arrays["item_factors"]
+        model.sigma = arrays.get("sigma")
+        if "ivf_centroids" in arrays:
+            model.ann_index = IVFIndex.from_arrays({
+                name[len("ivf_"):]: array for name, array in arrays.items() if name.startswith("ivf_")
+            })
+        model.global_mean = metadata["global_mean"]
+        model.user_item_matrix = csr_matrix(
+            (arrays["interactions_data"], arrays["interactions_indices"], arrays["interactions_indptr"]),
+            shape=tuple(metadata["shape"]),
+            copy=False
+        )
         
-        user_idx = self.user_id_to_index[user_id]
+        user_ids = arrays["user_ids"].tolist()
+        product_ids = arrays["product_ids"].tolist()
+        model.user_id_to_index = {user_id: i for i, user_id in enumerate(user_ids)}
+        model.product_id_to_index = {product_id: i for i, product_id in enumerate(product_ids)}
+        model.index_to_user_id = dict(enumerate(user_ids))
+        model.index_to_product_id = dict(enumerate(product_ids))
         
-   
-        user_interactions = self.user_item_matrix[user_idx].toarray().flatten()
-        interacted_items = set(np.where(user_interactions > 0)[0])
+        model._prepare_fold_in()
+        model.is_trained = True
+        return model
+    
+    def _prepare_fold_in(self):
+        """Precompute what _project needs from new item_factors; run after train and load."""
+    
+    def _get_score_buffer(self, batch_size):
+        """(batch, n_items) scratch buffer, reused per thread while within score_buffer_max_bytes."""
+        num_items = self.item_factors.shape[0]
+        dtype = np.result_type(self.user_factors, self.item_factors)
         
-
-        user_vector = self.user_factors[user_idx]
-        predicted_ratings = self.global_mean + np.dot(user_vector, self.item_factors.T)
-        
-       
-        product_scores = []
-        for product_idx, score in enumerate(predicted_ratings):
-           
-            if product_idx in interacted_items:
-                continue
-            
-         
-            if product_idx < len(self.index_to_product_id):
-                product_id = self.index_to_product_id[product_idx]
-                product_scores.append((product_id, float(score)))
+        # Every executor thread would keep its own copy, so large buffers are not kept
+        if batch_size * num_items * dtype.itemsize > self.score_buffer_max_bytes:
+            return np.empty((batch_size, num_items), dtype=dtype)
+        
+        buffer = getattr(self._buffers, "scores", None)
+        if buffer is None or buffer.shape[0] < batch_size or buffer.shape[1] != num_items or buffer.dtype != dtype:
+            buffer = np.empty((batch_size, num_items), dtype=dtype)
+            self._buffers.scores = buffer
+        
+        return buffer[:batch_size]
+    
+    def _score_users(self, user_vectors, seen_indices, top_k):
+        """Score a batch of user vectors with one matmul and return top-k (indices, scores) per user."""
+        if self.ann_index is not None:
+            return [
+                (idx, scores + self.global_mean)
+                for idx, scores in self.ann_index.search(self.item_factors, user_vectors, seen_indices,
+                                                         top_k, nprobe=self.ivf_nprobe)
+            ]
         
+        scores = self._get_score_buffer(len(user_vectors))
+        np.dot(user_vectors, self.item_factors.T, out=scores)
+        scores += self.global_mean
         
-        product_scores.sort(key=lambda x: x[1], reverse=True)
+        for row, seen in enumerate(seen_indices):
+            scores[row, seen] = -np.inf
         
-       
+        top_indices = top_k_indices_2d(scores, top_k)
+        return [(idx, scores[row, idx].copy()) for row, idx in enumerate(top_indices)]
+    
+    def _format_recommendations(self, product_indices, scores):
         recommendations = []
-        for product_id, score in product_scores[:top_k]:
+        for product_idx, score in zip(product_indices, scores):
             # Normalize score to be between 0 and 1
-            norm_score = min(max(score / 5.0, 0), 1)
+            norm_score = min(max(float(score) / self.score_scale, 0), 1)
             
             recommendations.append({
-                "product_id": product_id,
+                "product_id": self.index_to_product_id[int(product_idx)],
                 "score": norm_score,
                 "reason": "Collaborative filtering similarity"
             })
         
-        return recommendations
\ No newline at end of file
+        return recommendations
+    
+    def _project(self, product_weights):
+        """Fold an interaction row {product_idx: weight} into factor space.
+        
+        Mirrors training: stored entries are centered by the global mean and
+        projected with u = r V / sigma, so a folded-in vector is scored the
+        same way as a trained user_factors row.
+        """
+        indices = np.fromiter(product_weights.keys(), dtype=np.intp, count=len(product_weights))
+        weights = np.fromiter(product_weights.values(), dtype=np.float64, count=len(product_weights))
+        
+        projected = (weights - self.global_mean) @ self.item_factors[indices]
+        safe_sigma = np.where(self.sigma > 1e-10, self.sigma, np.inf)
+        return projected / safe_sigma
+    
+    def _row_weights(self, user_id):
+        """Current interaction row of a user as {product_idx: weight}, or None."""
+        if user_id in self._folded_rows:
+            return self._folded_rows[user_id]
+        
+        if user_id in self.user_id_to_index:
+            user_idx = self.user_id_to_index[user_id]
+            start, end = self.user_item_matrix.indptr[user_idx], self.user_item_matrix.indptr[user_idx + 1]
+            return dict(zip(
+                self.user_item_matrix.indices[start:end].tolist(),
+                self.user_item_matrix.data[start:end].tolist()
+            ))
+        
+        return None
+    
+    def _fold_in_row(self, user_id, product_weights, unknown_products=0):
+        """Replace a user's row and vector; the caller holds _fold_lock.
+        
+        Drift counters only count what the model did not have yet: products
+        new to the user's current row, and interactions with unknown products.
+        A user whose products are all unknown keeps an empty row, so reads do
+        not fold them in (and count them) again.
+        """
+        previous = self._row_weights(user_id)
+        if product_weights and user_id not in self._folded_factors and user_id not in self.user_id_to_index:
+            self.folded_new_users += 1
+        previous = previous or {}
+        self.folded_interactions += unknown_products + sum(1 for idx in product_weights if idx not in previous)
+        self.unknown_product_interactions += unknown_products
+        
+        rows = self._folded_rows
+        if user_id in rows:
+            rows.move_to_end(user_id)
+        rows[user_id] = product_weights
+        if product_weights:
+            self._folded_factors[user_id] = self._project(product_weights)
+        else:
+            self._folded_factors.pop(user_id, None)
+        
+        while len(rows) > self.max_folded_users:
+            evicted, _ = rows.popitem(last=False)
+            self._folded_factors.pop(evicted, None)
+            self.folded_evictions += 1
+    
+    def _activity_weights(self, activities):
+        """({product_idx: weight}, number of activities on products the model does not know)."""
+        product_weights = {}
+        unknown_products = 0
+        for activity in activities:
+            product_idx = self.product_id_to_index.get(activity["product_id"])
+            if product_idx is None:
+                unknown_products += 1
+                continue
+            weight = ACTION_WEIGHTS["BUY"] if activity["action_type"] == "BUY" else ACTION_WEIGHTS["VIEW"]
+            product_weights[product_idx] = product_weights.get(product_idx, 0.0) + weight
+        return product_weights, unknown_products
+    
+    def fold_in_user(self, user_id, activities):
+        """Project a user's full activity history onto item_factors without retraining.
+        
+        Works for users missing from the training data and replaces the
+        vector of known users. Returns True if the user now has a vector.
+        """
+        if not self.is_trained or not activities:
+            return False
+        
+        product_weights, unknown_products = self._activity_weights(activities)
+        with self._fold_lock:
+            self._fold_in_row(user_id, product_weights, unknown_products)
+        return bool(product_weights)
+    
+    def fold_in_activity(self, activity):
+        """Incrementally fold a single new activity into the user's vector.
+        
+        Intended as an activity listener. Cost is O(row length x factors).
+        A user without a vector yet is first seeded with their full history,
+        from the interaction store or their stored activity.
+        """
+        if not self.is_trained:
+            return False
+        
+        user_id = activity["user_id"]
+        product_idx = self.product_id_to_index.get(activity["product_id"])
+        weight = ACTION_WEIGHTS["BUY"] if activity["action_type"] == "BUY" else ACTION_WEIGHTS["VIEW"]
+        
+        if product_idx is None:
+            with self._fold_lock:
+                self.folded_interactions += 1
+                self.unknown_product_interactions += 1
+            return False
+        
+        # Queried outside the lock; only used if the user still has no row below
+        seed = None if self.has_user_state(user_id) else self._history_weights(activity)
+        
+        with self._fold_lock:
+            row = self._row_weights(user_id)
+            if row is None and seed is not None:
+                product_weights, unknown_products = seed
+            else:
+                product_weights, unknown_products = dict(row or {}), 0
+                product_weights[product_idx] = product_weights.get(product_idx, 0.0) + weight
+            self._fold_in_row(user_id, product_weights, unknown_products)
+        return True
+    
+    def _history_weights(self, activity):
+        """Row of activity's user from their whole history, activity included, as _activity_weights returns."""
+        user_id = activity["user_id"]
+        
+        # The app updates the store before this listener runs, so its row already holds the event
+        if self._store_loaded() and self.interaction_store.has_user(user_id):
+            return self._store_weights(user_id)
+        
+        history = get_user_activity(user_id=user_id, fields=HISTORY_FIELDS, sort=False)
+        # Events are published once stored, so the history normally holds this one already
+        if not any(_same_activity(stored, activity) for stored in history):
+            history.append(activity)
+        return self._activity_weights(history)
+    
+    def _store_loaded(self):
+        return self.interaction_store is not None and self.interaction_store.is_loaded
+    
+    def _store_weights(self, user_id):
+        """The user's interaction store row as ({product_idx: weight}, unknown product count)."""
+        product_weights = {}
+        unknown_products = 0
+        for product_id, weight in self.interaction_store.product_weights(
+                user_id, ACTION_WEIGHTS["BUY"], ACTION_WEIGHTS["VIEW"]).items():
+            product_idx = self.product_id_to_index.get(product_id)
+            if product_idx is None:
+                unknown_products += 1
+                continue
+            product_weights[product_idx] = weight
+        return product_weights, unknown_products
+    
+    def _fold_in_from_store(self, user_id):
+        """Fold in a user from the interaction store instead of querying their activity."""
+        product_weights, unknown_products = self._store_weights(user_id)
+        if not product_weights and not unknown_products:
+            return False
+        
+        with self._fold_lock:
+            self._fold_in_row(user_id, product_weights, unknown_products)
+        return bool(product_weights)
+    
+    def _seen_indices(self, user_id, model_seen):
+        """Products to mask for user_id: the store's current row when it has one, else model_seen."""
+        if not self._store_loaded() or not self.interaction_store.has_user(user_id):
+            return model_seen
+        
+        seen = [
+            self.product_id_to_index[product_id]
+            for product_id in self.interaction_store.seen_products(user_id)
+            if product_id in self.product_id_to_index
+        ]
+        return np.array(seen, dtype=np.intp)
+    
+    def _user_state(self, user_id):
+        """(user_vector, seen_product_indices) for a trained or folded-in user, or None."""
+        row = self._folded_rows.get(user_id)
+        if row is not None:
+            folded = self._folded_factors.get(user_id)
+            if folded is None:
+                # Folded in without any known product
+                return None
+            return folded, self._seen_indices(user_id, np.fromiter(row.keys(), dtype=np.intp))
+        
+        user_idx = self.user_id_to_index.get(user_id)
+        if user_idx is None:
+            return None
+        
+        indptr = self.user_item_matrix.indptr
+        model_seen = self.user_item_matrix.indices[indptr[user_idx]:indptr[user_idx + 1]]
+        return self.user_factors[user_idx], self._seen_indices(user_id, model_seen)
+    
+    def has_user_state(self, user_id):
+        """True once the user is trained or folded in, even if only with unknown products."""
+        return user_id in self._folded_rows or user_id in self.user_id_to_index
+    
+    def drift_report(self):
+        """How far live data has moved away from the trained factorization."""
+        num_trained_users = max(len(self.user_id_to_index), 1)
+        trained_interactions = max(self.user_item_matrix.nnz if self.user_item_matrix is not None else 0, 1)
+        return {
+            "folded_users": len(self._folded_rows),
+            "folded_evictions": self.folded_evictions,
+            "folded_new_users": self.folded_new_users,
+            "folded_interactions": self.folded_interactions,
+            "unknown_product_interactions": self.unknown_product_interactions,
+            "new_user_ratio": self.folded_new_users / num_trained_users,
+            "interaction_ratio": self.folded_interactions / trained_interactions,
+            "unknown_product_ratio": self.unknown_product_interactions / max(self.folded_interactions, 1)
+        }
+    
+    def needs_retrain(self):
+        """True once fold-in has drifted far enough that a full train() is worth it."""
+        if not self.is_trained:
+            return False
+        
+        report = self.drift_report()
+        # A handful of events on new products says little about the catalog as a whole
+        enough_folded = report["folded_interactions"] >= COLLAB_DRIFT_MIN_FOLDED_INTERACTIONS
+        return (
+            # Evicted users fall back to stale or no vectors until the next train
+            report["folded_evictions"] > 0
+            or report["new_user_ratio"] > COLLAB_DRIFT_MAX_NEW_USER_RATIO
+            or report["interaction_ratio"] > COLLAB_DRIFT_MAX_INTERACTION_RATIO
+            or (enough_folded and report["unknown_product_ratio"] > COLLAB_DRIFT_MAX_UNKNOWN_PRODUCT_RATIO)
+        )
+    
+    def recommend_batch(self, user_ids, top_k=TOP_K_RECOMMENDATIONS, batch_size=COLLAB_BATCH_SIZE,
+                        user_activities=None):
+        """Recommend for many users, scoring up to batch_size users per matmul.
+        
+        Users missing from the model are folded in from user_activities when
+        given, else from the interaction store when it is loaded. Returns a dict of user_id -> recommendations; users without
+        any interactions map to [].
+        """
+        if not self.is_trained:
+            if not self.train():
+                return {user_id: [] for user_id in user_ids}
+        
+        results = {}
+        states = []
+        for user_id in user_ids:
+            if not self.has_user_state(user_id):
+                if user_activities:
+                    self.fold_in_user(user_id, user_activities.get(user_id))
+                elif self._store_loaded():
+                    self._fold_in_from_store(user_id)
+            
+            state = self._user_state(user_id)
+            if state is None:
+                results[user_id] = []
+            else:
+                states.append((user_id, state))
+        
+        for start in range(0, len(states), batch_size):
+            chunk = states[start:start + batch_size]
+            user_vectors = np.vstack([vector for _, (vector, _) in chunk])
+            seen_indices = [seen for _, (_, seen) in chunk]
+            
+            for (user_id, _), (product_indices, scores) in zip(chunk, self._score_users(user_vectors, seen_indices, top_k)):
+                results[user_id] = self._format_recommendations(product_indices, scores)
+        
+        return results
+    
+    def recommend(self, user_id, top_k=TOP_K_RECOMMENDATIONS, user_activity=None):
+      
+        if not self.is_trained:
+            if not self.train():
+                return []
+        
+        if not self.has_user_state(user_id):
+            if user_activity is None and self._store_loaded():
+                self._fold_in_from_store(user_id)
+            else:
+                if user_activity is None:
+                    user_activity = get_user_activity(user_id=user_id, fields=INTERACTION_FIELDS, sort=False)
+                self.fold_in_user(user_id, user_activity)
+        
+        if not self.has_user_state(user_id):
+            print(f"User {user_id} not found in training data.")
+            return []
+        
+        return self.recommend_batch([user_id], top_k=top_k)[user_id]
@@ -1,18 +1,40 @@
 import numpy as np
+from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
 
-from src.database.mongo_handler import get_all_products, get_user_activity
-from src.config import TOP_K_RECOMMENDATIONS
+from src.database.storage import get_all_products, get_user_activity, INTERACTION_FIELDS
+from src.models.ranking import top_k_indices, top_k_indices_2d
+from src.models.persistence import save_arrays, load_arrays
+from src.models.interaction_store import get_interaction_store
+from src.config import (
+    TOP_K_RECOMMENDATIONS, CONTENT_RETRIEVAL, CONTENT_NUM_NEIGHBORS, CONTENT_NEIGHBOR_BLOCK_BYTES,
+    CONTENT_BATCH_SIZE, INTERACTION_STORE_ENABLED
+)
+
+# Product fields the TF-IDF features are built from
+PRODUCT_FEATURE_FIELDS = ("product_id", "category", "brand", "description", "price")
+
+# Weight of each interaction in a user's content profile; other actions count as VIEW
+ACTION_WEIGHTS = {"BUY": 3.0, "VIEW": 1.0}
 
 class ContentBasedRecommender:
     
-    def __init__(self):
+    def __init__(self, retrieval=CONTENT_RETRIEVAL, num_neighbors=CONTENT_NUM_NEIGHBORS, interaction_store=None):
+        self.retrieval = retrieval
+        self.num_neighbors = num_neighbors
+        if interaction_store is None and INTERACTION_STORE_ENABLED:
+            interaction_store = get_interaction_store()
+        self.interaction_store = interaction_store
         self.products = []
         self.product_features = None
+        self.normalized_features = None
         self.product_id_to_index = {}
         self.index_to_product_id = {}
         self.tfidf_vectorizer = TfidfVectorizer(stop_words='english')
+        self.neighbor_indptr = None
+        self.neighbor_indices = None
+        self.neighbor_scores = None
         self.is_trained = False
     
     def _preprocess_products(self):
@@ -39,11 +61,12 @@ class ContentBasedRecommender:
             product_texts.append(text)
         
         self.product_features = self.tfidf_vectorizer.fit_transform(product_texts)
+        self.normalized_features = normalize(self.product_features, norm='l2', copy=True).tocsr()
         
         return True
     
     def train(self):
-        self.products = get_all_products()
+        self.products = get_all_products(fields=PRODUCT_FEATURE_FIELDS)
         
         if not self.products:
             print("No products found in database.")
@@ -51,14 +74,143 @@ class ContentBasedRecommender:
         
         success = self._preprocess_products()
         
+        if success and self.retrieval == "neighbors":
+            self.build_neighbor_index()
+        
         if success:
             self.is_trained = True
             print(f"Content-based recommender trained on {len(self.products)} products.")
         
         return success
     
-    def _get_user_product_interactions(self, user_id):
-        user_activity = get_user_activity(user_id=user_id)
+    def save(self, path):
+        """Write the TF-IDF matrices, vocabulary, id map and neighbor index to directory path."""
+        if not self.is_trained:
+            print("Cannot save an untrained content-based model.")
+            return False
+        
+        vocabulary = self.tfidf_vectorizer.vocabulary_
+        terms = [None] * len(vocabulary)
+        for term, idx in vocabulary.items():
+            terms[idx] = term
+        
+        arrays = {
+            "product_ids": np.array([self.index_to_product_id[i] for i in range(self.product_features.shape[0])]),
+            "features_data": self.product_features.data,
+            "features_indices": self.product_features.indices,
+            "features_indptr": self.product_features.indptr,
+            "normalized_data": self.normalized_features.data,
+            "normalized_indices": self.normalized_features.indices,
+            "normalized_indptr": self.normalized_features.indptr,
+            "vocabulary": np.array(terms),
+            "idf": self.tfidf_vectorizer.idf_
+        }
+        if self.neighbor_indptr is not None:
+            arrays["neighbor_indptr"] = self.neighbor_indptr
+            arrays["neighbor_indices"] = self.neighbor_indices
+            arrays["neighbor_scores"] = self.neighbor_scores
+        
+        save_arrays(path, type(self).__name__, arrays, {
+            "retrieval": self.retrieval,
+            "num_neighbors": self.num_neighbors,
+            "shape": list(self.product_features.shape)
+        })
+        return True
+    
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Restore a model saved with save(); arrays are memory-mapped read-only by default."""
+        arrays, metadata = load_arrays(path, expected_models=[cls.__name__], mmap=mmap)
+        shape = tuple(metadata["shape"])
+        
+        model = cls(retrieval=metadata["retrieval"], num_neighbors=metadata["num_neighbors"])
+        model.product_features = csr_matrix(
+            (arrays["features_data"], arrays["features_indices"], arrays["features_indptr"]), shape=shape, copy=False
+        )
+        model.normalized_features = csr_matrix(
+            (arrays["normalized_data"], arrays["normalized_indices"], arrays["normalized_indptr"]), shape=shape, copy=False
+        )
+        
+        product_ids = arrays["product_ids"].tolist()
+        model.product_id_to_index = {product_id: i for i, product_id in enumerate(product_ids)}
+        model.index_to_product_id = dict(enumerate(product_ids))
+        
+        model.tfidf_vectorizer.vocabulary_ = {term: i for i, term in enumerate(arrays["vocabulary"].tolist())}
+        model.tfidf_vectorizer.idf_ = np.asarray(arrays["idf"])
+        
+        if "neighbor_indptr" in arrays:
+            model.neighbor_indptr = arrays["neighbor_indptr"]
+            model.neighbor_indices = arrays["neighbor_indices"]
+            model.neighbor_scores = arrays["neighbor_scores"]
+        
+        model.is_trained = True
+        return model
+    
+    def build_neighbor_index(self, num_neighbors=None, block_bytes=CONTENT_NEIGHBOR_BLOCK_BYTES):
+        """Precompute each product's top-N most similar products.
+        
+        Similarities are computed block by block so at most block_bytes of
+        dense scores are alive at once. The result is stored as CSR-style
+        arrays: neighbors of product i are neighbor_indices[indptr[i]:indptr[i+1]].
+        """
+        num_neighbors = num_neighbors or self.num_neighbors
+        features = self.normalized_features
+        features_t = features.T.tocsc()
+        num_products = features.shape[0]
+        k = min(num_neighbors, num_products - 1)
+        block_rows = max(1, int(block_bytes // (num_products * 8)))
+        
+        indptr = np.zeros(num_products + 1, dtype=np.int64)
+        indices_blocks, scores_blocks = [], []
+        
+        for start in range(0, num_products, block_rows):
+            end = min(start + block_rows, num_products)
+            similarities = (features[start:end] @ features_t).toarray()
+            similarities[np.arange(end - start), np.arange(start, end)] = -np.inf
+            similarities[similarities <= 0] = -np.inf
+            
+            for row, neighbors in enumerate(top_k_indices_2d(similarities, k)):
+                indices_blocks.append(neighbors.astype(np.int32))
+                scores_blocks.append(similarities[row, neighbors].astype(np.float32))
+                indptr[start + row + 1] = len(neighbors)
+        
+        self.neighbor_indptr = np.cumsum(indptr)
+        self.neighbor_indices = np.concatenate(indices_blocks) if indices_blocks else np.empty(0, dtype=np.int32)
+        self.neighbor_scores = np.concatenate(scores_blocks) if scores_blocks else np.empty(0, dtype=np.float32)
+        
+        print(f"Built content neighbor index with {len(self.neighbor_indices)} edges.")
+        return True
+    
+    def _neighbor_candidates(self, indices, weights):
+        """Aggregate precomputed neighbor lists of the interacted products.
+        
+        Cost is proportional to the total length of those neighbor lists,
+        independent of catalog size. Returns (candidate_indices, scores).
+        """
+        if not indices:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+        
+        indices = np.asarray(indices)
+        weights = np.asarray(weights, dtype=np.float64)
+        starts = self.neighbor_indptr[indices]
+        lengths = self.neighbor_indptr[indices + 1] - starts
+        
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        neighbors = self.neighbor_indices[positions]
+        contributions = self.neighbor_scores[positions] * np.repeat(weights, lengths)
+        
+        candidates, inverse = np.unique(neighbors, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions, minlength=len(candidates)) / weights.sum()
+        
+        keep = ~np.isin(candidates, indices)
+        return candidates[keep], scores[keep]
+    
+    def _get_user_product_interactions(self, user_id, user_activity=None):
+        if user_activity is None:
+            store = self.interaction_store
+            if store is not None and store.is_loaded:
+                return store.product_weights(user_id, ACTION_WEIGHTS["BUY"], ACTION_WEIGHTS["VIEW"])
+            user_activity = get_user_activity(user_id=user_id, fields=INTERACTION_FIELDS, sort=False)
         
         if not user_activity:
             return {}
@@ -66,7 +218,7 @@ class ContentBasedRecommender:
         product_weights = {}
         for activity in user_activity:
             product_id = activity["product_id"]
-            weight = 3.0 if activity["action_type"] == "BUY" else 1.0
+            weight = ACTION_WEIGHTS["BUY"] if activity["action_type"] == "BUY" else ACTION_WEIGHTS["VIEW"]
             
             if product_id in product_weights:
                 product_weights[product_id] += weight
@@ -75,52 +227,122 @@ class ContentBasedRecommender:
         
         return product_weights
     
-    def recommend(self, user_id, top_k=TOP_K_RECOMMENDATIONS):
+    def recommend(self, user_id, top_k=TOP_K_RECOMMENDATIONS, user_activity=None):
         if not self.is_trained:
             if not self.train():
                 return []
         
-        product_weights = self._get_user_product_interactions(user_id)
+        product_weights = self._get_user_product_interactions(user_id, user_activity=user_activity)
         
         if not product_weights:
             print(f"No interaction data for user {user_id}")
             return []
         
-        user_profile = np.zeros(self.product_features.shape[1])
-        total_weight = 0
+        indices, weights = self._indices_and_weights(product_weights)
         
-        for product_id, weight in product_weights.items():
-            if product_id in self.product_id_to_index:
-                idx = self.product_id_to_index[product_id]
-                user_profile += weight * self.product_features[idx].toarray().flatten()
-                total_weight += weight
+        if self.retrieval == "neighbors" and self.neighbor_indptr is not None:
+            candidates, scores = self._neighbor_candidates(indices, weights)
+            top = top_k_indices(scores, top_k)
+            product_scores = [(self.index_to_product_id[int(candidates[i])], float(scores[i])) for i in top]
+        else:
+            similarities = self._profile_similarities(indices, weights)
+            similarities[indices] = -np.inf
+            top = top_k_indices(similarities, top_k)
+            product_scores = [(self.index_to_product_id[int(i)], float(similarities[i])) for i in top]
         
-        if total_weight > 0:
-            user_profile /= total_weight
+        return self._format_recommendations(product_scores)
+    
+    def recommend_batch(self, user_activities, top_k=TOP_K_RECOMMENDATIONS, batch_size=CONTENT_BATCH_SIZE):
+        """Recommend for many users given a dict of user_id -> activity list.
         
-        similarities = cosine_similarity(
-            user_profile.reshape(1, -1),
-            self.product_features
-        ).flatten()
+        An activity list of None reads the user's interactions from the
+        interaction store (or the database if it is not loaded). In exact
+        mode up to batch_size user profiles are built and scored together
+        with one sparse matrix product per chunk.
+        """
+        if not self.is_trained:
+            if not self.train():
+                return {user_id: [] for user_id in user_activities}
         
-        product_scores = []
-        for i, similarity in enumerate(similarities):
-            product_id = self.index_to_product_id[i]
-            
-            if product_id in product_weights:
+        results = {}
+        pending = []
+        for user_id, user_activity in user_activities.items():
+            product_weights = self._get_user_product_interactions(user_id, user_activity=user_activity)
+            if not product_weights:
+                results[user_id] = []
                 continue
             
-            product_scores.append((product_id, similarity))
+            indices, weights = self._indices_and_weights(product_weights)
+            if self.retrieval == "neighbors" and self.neighbor_indptr is not None:
+                candidates, scores = self._neighbor_candidates(indices, weights)
+                top = top_k_indices(scores, top_k)
+                results[user_id] = self._format_recommendations(
+                    [(self.index_to_product_id[int(candidates[i])], float(scores[i])) for i in top]
+                )
+            else:
+                pending.append((user_id, indices, weights))
         
-        product_scores.sort(key=lambda x: x[1], reverse=True)
+        num_products = self.normalized_features.shape[0] if pending else 0
+        for start in range(0, len(pending), batch_size):
+            chunk = pending[start:start + batch_size]
+            
+            rows = np.repeat(np.arange(len(chunk)), [len(indices) for _, indices, _ in chunk])
+            cols = np.concatenate([np.asarray(indices, dtype=np.int64) for _, indices, _ in chunk])
+            data = np.concatenate([np.asarray(weights, dtype=np.float64) for _, _, weights in chunk])
+            weight_matrix = csr_matrix((data, (rows, cols)), shape=(len(chunk), num_products))
+            
+            profiles = weight_matrix @ self.product_features
+            norms = np.sqrt(np.asarray(profiles.multiply(profiles).sum(axis=1)).ravel())
+            similarities = (profiles @ self.normalized_features.T).toarray()
+            np.divide(similarities, norms[:, None], out=similarities, where=norms[:, None] > 0)
+            
+            similarities[rows, cols] = -np.inf
+            
+            for row, top in enumerate(top_k_indices_2d(similarities, top_k)):
+                results[chunk[row][0]] = self._format_recommendations(
+                    [(self.index_to_product_id[int(i)], float(similarities[row, i])) for i in top]
+                )
         
-        max_score = max([score for _, score in product_scores[:top_k]]) if product_scores else 1.0
+        return results
+    
+    def _indices_and_weights(self, product_weights):
+        indices, weights = [], []
+        for product_id, weight in product_weights.items():
+            if product_id in self.product_id_to_index:
+                indices.append(self.product_id_to_index[product_id])
+                weights.append(weight)
+        return indices, weights
+    
+    def _format_recommendations(self, product_scores):
+        max_score = max([score for _, score in product_scores]) if product_scores else 1.0
         recommendations = []
-        for product_id, score in product_scores[:top_k]:
+        for product_id, score in product_scores:
             normalized_score = 0.3 + (score / max_score) * 0.7 if max_score > 0 else 0.3
             recommendations.append({
                 "product_id": product_id,
                 "score": float(normalized_score),
                 "reason": "Content-based similarity"
             })
-        return recommendations
\ No newline at end of file
+        return recommendations
+    
+    def _profile_similarities(self, indices, weights):
+        """Cosine similarity of the weighted user profile against every product.
+        
+        The profile is a single sparse weighted row-sum of TF-IDF rows, scored
+        with one sparse dot product against the L2-normalized feature matrix.
+        """
+        num_products = self.normalized_features.shape[0]
+        if not indices:
+            return np.zeros(num_products)
+        
+        weight_vector = csr_matrix(
+            (np.asarray(weights, dtype=np.float64), (np.zeros(len(indices), dtype=np.int32), indices)),
+            shape=(1, num_products)
+        )
+        user_profile = weight_vector @ self.product_features
+        
+        profile_norm = np.sqrt(user_profile.multiply(user_profile).sum())
+        if profile_norm == 0:
+            return np.zeros(num_products)
+        
+        return np.asarray((self.normalized_features @ user_profile.T).todense()).ravel() / profile_norm
@@ -0,0 +1,327 @@
+"""
+Item-to-item co-occurrence recommender ("users who interacted with X also chose Y").
+
+Counts live in a sparse dict per item (neighbor product_id -> score) and are
+updated from every activity. A new event on a product is paired, in both
+directions, with the user's last history_size products; each side is
+weighted by the other product's action, so a BUY counts more than a VIEW.
+A repeated event on a product already in the window only adds the upgrade
+from VIEW to BUY.
+
+Scores decay with half_life. Instead of touching every count, increments
+are scaled up by 2 ** (age / half_life) and all counts are rescaled once
+that factor gets large. An item holding more than 2 x max_neighbors
+entries is trimmed back to its top max_neighbors. Every prune_every events
+the next prune_every items, in rotation, drop pairs whose decayed score fell
+below min_score, so pruning costs O(max_neighbors) per event and never
+holds the lock for a whole sweep. recommend() costs
+O(history_size x max_neighbors).
+
+train() streams stored activity in batches into a separate set of counts
+and swaps them in at the end, so the live model keeps serving meanwhile.
+"""
+import heapq
+import threading
+import time
+from collections import OrderedDict, deque, defaultdict
+from datetime import datetime
+from operator import itemgetter
+
+from src.database.storage import get_user_activity, iter_activity_batches, INTERACTION_FIELDS
+from src.models.interaction_store import get_interaction_store
+from src.config import (
+    TOP_K_RECOMMENDATIONS, INTERACTION_STORE_ENABLED, COOCCURRENCE_HISTORY_SIZE, COOCCURRENCE_MAX_NEIGHBORS,
+    COOCCURRENCE_MAX_USERS, COOCCURRENCE_HALF_LIFE_SECONDS, COOCCURRENCE_PRUNE_EVERY, COOCCURRENCE_MIN_SCORE
+)
+
+ACTION_WEIGHTS = {"BUY": 3.0, "VIEW": 1.0}
+TRAIN_FIELDS = ("user_id", "product_id", "action_type", "timestamp")
+# Activities per read while rebuilding from storage
+TRAIN_BATCH_SIZE = 10000
+
+# Counts are rescaled to the current time once increments are this much larger than their weight
+MAX_DECAY_SCALE = 1e6
+
+
+def _weight(activity):
+    return ACTION_WEIGHTS["BUY"] if activity.get("action_type") == "BUY" else ACTION_WEIGHTS["VIEW"]
+
+
+def _event_time(timestamp, default):
+    """Epoch seconds of an ISO timestamp (naive ones are local time), or default."""
+    try:
+        return datetime.fromisoformat(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return default
+
+
+class CoOccurrenceRecommender:
+
+    def __init__(self, history_size=COOCCURRENCE_HISTORY_SIZE, max_neighbors=COOCCURRENCE_MAX_NEIGHBORS,
+                 max_users=COOCCURRENCE_MAX_USERS, half_life=COOCCURRENCE_HALF_LIFE_SECONDS,
+                 prune_every=COOCCURRENCE_PRUNE_EVERY, min_score=COOCCURRENCE_MIN_SCORE, interaction_store=None):
+        self.history_size = history_size
+        self.max_neighbors = max_neighbors
+        self.max_users = max_users
+        self.half_life = half_life
+        self.prune_every = prune_every
+        self.min_score = min_score
+        if interaction_store is None and INTERACTION_STORE_ENABLED:
+            interaction_store = get_interaction_store()
+        self.interaction_store = interaction_store
+        self._lock = threading.Lock()
+        # Events recorded while train() is scanning storage, else None
+        self._backlog = None
+        self._reset()
+
+    def _reset(self):
+        # product_id -> {neighbor product_id: score scaled to _epoch}
+        self.neighbors = {}
+        # user_id -> deque of (product_id, weight), least recently active user first
+        self.histories = OrderedDict()
+        self._epoch = time.time()
+        self.recorded_activities = 0
+        self.prunes = 0
+        self._events_since_prune = 0
+        # Items left to visit in the current pruning rotation
+        self._prune_queue = deque()
+
+    @property
+    def is_trained(self):
+        return bool(self.neighbors)
+
+    def _scale(self, now):
+        """Multiplier for an increment made at now, rescaling all counts when it grows too large."""
+        scale = 2.0 ** ((now - self._epoch) / self.half_life)
+        if scale > MAX_DECAY_SCALE:
+            self._rescale(now)
+            scale = 1.0
+        return scale
+
+    def _rescale(self, now):
+        decay = 2.0 ** (-(now - self._epoch) / self.half_life)
+        for counts in self.neighbors.values():
+            for neighbor_id in counts:
+                counts[neighbor_id] *= decay
+        self._epoch = now
+
+    def _trim(self, product_id, counts):
+        # A full sort of ~2 x max_neighbors entries is cheaper here than heapq.nlargest
+        top = sorted(counts.items(), key=itemgetter(1), reverse=True)[:self.max_neighbors]
+        self.neighbors[product_id] = dict(top)
+
+    def _record(self, user_id, product_id, weight, now):
+        history = self.histories.get(user_id)
+        if history is None:
+            history = self.histories[user_id] = deque(maxlen=self.history_size)
+            if len(self.histories) > self.max_users:
+                self.histories.popitem(last=False)
+        else:
+            self.histories.move_to_end(user_id)
+
+        previous = 0.0
+        for i, (other_id, other_weight) in enumerate(history):
+            if other_id == product_id:
+                previous = other_weight
+                del history[i]
+                break
+
+        scale = self._scale(now)
+        neighbors = self.neighbors
+        limit = 2 * self.max_neighbors
+        added = (weight - previous) * scale
+        if added > 0:
+            for other_id, _ in history:
+                counts = neighbors.setdefault(other_id, {})
+                counts[product_id] = counts.get(product_id, 0.0) + added
+                if len(counts) > limit:
+                    self._trim(other_id, counts)
+
+        if history and not previous:
+            counts = neighbors.setdefault(product_id, {})
+            for other_id, other_weight in history:
+                counts[other_id] = counts.get(other_id, 0.0) + other_weight * scale
+            if len(counts) > limit:
+                self._trim(product_id, counts)
+
+        history.append((product_id, max(weight, previous)))
+        self.recorded_activities += 1
+
+    def train(self):
+        """Rebuild counts from all stored activity, replayed oldest first at each event's own time.
+
+        The new counts are built without holding the lock and swapped in at
+        the end. Events recorded while the scan runs are applied after the
+        swap; any the scan also saw repeat a product already in the user's
+        window and add nothing.
+        """
+        with self._lock:
+            self._backlog = []
+
+        built = None
+        try:
+            built, count = self._build()
+        finally:
+            with self._lock:
+                backlog, self._backlog = self._backlog, None
+                if built is not None:
+                    self._swap_in(built)
+                for user_id, product_id, weight, event_time in backlog:
+                    self._record(user_id, product_id, weight, event_time)
+
+        if built is None:
+            print("No activity to build co-occurrence counts from.")
+            return False
+
+        print(f"Co-occurrence model built from {count} activities "
+              f"(+{len(backlog)} during the build): {len(self.neighbors)} items.")
+        return True
+
+    def _build(self):
+        """(fresh model replayed from storage, activities read); the model is None without activity."""
+        built = CoOccurrenceRecommender(
+            history_size=self.history_size, max_neighbors=self.max_neighbors, max_users=self.max_users,
+            half_life=self.half_life, prune_every=self.prune_every, min_score=self.min_score,
+            interaction_store=self.interaction_store
+        )
+        now = built._epoch
+        count = 0
+        # Oldest first, so each user's window fills in time order
+        for activities in iter_activity_batches(fields=TRAIN_FIELDS, batch_size=TRAIN_BATCH_SIZE):
+            for activity in activities:
+                built._record(activity["user_id"], activity["product_id"], _weight(activity),
+                              _event_time(activity.get("timestamp"), now))
+            count += len(activities)
+
+        if not count:
+            return None, 0
+
+        built._prune(now)
+        return built, count
+
+    def _swap_in(self, built):
+        """Replace the counts with built's; the caller holds the lock."""
+        self.neighbors = built.neighbors
+        self.histories = built.histories
+        self._epoch = built._epoch
+        self.recorded_activities = built.recorded_activities
+        self.prunes = built.prunes
+        self._events_since_prune = built._events_since_prune
+        self._prune_queue = deque()
+
+    def record_activity(self, activity, now=None):
+        """Activity listener: pair the event with the user's recent products."""
+        weight = _weight(activity)
+        now = time.time() if now is None else now
+
+        with self._lock:
+            if self._backlog is not None:
+                self._backlog.append((activity["user_id"], activity["product_id"], weight, now))
+                return True
+
+            self._record(activity["user_id"], activity["product_id"], weight, now)
+            self._events_since_prune += 1
+            if self._events_since_prune >= self.prune_every:
+                self._prune(now, self._next_prune_slice())
+        return True
+
+    def _next_prune_slice(self):
+        if not self._prune_queue:
+            self._prune_queue.extend(self.neighbors)
+        count = min(self.prune_every, len(self._prune_queue))
+        return [self._prune_queue.popleft() for _ in range(count)]
+
+    def _prune(self, now, product_ids=None):
+        """Drop pairs whose decayed score is below min_score, and items left without neighbors.
+
+        Visits product_ids, or every item.
+        """
+        threshold = self.min_score * 2.0 ** ((now - self._epoch) / self.half_life)
+        for product_id in list(self.neighbors) if product_ids is None else product_ids:
+            counts = self.neighbors.get(product_id)
+            if counts is None:
+                continue
+            kept = {neighbor_id: score for neighbor_id, score in counts.items() if score >= threshold}
+            if kept:
+                self.neighbors[product_id] = kept
+            else:
+                del self.neighbors[product_id]
+
+        self.prunes += 1
+        self._events_since_prune = 0
+
+    def prune(self, now=None):
+        with self._lock:
+            self._prune(time.time() if now is None else now)
+
+    def _user_items(self, user_id, user_activity):
+        """(seed (product_id, weight) pairs, product_ids to exclude) for a user."""
+        with self._lock:
+            history = list(self.histories.get(user_id, ()))
+
+        store = self.interaction_store
+        if user_activity is None and store is not None and store.is_loaded:
+            product_weights = store.product_weights(user_id, ACTION_WEIGHTS["BUY"], ACTION_WEIGHTS["VIEW"])
+        else:
+            if user_activity is None and not history:
+                user_activity = get_user_activity(user_id=user_id, fields=INTERACTION_FIELDS, sort=False)
+
+            product_weights = {}
+            for activity in user_activity or []:
+                product_id = activity["product_id"]
+                product_weights[product_id] = max(product_weights.get(product_id, 0.0), _weight(activity))
+
+        seen = set(product_weights)
+        seen.update(product_id for product_id, _ in history)
+
+        # Recent products drive the recommendations; without any, the user's strongest ones do
+        seeds = history or heapq.nlargest(self.history_size, product_weights.items(), key=itemgetter(1))
+        return seeds, seen
+
+    def recommend(self, user_id, top_k=TOP_K_RECOMMENDATIONS, user_activity=None):
+        if not self.neighbors:
+            return []
+
+        seeds, seen = self._user_items(user_id, user_activity)
+        if not seeds:
+            return []
+
+        scores = defaultdict(float)
+        with self._lock:
+            for product_id, weight in seeds:
+                for neighbor_id, score in self.neighbors.get(product_id, {}).items():
+                    scores[neighbor_id] += weight * score
+
+        for product_id in seen:
+            scores.pop(product_id, None)
+
+        top = heapq.nlargest(top_k, scores.items(), key=itemgetter(1))
+        if not top:
+            return []
+
+        max_score = top[0][1]
+        return [
+            {"product_id": product_id, "score": score / max_score, "reason": "Frequently chosen together"}
+            for product_id, score in top
+        ]
+
+    def recommend_batch(self, user_ids, top_k=TOP_K_RECOMMENDATIONS, user_activities=None):
+        if not self.neighbors:
+            return {user_id: [] for user_id in user_ids}
+
+        return {
+            user_id: self.recommend(
+                user_id, top_k=top_k, user_activity=user_activities.get(user_id, []) if user_activities else None
+            )
+            for user_id in user_ids
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "items": len(self.neighbors),
+                "pairs": sum(len(counts) for counts in self.neighbors.values()),
+                "users": len(self.histories),
+                "recorded_activities": self.recorded_activities,
+                "prunes": self.prunes
+            }
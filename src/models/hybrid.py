@@ -1,18 +1,69 @@
+import os
 from collections import defaultdict
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
 from src.models.content_based import ContentBasedRecommender
 from src.models.collaborative import CollaborativeFilteringRecommender
-from src.database.mongo_handler import save_recommendations, get_product_details
-from src.config import TOP_K_RECOMMENDATIONS, CONTENT_BASED_WEIGHT, COLLABORATIVE_WEIGHT
+from src.models.als import ImplicitALSRecommender
+from src.models.cooccurrence import CoOccurrenceRecommender
+from src.models.cache import RecommendationCache
+from src.models.persistence import read_manifest
+from src.models.interaction_store import get_interaction_store
+from src.database.storage import (
+    save_recommendations, save_recommendations_bulk, get_product_details, get_user_activity, get_users_activity,
+    get_recommendations, get_last_activity_timestamp, INTERACTION_FIELDS, PRODUCT_DISPLAY_FIELDS
+)
+from src.config import (
+    TOP_K_RECOMMENDATIONS, CONTENT_BASED_WEIGHT, COLLABORATIVE_WEIGHT, COOCCURRENCE_WEIGHT, HYBRID_CONCURRENT,
+    HYBRID_MAX_WORKERS, SERVE_STORED_RECOMMENDATIONS, RECOMMENDATION_TTL_SECONDS, RECOMMENDATION_CACHE_ENABLED,
+    COLLAB_ALGORITHM, COLLAB_NUM_FACTORS, COLLAB_FOLD_IN_ACTIVITY, INTERACTION_STORE_ENABLED
+)
+
+
+def _parse_timestamp(value):
+    """Parse an ISO timestamp into a naive local datetime, or None."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
 
 class HybridRecommender:
     
-    def __init__(self):
-        self.content_recommender = ContentBasedRecommender()
-        self.collaborative_recommender = CollaborativeFilteringRecommender()
+    def __init__(self, concurrent=HYBRID_CONCURRENT, serve_stored=SERVE_STORED_RECOMMENDATIONS,
+                 recommendation_ttl=RECOMMENDATION_TTL_SECONDS, use_cache=RECOMMENDATION_CACHE_ENABLED,
+                 interaction_store=None, cooccurrence_recommender=None, fold_in_activity=COLLAB_FOLD_IN_ACTIVITY):
+        if interaction_store is None and INTERACTION_STORE_ENABLED:
+            interaction_store = get_interaction_store()
+        self.interaction_store = interaction_store
+        self.content_recommender = ContentBasedRecommender(interaction_store=interaction_store)
+        if COLLAB_ALGORITHM == "als":
+            self.collaborative_recommender = ImplicitALSRecommender(
+                num_factors=COLLAB_NUM_FACTORS, interaction_store=interaction_store
+            )
+        else:
+            self.collaborative_recommender = CollaborativeFilteringRecommender(interaction_store=interaction_store)
+        # A co-occurrence model passed in is shared with the live recommender and kept current by
+        # the activity stream, so train() leaves it alone
+        self._owns_cooccurrence = cooccurrence_recommender is None
+        self.cooccurrence_recommender = cooccurrence_recommender or CoOccurrenceRecommender(
+            interaction_store=interaction_store
+        )
         self.content_weight = CONTENT_BASED_WEIGHT
         self.collab_weight = COLLABORATIVE_WEIGHT
+        self.cooccurrence_weight = COOCCURRENCE_WEIGHT
+        self.concurrent = concurrent
+        self.serve_stored = serve_stored
+        self.recommendation_ttl = recommendation_ttl
+        self.cache = RecommendationCache() if use_cache else None
+        self.fold_in_activity = fold_in_activity
+        self._executor = None
     
     def train(self):
         print("Training content-based model...")
@@ -23,8 +74,46 @@ class HybridRecommender:
         collab_trained = self.collaborative_recommender.train()
         print(f"Collaborative model trained: {collab_trained}")
         
+        # Optional: an empty co-occurrence model simply contributes nothing
+        if self._owns_cooccurrence:
+            print("Building co-occurrence model...")
+            self.cooccurrence_recommender.train()
+        
         return content_trained and collab_trained
     
+    def save(self, path):
+        """Persist both sub-models under path/content and path/collaborative."""
+        content_saved = self.content_recommender.save(os.path.join(path, "content"))
+        collab_saved = self.collaborative_recommender.save(os.path.join(path, "collaborative"))
+        return content_saved and collab_saved
+    
+    @staticmethod
+    def snapshot_exists(path):
+        return (
+            read_manifest(os.path.join(path, "content")) is not None
+            and read_manifest(os.path.join(path, "collaborative")) is not None
+        )
+    
+    @classmethod
+    def load(cls, path, mmap=True, **kwargs):
+        """Build a ready-to-serve recommender from a saved snapshot without training.
+        
+        The co-occurrence model is not part of snapshots and starts empty;
+        build it with its own train() or pass in the live one.
+        """
+        recommender = cls(**kwargs)
+        recommender.content_recommender = ContentBasedRecommender.load(os.path.join(path, "content"), mmap=mmap)
+        
+        collab_path = os.path.join(path, "collaborative")
+        if read_manifest(collab_path)["model"] == ImplicitALSRecommender.__name__:
+            recommender.collaborative_recommender = ImplicitALSRecommender.load(collab_path, mmap=mmap)
+        else:
+            recommender.collaborative_recommender = CollaborativeFilteringRecommender.load(collab_path, mmap=mmap)
+        
+        recommender.content_recommender.interaction_store = recommender.interaction_store
+        recommender.collaborative_recommender.interaction_store = recommender.interaction_store
+        return recommender
+    
     def _normalize_scores(self, recommendations):
         if not recommendations:
             return []
@@ -43,9 +132,53 @@ class HybridRecommender:
             
         return normalized_recs
     
+    def _uses_interaction_store(self):
+        return self.interaction_store is not None and self.interaction_store.is_loaded
+    
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=HYBRID_MAX_WORKERS, thread_name_prefix="hybrid")
+        return self._executor
+    
+    def _recommend_concurrently(self, user_id, top_k):
+        """Run the collaborative scorer on the thread pool while the activity
+        fetch and content scoring happen on the calling thread.
+        
+        Activity is fetched once and shared. A user the collaborative model
+        already knows needs no activity there (seen items come from its own
+        interaction matrix), so it starts scoring before the fetch returns and
+        latency becomes max(collaborative, fetch + content) instead of the sum.
+        The co-occurrence model is cheap and scores on the calling thread.
+        """
+        executor = self._get_executor()
+        collab = self.collaborative_recommender
+        
+        # Both models read the user's interactions from the store; nothing to fetch
+        if self._uses_interaction_store():
+            collab_future = executor.submit(collab.recommend, user_id, top_k=top_k)
+            content_recs = self.content_recommender.recommend(user_id, top_k=top_k)
+            cooccurrence_recs = self.cooccurrence_recommender.recommend(user_id, top_k=top_k)
+            return content_recs, collab_future.result(), cooccurrence_recs
+        
+        if collab.is_trained and not collab.has_user_state(user_id):
+            user_activity = get_user_activity(user_id=user_id, fields=INTERACTION_FIELDS, sort=False)
+            collab_future = executor.submit(collab.recommend, user_id, top_k=top_k, user_activity=user_activity)
+        else:
+            collab_future = executor.submit(collab.recommend, user_id, top_k=top_k)
+            user_activity = get_user_activity(user_id=user_id, fields=INTERACTION_FIELDS, sort=False)
+        
+        content_recs = self.content_recommender.recommend(user_id, top_k=top_k, user_activity=user_activity)
+        cooccurrence_recs = self.cooccurrence_recommender.recommend(user_id, top_k=top_k, user_activity=user_activity)
+        
+        return content_recs, collab_future.result(), cooccurrence_recs
+    
     def recommend(self, user_id, top_k=TOP_K_RECOMMENDATIONS):
-        content_recs = self.content_recommender.recommend(user_id, top_k=top_k*2)
-        collab_recs = self.collaborative_recommender.recommend(user_id, top_k=top_k*2)
+        if self.concurrent:
+            content_recs, collab_recs, cooccurrence_recs = self._recommend_concurrently(user_id, top_k*2)
+        else:
+            content_recs = self.content_recommender.recommend(user_id, top_k=top_k*2)
+            collab_recs = self.collaborative_recommender.recommend(user_id, top_k=top_k*2)
+            cooccurrence_recs = self.cooccurrence_recommender.recommend(user_id, top_k=top_k*2)
         
         print(f"Content-based recommendations for {user_id}: {len(content_recs)}")
         if content_recs:
@@ -57,25 +190,46 @@ class HybridRecommender:
             for i, rec in enumerate(collab_recs[:3]):
                 print(f"  {i+1}. {rec['product_id']} - Score: {rec['score']}")
         
+        print(f"Co-occurrence recommendations for {user_id}: {len(cooccurrence_recs)}")
+        
+        recommendations, counts = self._combine_recommendations(content_recs, collab_recs, top_k, cooccurrence_recs)
+        
+        print(f"Final recommendations: Content: {counts[0]}, Collaborative: {counts[1]}, Hybrid: {counts[2]}, "
+              f"Co-occurrence: {counts[3]}")
+        return recommendations
+    
+    def _combine_recommendations(self, content_recs, collab_recs, top_k, cooccurrence_recs=None):
+        """Weighted merge of the models' lists.
+        
+        Co-occurrence scores are added on top of the content/collaborative
+        blend, so without them the scores are unchanged.
+        
+        Returns (recommendations, (content_count, collab_count, hybrid_count, cooccurrence_count)).
+        """
         content_recs = self._normalize_scores(content_recs)
         collab_recs = self._normalize_scores(collab_recs)
+        cooccurrence_recs = self._normalize_scores(cooccurrence_recs)
         
         content_dict = {rec["product_id"]: rec["score"] for rec in content_recs}
         collab_dict = {rec["product_id"]: rec["score"] for rec in collab_recs}
+        cooccurrence_dict = {rec["product_id"]: rec["score"] for rec in cooccurrence_recs}
         
-        all_product_ids = set(content_dict.keys()) | set(collab_dict.keys())
+        all_product_ids = set(content_dict.keys()) | set(collab_dict.keys()) | set(cooccurrence_dict.keys())
         
         final_scores = {}
         final_reasons = {}
         content_count = 0
         collab_count = 0
         hybrid_count = 0
+        cooccurrence_count = 0
         
         for product_id in all_product_ids:
             content_score = content_dict.get(product_id, 0)
             collab_score = collab_dict.get(product_id, 0)
+            cooccurrence_score = cooccurrence_dict.get(product_id, 0)
             
             weighted_avg = (content_score * self.content_weight) + (collab_score * self.collab_weight)
+            weighted_avg += cooccurrence_score * self.cooccurrence_weight
             final_scores[product_id] = weighted_avg
             
             if content_score > 0 and collab_score > 0:
@@ -84,9 +238,12 @@ class HybridRecommender:
             elif content_score > 0:
                 final_reasons[product_id] = "Content-based similarity"
                 content_count += 1
-            else:
+            elif collab_score > 0 or product_id not in cooccurrence_dict:
                 final_reasons[product_id] = "Collaborative filtering similarity"
                 collab_count += 1
+            else:
+                final_reasons[product_id] = "Frequently chosen together"
+                cooccurrence_count += 1
         
         sorted_products = sorted(final_scores.items(), key=lambda x: x[1], reverse=True)
         
@@ -98,8 +255,7 @@ class HybridRecommender:
                 "reason": final_reasons[product_id]
             })
         
-        print(f"Final recommendations: Content: {content_count}, Collaborative: {collab_count}, Hybrid: {hybrid_count}")
-        return recommendations
+        return recommendations, (content_count, collab_count, hybrid_count, cooccurrence_count)
     
     def generate_recommendations(self, user_id, top_k=TOP_K_RECOMMENDATIONS):
         recommendations = self.recommend(user_id, top_k=top_k)
@@ -107,12 +263,77 @@ class HybridRecommender:
         if not recommendations:
             return []
         
-        save_recommendations(user_id, recommendations)
+        save_recommendations(user_id, recommendations, top_k=top_k)
         
         return recommendations
     
+    def _get_fresh_stored_recommendations(self, user_id, top_k):
+        """Stored recommendations if they are still fresh, else None.
+        
+        Fresh means younger than recommendation_ttl, or (once the TTL has
+        passed) newer than the user's most recent activity. The document must
+        have been generated for at least top_k products; its list may be
+        shorter when the user had fewer candidates. The common case costs a
+        single indexed find_one.
+        """
+        stored = get_recommendations(user_id)
+        if not stored:
+            return None
+        
+        recommendations = stored.get("recommended_products") or []
+        stored_at = _parse_timestamp(stored.get("timestamp"))
+        # Documents saved without top_k only prove that many products were requested
+        stored_top_k = stored.get("top_k", len(recommendations))
+        if stored_top_k < top_k or stored_at is None:
+            return None
+        
+        if self.recommendation_ttl and datetime.now() - stored_at <= timedelta(seconds=self.recommendation_ttl):
+            return recommendations[:top_k]
+        
+        last_activity = _parse_timestamp(get_last_activity_timestamp(user_id))
+        if last_activity is None or stored_at >= last_activity:
+            return recommendations[:top_k]
+        
+        return None
+    
+    def record_activity(self, activity):
+        """Activity listener: fold the event into the collaborative and co-occurrence models and drop cached results."""
+        if self.fold_in_activity:
+            self.collaborative_recommender.fold_in_activity(activity)
+        self.cooccurrence_recommender.record_activity(activity)
+        self.invalidate_user(activity["user_id"])
+    
+    def needs_retrain(self):
+        return self.collaborative_recommender.needs_retrain()
+    
+    def invalidate_user(self, user_id):
+        """Forget cached results for a user whose activity just changed."""
+        if self.cache is not None:
+            self.cache.invalidate_user(user_id)
+    
     def get_formatted_recommendations(self, user_id, top_k=TOP_K_RECOMMENDATIONS):
-        recommendations = self.generate_recommendations(user_id, top_k=top_k)
+        generation = None
+        if self.cache is not None:
+            cached = self.cache.get(user_id, top_k)
+            if cached is not None:
+                return cached
+            # Activity arriving while we compute invalidates the user; put() then skips the stale result
+            generation = self.cache.generation(user_id)
+        
+        result = self._build_formatted_recommendations(user_id, top_k)
+        
+        if self.cache is not None and result["recommended_products"]:
+            self.cache.put(user_id, top_k, result, generation=generation)
+        
+        return result
+    
+    def _build_formatted_recommendations(self, user_id, top_k):
+        recommendations = None
+        if self.serve_stored:
+            recommendations = self._get_fresh_stored_recommendations(user_id, top_k)
+        
+        if recommendations is None:
+            recommendations = self.generate_recommendations(user_id, top_k=top_k)
         
         if not recommendations:
             return {
@@ -121,8 +342,11 @@ class HybridRecommender:
             }
         
         product_ids = [rec["product_id"] for rec in recommendations]
-        product_details = get_product_details(product_ids)
+        product_details = get_product_details(product_ids, fields=PRODUCT_DISPLAY_FIELDS)
         
+        return self._format_recommendations(user_id, recommendations, product_details)
+    
+    def _format_recommendations(self, user_id, recommendations, product_details):
         formatted_recs = []
         for rec in recommendations:
             product_id = rec["product_id"]
@@ -144,4 +368,53 @@ class HybridRecommender:
         return {
             "user_id": user_id,
             "recommended_products": formatted_recs
-        }
\ No newline at end of file
+        }
+    
+    def recommend_batch(self, user_ids, top_k=TOP_K_RECOMMENDATIONS):
+        """Recommend for many users at once.
+        
+        Uses one bulk activity query (none once the interaction store is
+        loaded), batched content scoring and one
+        collaborative factor-matrix multiply per batch; co-occurrence scores
+        come from in-memory neighbor lists. Returns a dict of
+        user_id -> recommendations.
+        """
+        if self._uses_interaction_store():
+            user_activities = None
+            content_results = self.content_recommender.recommend_batch(
+                dict.fromkeys(user_ids), top_k=top_k*2
+            )
+        else:
+            user_activities = get_users_activity(user_ids, fields=INTERACTION_FIELDS, sort=False)
+            content_results = self.content_recommender.recommend_batch(user_activities, top_k=top_k*2)
+        
+        collab_results = self.collaborative_recommender.recommend_batch(
+            user_ids, top_k=top_k*2, user_activities=user_activities
+        )
+        cooccurrence_results = self.cooccurrence_recommender.recommend_batch(
+            user_ids, top_k=top_k*2, user_activities=user_activities
+        )
+        
+        results = {}
+        for user_id in user_ids:
+            results[user_id], _ = self._combine_recommendations(
+                content_results.get(user_id, []), collab_results.get(user_id, []), top_k,
+                cooccurrence_results.get(user_id, [])
+            )
+        
+        print(f"Batch recommendations generated for {len(user_ids)} users.")
+        return results
+    
+    def generate_batch_recommendations(self, user_ids, top_k=TOP_K_RECOMMENDATIONS):
+        results = self.recommend_batch(user_ids, top_k=top_k)
+        save_recommendations_bulk(results, top_k=top_k)
+        return results
+    
+    def get_formatted_batch_recommendations(self, user_ids, top_k=TOP_K_RECOMMENDATIONS):
+        """Batch variant of get_formatted_recommendations with a single $in product lookup."""
+        results = self.generate_batch_recommendations(user_ids, top_k=top_k)
+        
+        product_ids = list({rec["product_id"] for recs in results.values() for rec in recs})
+        product_details = get_product_details(product_ids, fields=PRODUCT_DISPLAY_FIELDS)
+        
+        return [self._format_recommendations(user_id, results[user_id], product_details) for user_id in results]
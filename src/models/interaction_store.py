@@ -0,0 +1,174 @@
+"""
+In-memory per-user interaction store, kept current from the ingestion path.
+
+load() builds it once from storage. After that, record_activity, subscribed
+to the activity bus, applies every ingested event, so the recommenders can
+read a user's interactions without querying the database per request.
+
+Each user's row holds deduplicated products with separate BUY and other
+(view) counts. The models apply their own action weights to these counts.
+Rows from load() share CSR-style numpy arrays. A user who gets new
+activity is copied into small typed arrays that are updated in place.
+"""
+import threading
+from array import array
+
+import numpy as np
+
+from src.database.storage import load_interaction_arrays
+
+
+class InteractionStore:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.is_loaded = False
+        self.applied_activities = 0
+        self._reset()
+
+    def _reset(self):
+        self.product_ids = []
+        self._product_codes = {}
+        self._user_rows = {}
+        self._indptr = np.zeros(1, dtype=np.int64)
+        self._codes = np.empty(0, dtype=np.int32)
+        self._buys = np.empty(0, dtype=np.float32)
+        self._views = np.empty(0, dtype=np.float32)
+        # user_id -> (codes, buys, views) typed arrays for users updated since load
+        self._updated = {}
+        self.new_users = 0
+
+    def load(self):
+        """(Re)build the store from all stored activity; returns False if there is none."""
+        # BUY scores 1 and anything else 0, so one scan yields both counts
+        user_ids, product_ids, rows, cols, data = load_interaction_arrays({"BUY": 1.0}, default_weight=0.0)
+
+        with self._lock:
+            self._reset()
+            self.product_ids = list(product_ids)
+            self._product_codes = {product_id: code for code, product_id in enumerate(self.product_ids)}
+            self._user_rows = {user_id: row for row, user_id in enumerate(user_ids)}
+            self._indptr = np.zeros(len(user_ids) + 1, dtype=np.int64)
+
+            if len(rows):
+                keys = rows.astype(np.int64) * len(product_ids) + cols
+                order = np.argsort(keys, kind="stable")
+                keys, buys = keys[order], data[order]
+
+                unique_keys, starts = np.unique(keys, return_index=True)
+                counts = np.diff(np.append(starts, len(keys)))
+                self._buys = np.add.reduceat(buys, starts).astype(np.float32)
+                self._views = (counts - self._buys).astype(np.float32)
+                self._codes = (unique_keys % len(product_ids)).astype(np.int32)
+                np.cumsum(np.bincount(unique_keys // len(product_ids), minlength=len(user_ids)), out=self._indptr[1:])
+
+            self.is_loaded = True
+
+        print(f"Interaction store loaded: {len(user_ids)} users, {len(self._codes)} user-product pairs.")
+        return len(rows) > 0
+
+    def _product_code(self, product_id):
+        code = self._product_codes.get(product_id)
+        if code is None:
+            code = len(self.product_ids)
+            self._product_codes[product_id] = code
+            self.product_ids.append(product_id)
+        return code
+
+    def _row_arrays(self, user_id):
+        """(codes, buys, views) of a user, from the updated rows or the loaded arrays, or None."""
+        updated = self._updated.get(user_id)
+        if updated is not None:
+            return updated
+
+        row = self._user_rows.get(user_id)
+        if row is None:
+            return None
+        start, end = self._indptr[row], self._indptr[row + 1]
+        return self._codes[start:end], self._buys[start:end], self._views[start:end]
+
+    def record_activity(self, activity):
+        """Activity listener: count the event in its user's row. Ignored until load() has run."""
+        if not self.is_loaded:
+            return False
+
+        user_id = activity["user_id"]
+        is_buy = activity.get("action_type") == "BUY"
+
+        with self._lock:
+            code = self._product_code(activity["product_id"])
+
+            row = self._updated.get(user_id)
+            if row is None:
+                current = self._row_arrays(user_id)
+                if current is None:
+                    row = (array("i"), array("f"), array("f"))
+                    self.new_users += 1
+                else:
+                    row = (array("i", current[0].tolist()), array("f", current[1].tolist()),
+                           array("f", current[2].tolist()))
+                self._updated[user_id] = row
+
+            codes, buys, views = row
+            try:
+                position = codes.index(code)
+            except ValueError:
+                position = len(codes)
+                codes.append(code)
+                buys.append(0.0)
+                views.append(0.0)
+
+            if is_buy:
+                buys[position] += 1
+            else:
+                views[position] += 1
+            self.applied_activities += 1
+
+        return True
+
+    def has_user(self, user_id):
+        with self._lock:
+            return user_id in self._updated or user_id in self._user_rows
+
+    def product_weights(self, user_id, buy_weight, view_weight):
+        """Dict of product_id -> buys * buy_weight + views * view_weight ({} for unknown users)."""
+        with self._lock:
+            row = self._row_arrays(user_id)
+            if row is None:
+                return {}
+            codes, buys, views = (np.asarray(values) for values in row)
+            weights = buys.astype(np.float64) * buy_weight + views.astype(np.float64) * view_weight
+            return {self.product_ids[code]: weight for code, weight in zip(codes.tolist(), weights.tolist())}
+
+    def seen_products(self, user_id):
+        """product_ids the user has interacted with."""
+        with self._lock:
+            row = self._row_arrays(user_id)
+            if row is None:
+                return []
+            return [self.product_ids[code] for code in np.asarray(row[0]).tolist()]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": self.is_loaded,
+                "users": len(self._user_rows) + self.new_users,
+                "products": len(self.product_ids),
+                "loaded_pairs": len(self._codes),
+                "updated_users": len(self._updated),
+                "applied_activities": self.applied_activities
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_interaction_store():
+    """Process-wide store shared by the live models and the ingestion listeners."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = InteractionStore()
+    return _store
@@ -0,0 +1,78 @@
+"""
+Versioned on-disk format for trained model artifacts.
+
+A model directory holds one .npy file per array plus a manifest.json that is
+written last, so a directory without a manifest is never treated as a valid
+model. Arrays are loaded with np.load(mmap_mode='r') by default, letting
+several processes share the same physical pages.
+"""
+import json
+import os
+import time
+
+import numpy as np
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def save_arrays(path, model_name, arrays, metadata=None):
+    """Write arrays and a manifest describing them into directory path."""
+    os.makedirs(path, exist_ok=True)
+    
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(array), allow_pickle=False)
+    
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "model": model_name,
+        "created_at": time.time(),
+        "arrays": sorted(arrays),
+        "metadata": metadata or {}
+    }
+    
+    tmp_path = os.path.join(path, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+    
+    return manifest
+
+
+def read_manifest(path):
+    """Manifest of the model stored at path, or None if there is no complete model."""
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    
+    if manifest.get("format_version") != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported model format version {manifest.get('format_version')} in {path} "
+            f"(expected {FORMAT_VERSION})"
+        )
+    
+    return manifest
+
+
+def load_arrays(path, expected_models=None, mmap=True):
+    """Load (arrays, metadata) written by save_arrays.
+    
+    With mmap=True arrays are read-only memory maps of the .npy files.
+    """
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No model manifest found in {path}")
+    
+    if expected_models and manifest["model"] not in expected_models:
+        raise ValueError(f"{path} holds a {manifest['model']} model, expected one of {expected_models}")
+    
+    mmap_mode = "r" if mmap else None
+    arrays = {
+        name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        for name in manifest["arrays"]
+    }
+    
+    return arrays, manifest["metadata"]
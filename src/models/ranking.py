@@ -0,0 +1,44 @@
+import numpy as np
+
+
+def top_k_indices(scores, k):
+    """Indices of the k highest finite scores, best first.
+    
+    Uses argpartition so selection is O(n) plus an O(k log k) sort of the
+    winners. Masked entries (-inf) are never returned.
+    """
+    n = scores.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    
+    if k < n:
+        candidates = np.argpartition(scores, n - k)[n - k:]
+    else:
+        candidates = np.arange(n)
+    
+    candidates = candidates[np.argsort(scores[candidates])[::-1]]
+    return candidates[np.isfinite(scores[candidates])]
+
+
+def top_k_indices_2d(scores, k):
+    """Row-wise top_k_indices for a (batch, n_items) score matrix.
+    
+    Returns a list with one index array per row.
+    """
+    n = scores.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        return [np.empty(0, dtype=np.intp) for _ in range(scores.shape[0])]
+    
+    if k < n:
+        candidates = np.argpartition(scores, n - k, axis=1)[:, n - k:]
+    else:
+        candidates = np.broadcast_to(np.arange(n), scores.shape)
+    
+    candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+    order = np.argsort(candidate_scores, axis=1)[:, ::-1]
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    candidate_scores = np.take_along_axis(candidate_scores, order, axis=1)
+    
+    return [row[np.isfinite(row_scores)] for row, row_scores in zip(candidates, candidate_scores)]
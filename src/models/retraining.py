@@ -0,0 +1,197 @@
+import threading
+import time
+
+from src.config import (
+    RETRAIN_INTERVAL_SECONDS, RETRAIN_ACTIVITY_THRESHOLD, RETRAIN_DRIFT_CHECK_SECONDS, RETRAIN_RETRY_SECONDS
+)
+
+
+class RetrainingScheduler:
+    """Retrains a fresh model off the request path and hot-swaps it in.
+    
+    A retrain is triggered when interval_seconds have passed since the last
+    one, when activity_threshold new activities have been recorded, or when
+    the optional drift_check callable (polled every drift_check_seconds)
+    reports that incremental updates have drifted too far. The
+    new model is fully trained before on_swap is called, so readers only ever
+    see a complete model. The interval is counted from start() until the
+    first training. After a failure no trigger fires for retry_seconds,
+    doubling per consecutive failure up to interval_seconds.
+    """
+    
+    def __init__(self, model_factory, on_swap, interval_seconds=RETRAIN_INTERVAL_SECONDS,
+                 activity_threshold=RETRAIN_ACTIVITY_THRESHOLD, poll_seconds=1.0,
+                 drift_check=None, drift_check_seconds=RETRAIN_DRIFT_CHECK_SECONDS,
+                 retry_seconds=RETRAIN_RETRY_SECONDS):
+        self.model_factory = model_factory
+        self.on_swap = on_swap
+        self.interval_seconds = interval_seconds
+        self.activity_threshold = activity_threshold
+        self.poll_seconds = poll_seconds
+        self.drift_check = drift_check
+        self.drift_check_seconds = drift_check_seconds
+        self.retry_seconds = retry_seconds
+        self.drift_retrains = 0
+        self._last_drift_check = time.monotonic()
+        
+        self.pending_activities = 0
+        self.last_trained_at = None
+        self.last_training_duration = None
+        self.trainings_completed = 0
+        self.trainings_failed = 0
+        self.consecutive_failures = 0
+        self.last_failed_at = None
+        self.is_training = False
+        self._retry_at = None
+        self._started_at = None
+        
+        self._lock = threading.Lock()
+        self._train_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def record_activity(self, activity=None):
+        """Activity listener: count new activity and wake the scheduler at the threshold."""
+        with self._lock:
+            self.pending_activities += 1
+            if self.activity_threshold and self.pending_activities >= self.activity_threshold:
+                self._wakeup.set()
+    
+    def mark_trained(self, duration):
+        """Record a training that happened outside the scheduler (e.g. at startup)."""
+        with self._lock:
+            self.last_trained_at = time.time()
+            self.last_training_duration = duration
+            self.trainings_completed += 1
+    
+    def _is_due(self):
+        with self._lock:
+            now = time.time()
+            if self._retry_at is not None and now < self._retry_at:
+                return False
+            if self.activity_threshold and self.pending_activities >= self.activity_threshold:
+                return True
+            
+            since = self.last_trained_at if self.last_trained_at is not None else self._started_at
+            if self.interval_seconds and since is not None and now - since >= self.interval_seconds:
+                return True
+        
+        return self._has_drifted()
+    
+    def _has_drifted(self):
+        if self.drift_check is None or time.monotonic() - self._last_drift_check < self.drift_check_seconds:
+            return False
+        
+        self._last_drift_check = time.monotonic()
+        try:
+            drifted = bool(self.drift_check())
+        except Exception as e:
+            print(f"Error checking model drift: {e}")
+            return False
+        
+        if drifted:
+            print("Model drift detected, scheduling retrain.")
+            with self._lock:
+                self.drift_retrains += 1
+        return drifted
+    
+    def retrain_now(self):
+        """Train a new model and swap it in. Returns True on success."""
+        if not self._train_lock.acquire(blocking=False):
+            print("Retraining already in progress.")
+            return False
+        
+        try:
+            with self._lock:
+                consumed = self.pending_activities
+                self.is_training = True
+            
+            start = time.perf_counter()
+            try:
+                model = self.model_factory()
+                trained = model.train()
+            except Exception as e:
+                print(f"Error retraining model: {e}")
+                trained = False
+            duration = time.perf_counter() - start
+            
+            if not trained:
+                with self._lock:
+                    self.trainings_failed += 1
+                    self.consecutive_failures += 1
+                    self.last_failed_at = time.time()
+                    delay = self.retry_seconds * 2 ** (self.consecutive_failures - 1)
+                    if self.interval_seconds:
+                        delay = min(delay, max(self.interval_seconds, self.retry_seconds))
+                    self._retry_at = self.last_failed_at + delay
+                print(f"Retraining failed; next automatic retry in {delay:.0f}s.")
+                return False
+            
+            self.on_swap(model)
+            
+            with self._lock:
+                self.pending_activities -= consumed
+                self.last_trained_at = time.time()
+                self.last_training_duration = duration
+                self.trainings_completed += 1
+                self.consecutive_failures = 0
+                self._retry_at = None
+            
+            print(f"Model retrained in {duration:.2f}s and swapped in.")
+            return True
+        finally:
+            with self._lock:
+                self.is_training = False
+            self._train_lock.release()
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(timeout=self.poll_seconds)
+            self._wakeup.clear()
+            
+            if self._stopped.is_set():
+                break
+            
+            if self._is_due():
+                self.retrain_now()
+    
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return False
+        
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = time.time()
+        
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="retraining-scheduler")
+        self._thread.daemon = True
+        self._thread.start()
+        return True
+    
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        return True
+    
+    def status(self):
+        with self._lock:
+            return {
+                "running": bool(self._thread and self._thread.is_alive()),
+                "is_training": self.is_training,
+                "model_age_seconds": time.time() - self.last_trained_at if self.last_trained_at else None,
+                "last_trained_at": self.last_trained_at,
+                "last_training_duration_seconds": self.last_training_duration,
+                "trainings_completed": self.trainings_completed,
+                "trainings_failed": self.trainings_failed,
+                "consecutive_failures": self.consecutive_failures,
+                "last_failed_at": self.last_failed_at,
+                "next_retry_in_seconds": max(self._retry_at - time.time(), 0.0) if self._retry_at else None,
+                "drift_retrains": self.drift_retrains,
+                "pending_activities": self.pending_activities,
+                "interval_seconds": self.interval_seconds,
+                "activity_threshold": self.activity_threshold
+            }
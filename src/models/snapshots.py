@@ -0,0 +1,236 @@
+"""
+Versioned model snapshots shared by several API worker processes.
+
+Each published model lives in MODEL_DIR/snapshots/<version> and MODEL_DIR/CURRENT
+names the version to serve. CURRENT is replaced atomically after the snapshot
+is fully written, so a worker polling it never sees a half-written model.
+Workers memory-map the snapshot, so N workers share one copy of the arrays.
+"""
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; every process acts alone there
+    fcntl = None
+
+from src.models.hybrid import HybridRecommender
+from src.config import MODEL_RELOAD_POLL_SECONDS, MODEL_SNAPSHOTS_KEEP
+
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = "snapshots.lock"
+
+
+def _new_version():
+    """Sortable version name: UTC time to the nanosecond plus the publishing pid."""
+    seconds, nanos = divmod(time.time_ns(), 10**9)
+    return f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime(seconds))}.{nanos:09d}-{os.getpid()}"
+
+
+def current_snapshot(model_dir):
+    """(version, path) of the published snapshot, or (None, None) if there is none."""
+    try:
+        with open(os.path.join(model_dir, CURRENT_FILE), "r") as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None, None
+
+    if not version:
+        return None, None
+
+    return version, os.path.join(model_dir, SNAPSHOTS_DIR, version)
+
+
+def publish_snapshot(model_dir, recommender, keep=MODEL_SNAPSHOTS_KEEP):
+    """Save recommender as a new version and point CURRENT at it. Returns the version or None."""
+    version = _new_version()
+    path = os.path.join(model_dir, SNAPSHOTS_DIR, version)
+
+    if not recommender.save(path):
+        shutil.rmtree(path, ignore_errors=True)
+        return None
+
+    tmp_path = os.path.join(model_dir, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        f.write(version)
+    os.replace(tmp_path, os.path.join(model_dir, CURRENT_FILE))
+
+    prune_snapshots(model_dir, keep)
+    print(f"Published model snapshot {version}.")
+    return version
+
+
+def prune_snapshots(model_dir, keep=MODEL_SNAPSHOTS_KEEP):
+    """Delete all but the newest keep versions (never the current one).
+
+    Workers still mapping a deleted version keep their pages until they unmap.
+    """
+    snapshots_dir = os.path.join(model_dir, SNAPSHOTS_DIR)
+    if not os.path.isdir(snapshots_dir):
+        return []
+
+    current, _ = current_snapshot(model_dir)
+    versions = sorted(os.listdir(snapshots_dir), reverse=True)
+    removed = [v for v in versions[keep:] if v != current]
+
+    for version in removed:
+        shutil.rmtree(os.path.join(snapshots_dir, version), ignore_errors=True)
+
+    return removed
+
+
+@contextmanager
+def snapshot_lock(model_dir):
+    """Cross-process lock so only one worker trains the initial model."""
+    os.makedirs(model_dir, exist_ok=True)
+    with open(os.path.join(model_dir, LOCK_FILE), "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class RetrainLeader:
+    """Non-blocking cross-process lock held for the life of the worker.
+
+    Exactly one worker wins it and runs the retraining scheduler; the others
+    only follow published snapshots.
+    """
+
+    def __init__(self, model_dir):
+        self.path = os.path.join(model_dir, "retrain.lock")
+        self._file = None
+
+    def acquire(self):
+        if self._file:
+            return True
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        lock_file = open(self.path, "a")
+        if fcntl:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file:
+            if fcntl:
+                fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    @property
+    def is_leader(self):
+        return self._file is not None
+
+
+class SnapshotWatcher:
+    """Polls CURRENT and hot-swaps to each newly published snapshot via on_load.
+
+    Given a RetrainLeader it also tries to acquire it on every poll while this
+    worker is a follower, and calls on_leader once it does, so retraining
+    moves to another worker when the leader exits.
+    """
+
+    def __init__(self, model_dir, on_load, poll_seconds=MODEL_RELOAD_POLL_SECONDS, loader=HybridRecommender.load,
+                 leader=None, on_leader=None):
+        self.model_dir = model_dir
+        self.on_load = on_load
+        self.poll_seconds = poll_seconds
+        self.loader = loader
+        self.leader = leader
+        self.on_leader = on_leader
+
+        self.version = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.reload_failures = 0
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def mark_loaded(self, version):
+        """Record a version this worker already serves (loaded or published itself)."""
+        with self._lock:
+            self.version = version
+            self.loaded_at = time.time()
+
+    def check_now(self):
+        """Load the published snapshot if it differs from ours. Returns True if swapped."""
+        version, path = current_snapshot(self.model_dir)
+        with self._lock:
+            if version is None or version == self.version:
+                return False
+
+        try:
+            recommender = self.loader(path)
+        except Exception as e:
+            print(f"Error loading model snapshot {version}: {e}")
+            with self._lock:
+                self.reload_failures += 1
+            return False
+
+        self.on_load(recommender)
+
+        with self._lock:
+            self.version = version
+            self.loaded_at = time.time()
+            self.reloads += 1
+
+        print(f"Worker {os.getpid()} switched to model snapshot {version}.")
+        return True
+
+    def check_leader(self):
+        """Try to become the retrain leader. Returns True if this call acquired it."""
+        if self.leader is None or self.leader.is_leader or not self.leader.acquire():
+            return False
+
+        print(f"Worker {os.getpid()} took over as retrain leader.")
+        if self.on_leader:
+            self.on_leader()
+        return True
+
+    def _run(self):
+        while not self._stopped.wait(timeout=self.poll_seconds):
+            self.check_now()
+            self.check_leader()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return False
+
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="snapshot-watcher")
+        self._thread.daemon = True
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        return True
+
+    def status(self):
+        with self._lock:
+            return {
+                "worker_pid": os.getpid(),
+                "version": self.version,
+                "loaded_at": self.loaded_at,
+                "reloads": self.reloads,
+                "reload_failures": self.reload_failures,
+                "running": bool(self._thread and self._thread.is_alive())
+            }
@@ -0,0 +1,94 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ingestion.activity_reader import iter_json_records, iter_chunks
+from src.ingestion.stream_handler import StreamingService
+
+
+def _activities(n):
+    return [
+        {"user_id": f"U{i % 3:04d}", "product_id": f"P{i:04d}", "action_type": "VIEW",
+         "timestamp": f"2024-01-01T00:00:{i:02d}", "price": 10.5 * i}
+        for i in range(n)
+    ]
+
+
+class TestActivityReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp_dir.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_json_array_small_chunks(self):
+        records = _activities(20)
+        path = self._write("activity.json", json.dumps(records, indent=2))
+        
+        for chunk_bytes in (1, 7, 64, 1 << 20):
+            self.assertEqual(list(iter_json_records(path, chunk_bytes=chunk_bytes)), records)
+
+    def test_json_array_of_numbers(self):
+        path = self._write("numbers.json", "[1, 22, 333,4444]")
+        self.assertEqual(list(iter_json_records(path, chunk_bytes=2)), [1, 22, 333, 4444])
+
+    def test_ndjson(self):
+        records = _activities(5)
+        path = self._write("activity.jsonl", "\n".join(json.dumps(r) for r in records) + "\n\n")
+        self.assertEqual(list(iter_json_records(path)), records)
+
+    def test_empty_array(self):
+        path = self._write("empty.json", " [ ] ")
+        self.assertEqual(list(iter_json_records(path)), [])
+
+    def test_truncated_array(self):
+        path = self._write("truncated.json", json.dumps(_activities(3))[:-20])
+        with self.assertRaises(ValueError):
+            list(iter_json_records(path, chunk_bytes=8))
+
+    def test_not_an_array(self):
+        path = self._write("object.json", '{"user_id": "U0001"}')
+        with self.assertRaises(ValueError):
+            list(iter_json_records(path))
+
+    def test_iter_chunks(self):
+        self.assertEqual(list(iter_chunks(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    @patch('src.ingestion.stream_handler.publish_activity')
+    @patch('src.ingestion.stream_handler.insert_activity')
+    @patch('src.ingestion.stream_handler.insert_products')
+    def test_incremental_streaming(self, mock_insert_products, mock_insert_activity, mock_publish):
+        records = _activities(4)
+        records[2]["timestamp"] = "2023-12-31T00:00:00"
+        activity_path = self._write("activity.jsonl", "\n".join(json.dumps(r) for r in records))
+        product_path = self._write("products.json", json.dumps([{"product_id": "P0001"}, {"product_id": "P0002"}]))
+        
+        service = StreamingService(activity_file=activity_path, product_file=product_path,
+                                   load_mode="incremental")
+        self.assertTrue(service.load_data())
+        self.assertEqual(service.activities, [])
+        mock_insert_products.assert_called_once_with([{"product_id": "P0001"}, {"product_id": "P0002"}])
+        
+        service.streaming = True
+        service._stream_activities(speed_factor=1000000)
+        
+        streamed = [call.args[0]["product_id"] for call in mock_insert_activity.call_args_list]
+        self.assertEqual(streamed, [r["product_id"] for r in records])
+        self.assertEqual(mock_publish.call_count, 4)
+        self.assertEqual(service.out_of_order_activities, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
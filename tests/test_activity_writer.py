@@ -0,0 +1,111 @@
+import unittest
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ingestion.activity_writer import BufferedActivityWriter
+
+
+class TestBufferedActivityWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.batches = []
+
+    def _activity(self, i):
+        return {"user_id": f"U{i:04d}", "product_id": "P0001", "action_type": "VIEW"}
+
+    def test_flushes_by_size(self):
+        writer = BufferedActivityWriter(self.batches.append, flush_size=3, flush_interval=5.0)
+        writer.start()
+        for i in range(6):
+            writer.submit(self._activity(i))
+        
+        deadline = time.time() + 2
+        while sum(map(len, self.batches)) < 6 and time.time() < deadline:
+            time.sleep(0.01)
+        writer.stop(timeout=2)
+        
+        self.assertEqual([len(batch) for batch in self.batches], [3, 3])
+        self.assertEqual(writer.metrics()["written"], 6)
+
+    def test_flushes_by_time_window(self):
+        writer = BufferedActivityWriter(self.batches.append, flush_size=100, flush_interval=0.05)
+        writer.start()
+        writer.submit(self._activity(0))
+        
+        time.sleep(0.3)
+        self.assertEqual(len(self.batches), 1)
+        writer.stop(timeout=2)
+        
+        self.assertIn("timestamp", self.batches[0][0])
+
+    def test_stop_flushes_pending_events(self):
+        writer = BufferedActivityWriter(self.batches.append, flush_size=100, flush_interval=10.0)
+        for i in range(5):
+            writer.submit(self._activity(i))
+        
+        writer.stop()
+        
+        self.assertEqual(sum(map(len, self.batches)), 5)
+        self.assertEqual(writer.metrics()["queue_depth"], 0)
+
+    def test_full_buffer_applies_backpressure_then_drops(self):
+        writer = BufferedActivityWriter(self.batches.append, max_events=2, block_seconds=0.05)
+        
+        self.assertTrue(writer.submit(self._activity(0)))
+        self.assertTrue(writer.submit(self._activity(1)))
+        start = time.perf_counter()
+        self.assertFalse(writer.submit(self._activity(2)))
+        
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+        metrics = writer.metrics()
+        self.assertEqual(metrics["dropped"], 1)
+        self.assertEqual(metrics["queue_depth"], 2)
+
+    def test_try_submit_never_blocks_or_drops(self):
+        writer = BufferedActivityWriter(self.batches.append, max_events=1, block_seconds=1.0)
+        
+        self.assertTrue(writer.try_submit(self._activity(0)))
+        start = time.perf_counter()
+        self.assertFalse(writer.try_submit(self._activity(1)))
+        
+        self.assertLess(time.perf_counter() - start, 0.5)
+        metrics = writer.metrics()
+        self.assertEqual(metrics["dropped"], 0)
+        self.assertEqual(metrics["submitted"], 1)
+
+    def test_failed_flush_is_counted(self):
+        def failing_writer(batch):
+            raise RuntimeError("database down")
+        
+        writer = BufferedActivityWriter(failing_writer)
+        writer.submit(self._activity(0))
+        writer.stop()
+        
+        metrics = writer.metrics()
+        self.assertEqual(metrics["failed"], 1)
+        self.assertEqual(metrics["written"], 0)
+        self.assertIsNotNone(metrics["last_flush_latency_ms"])
+
+    def test_only_written_batches_are_passed_on(self):
+        results = iter([RuntimeError("database down"), None])
+        
+        def flaky_writer(batch):
+            error = next(results)
+            if error:
+                raise error
+        
+        written = []
+        writer = BufferedActivityWriter(flaky_writer, flush_size=2, on_written=written.append)
+        for i in range(4):
+            writer.submit(self._activity(i))
+        writer.stop()
+        
+        self.assertEqual([[a["user_id"] for a in batch] for batch in written], [["U0002", "U0003"]])
+        self.assertEqual(writer.metrics()["failed"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+from scipy.sparse import random as sparse_random
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.als import ImplicitALSRecommender
+
+
+class TestImplicitALSRecommender(unittest.TestCase):
+
+    def setUp(self):
+        self.matrix = sparse_random(40, 60, density=0.1, format="csr", random_state=3)
+        self.matrix.data = np.where(self.matrix.data > 0.8, 5.0, 1.0)
+        self.recommender = ImplicitALSRecommender(
+            num_factors=5, iterations=3, cg_steps=20, block_size=7, num_threads=2, alpha=10.0
+        )
+
+    def _exact_solve(self, interactions, fixed, row):
+        start, end = interactions.indptr[row], interactions.indptr[row + 1]
+        columns = interactions.indices[start:end]
+        confidence = 1.0 + self.recommender.alpha * interactions.data[start:end]
+        neighbors = fixed[columns]
+        system = (
+            fixed.T @ fixed
+            + (neighbors.T * (confidence - 1.0)) @ neighbors
+            + self.recommender.regularization * np.eye(fixed.shape[1])
+        )
+        return np.linalg.solve(system, neighbors.T @ confidence)
+
+    def test_block_cg_matches_direct_solve(self):
+        rng = np.random.default_rng(0)
+        users = rng.normal(scale=0.01, size=(40, 5))
+        items = rng.normal(size=(60, 5))
+        
+        self.recommender._solve_block(self.matrix, users, items, items.T @ items, 0, 40)
+        
+        for row in [0, 13, 39]:
+            np.testing.assert_allclose(users[row], self._exact_solve(self.matrix, items, row), atol=1e-6)
+
+    def test_fit_and_fold_in(self):
+        self.recommender._fit(self.matrix)
+        self.recommender.user_item_matrix = self.matrix
+        self.recommender.index_to_product_id = {i: f"P{i:04d}" for i in range(60)}
+        self.recommender.product_id_to_index = {f"P{i:04d}": i for i in range(60)}
+        self.recommender.user_id_to_index = {f"U{i:04d}": i for i in range(40)}
+        self.recommender.is_trained = True
+        
+        self.assertEqual(self.recommender.user_factors.shape, (40, 5))
+        self.assertEqual(self.recommender.item_factors.shape, (60, 5))
+        
+        row = self.matrix[7]
+        folded = self.recommender._project(dict(zip(row.indices.tolist(), row.data.tolist())))
+        np.testing.assert_allclose(folded, self._exact_solve(self.matrix, self.recommender.item_factors, 7))
+        
+        recommendations = self.recommender.recommend("U0007", top_k=5)
+        self.assertEqual(len(recommendations), 5)
+        seen = {f"P{i:04d}" for i in row.indices}
+        for rec in recommendations:
+            self.assertNotIn(rec["product_id"], seen)
+            self.assertGreaterEqual(rec["score"], 0)
+            self.assertLessEqual(rec["score"], 1)
+
+    @patch('src.models.collaborative.load_interaction_arrays')
+    def test_train(self, mock_load):
+        coo = self.matrix.tocoo()
+        mock_load.return_value = (
+            [f"U{i:04d}" for i in range(40)], [f"P{i:04d}" for i in range(60)], coo.row, coo.col, coo.data
+        )
+        
+        self.assertTrue(self.recommender.train())
+        self.assertTrue(self.recommender.is_trained)
+        self.assertEqual(self.recommender.global_mean, 0)
+
+    @patch('src.models.collaborative.load_interaction_arrays')
+    def test_fold_in_gram_is_computed_once(self, mock_load):
+        coo = self.matrix.tocoo()
+        mock_load.return_value = (
+            [f"U{i:04d}" for i in range(40)], [f"P{i:04d}" for i in range(60)], coo.row, coo.col, coo.data
+        )
+        self.assertTrue(self.recommender.train())
+        basis = self.recommender._fold_in_basis
+        self.assertIs(basis[0], self.recommender.item_factors)
+        
+        row = self.matrix[7]
+        row_weights = dict(zip(row.indices.tolist(), row.data.tolist()))
+        for _ in range(3):
+            folded = self.recommender._project(row_weights)
+        self.assertIs(self.recommender._fold_in_basis, basis)
+        np.testing.assert_allclose(folded, self._exact_solve(self.matrix, self.recommender.item_factors, 7))
+        
+        # A snapshot load prepares it alongside the memory-mapped factors
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.assertTrue(self.recommender.save(path))
+        loaded = ImplicitALSRecommender.load(path)
+        self.assertIs(loaded._fold_in_basis[0], loaded.item_factors)
+        np.testing.assert_allclose(loaded._project(row_weights), folded)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.ann import IVFIndex
+from src.models.collaborative import CollaborativeFilteringRecommender
+
+
+class TestIVFIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.item_factors = rng.normal(size=(500, 8))
+        self.queries = rng.normal(size=(5, 8))
+        self.index = IVFIndex.build(self.item_factors, nlist=10)
+
+    def test_lists_partition_all_items(self):
+        self.assertEqual(self.index.nlist, 10)
+        self.assertEqual(self.index.list_indptr[-1], len(self.item_factors))
+        np.testing.assert_array_equal(np.sort(self.index.list_items), np.arange(len(self.item_factors)))
+
+    def test_probing_every_list_is_exact(self):
+        seen = [np.array([], dtype=np.intp)] * len(self.queries)
+        results = self.index.search(self.item_factors, self.queries, seen, top_k=10, nprobe=10)
+        
+        for query, (indices, scores) in zip(self.queries, results):
+            exact = self.item_factors @ query
+            np.testing.assert_array_equal(indices, np.argsort(exact)[::-1][:10])
+            np.testing.assert_allclose(scores, exact[indices])
+
+    def test_recall_grows_with_nprobe(self):
+        seen = [np.array([], dtype=np.intp)] * len(self.queries)
+        exact = [set(np.argsort(self.item_factors @ q)[::-1][:10]) for q in self.queries]
+        
+        def recall(nprobe):
+            results = self.index.search(self.item_factors, self.queries, seen, top_k=10, nprobe=nprobe)
+            return np.mean([len(truth & set(indices)) / 10 for truth, (indices, _) in zip(exact, results)])
+        
+        self.assertLessEqual(recall(1), recall(5))
+        self.assertEqual(recall(10), 1.0)
+
+    def test_seen_items_are_excluded(self):
+        seen = [np.argsort(self.item_factors @ q)[::-1][:3] for q in self.queries]
+        results = self.index.search(self.item_factors, self.queries, seen, top_k=10, nprobe=10)
+        
+        for excluded, (indices, _) in zip(seen, results):
+            self.assertFalse(set(excluded) & set(indices))
+            self.assertEqual(len(indices), 10)
+
+
+class TestCollaborativeIVFRetrieval(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        num_users, num_items, nnz = 40, 120, 800
+        self.interactions = (
+            [f"U{i:03d}" for i in range(num_users)],
+            [f"P{i:03d}" for i in range(num_items)],
+            rng.integers(0, num_users, nnz).astype(np.int32),
+            rng.integers(0, num_items, nnz).astype(np.int32),
+            rng.choice([1.0, 5.0], nnz)
+        )
+
+    def _train(self, **kwargs):
+        recommender = CollaborativeFilteringRecommender(num_factors=5, **kwargs)
+        with patch('src.models.collaborative.load_interaction_arrays', return_value=self.interactions):
+            self.assertTrue(recommender.train())
+        return recommender
+
+    def test_full_probe_matches_exact_scoring(self):
+        exact = self._train(retrieval="exact")
+        ivf = self._train(retrieval="ivf", ivf_nlist=6, ivf_nprobe=6)
+        
+        self.assertIsNone(exact.ann_index)
+        self.assertIsNotNone(ivf.ann_index)
+        for user_id in ["U000", "U007", "U031"]:
+            self.assertEqual(
+                [r["product_id"] for r in ivf.recommend(user_id, top_k=5)],
+                [r["product_id"] for r in exact.recommend(user_id, top_k=5)]
+            )
+
+    def test_index_is_persisted(self):
+        original = self._train(retrieval="ivf", ivf_nlist=6, ivf_nprobe=2)
+        path = tempfile.mkdtemp()
+        try:
+            original.save(path)
+            loaded = CollaborativeFilteringRecommender.load(path)
+            
+            self.assertEqual(loaded.retrieval, "ivf")
+            self.assertEqual(loaded.ivf_nprobe, 2)
+            np.testing.assert_array_equal(loaded.ann_index.list_items, original.ann_index.list_items)
+            self.assertEqual(loaded.recommend("U003", top_k=5), original.recommend("U003", top_k=5))
+        finally:
+            shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
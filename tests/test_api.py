@@ -2,6 +2,7 @@ import unittest
 import sys
 import os
 import json
+import threading
 from unittest.mock import patch, MagicMock
 from fastapi.testclient import TestClient
 
@@ -91,6 +92,56 @@ class TestRecommendationAPI(unittest.TestCase):
         self.assertEqual(call_args["action_type"], self.activity_data["action_type"])
         self.assertEqual(call_args["product_id"], self.activity_data["product_id"])
 
+    @patch("src.api.routes.insert_activity")
+    def test_add_activity_publishes_off_the_event_loop(self, mock_insert):
+        mock_insert.return_value = True
+        published = []
+        
+        def publish(activity):
+            published.append((activity["user_id"], threading.current_thread().name))
+        
+        with patch("src.api.routes.publish_activity", publish):
+            response = self.client.post("/activity", json=self.activity_data)
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(published), 1)
+        user_id, thread_name = published[0]
+        self.assertEqual(user_id, self.activity_data["user_id"])
+        self.assertTrue(thread_name.startswith("db"))
+
+    def test_retrain_requires_the_leader_lock(self):
+        scheduler = MagicMock()
+        leader = MagicMock(is_leader=False)
+        leader.acquire.return_value = False
+        watcher = MagicMock()
+        watcher.check_leader.return_value = False
+        
+        with patch.object(app.state, "retraining_scheduler", scheduler), \
+                patch.object(app.state, "retrain_leader", leader), \
+                patch.object(app.state, "snapshot_watcher", watcher), \
+                patch("src.api.routes.MODEL_SNAPSHOT_ENABLED", True):
+            response = self.client.post("/retrain")
+            self.assertEqual(response.status_code, 409)
+            scheduler.retrain_now.assert_not_called()
+            
+            # The leader has exited: this worker takes over and retrains
+            watcher.check_leader.return_value = True
+            response = self.client.post("/retrain")
+            self.assertEqual(response.status_code, 200)
+
+    @patch("src.api.routes.insert_activity")
+    def test_buffered_activity_is_published_by_the_writer(self, mock_insert):
+        writer = MagicMock(is_running=True)
+        writer.try_submit.return_value = True
+        
+        with patch.object(app.state, "activity_writer", writer), patch("src.api.routes.publish_activity") as publish:
+            response = self.client.post("/activity", json=self.activity_data)
+        
+        self.assertEqual(response.status_code, 200)
+        writer.try_submit.assert_called_once()
+        mock_insert.assert_not_called()
+        publish.assert_not_called()
+
     @patch("src.api.routes.Request")
     def test_streaming_endpoints(self, MockRequest):
         mock_service = MagicMock()
@@ -105,7 +156,7 @@ class TestRecommendationAPI(unittest.TestCase):
         self.assertEqual(start_response.status_code, 200)
         self.assertIn("message", start_response.json())
         self.assertIn("started", start_response.json()["message"])
-        mock_service.start_streaming.assert_called_once_with(speed_factor=50)
+        mock_service.start_streaming.assert_called_once_with(speed_factor=50, replay_mode=None)
         
         stop_response = self.client.post("/stop-streaming")
         self.assertEqual(stop_response.status_code, 200)
@@ -137,6 +188,38 @@ class TestRecommendationAPI(unittest.TestCase):
             
             mock_recommender.generate_recommendations.assert_called_once_with(self.user_id)
 
+    def test_batch_recommendations_endpoint(self):
+        mock_recommender = MagicMock()
+        mock_recommender.get_formatted_batch_recommendations.return_value = [
+            self.mock_recommendations,
+            {"user_id": "U0002", "recommended_products": []}
+        ]
+        
+        with patch.object(app.state, "recommender", mock_recommender):
+            response = self.client.post(
+                "/recommendations/batch",
+                json={"user_ids": [self.user_id, "U0002", self.user_id], "limit": 5}
+            )
+        
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["results"]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]["recommended_products"][0]["product_id"], "P0001")
+        mock_recommender.get_formatted_batch_recommendations.assert_called_once_with(
+            [self.user_id, "U0002"], top_k=5
+        )
+
+    def test_cache_stats_endpoint(self):
+        mock_recommender = MagicMock()
+        mock_recommender.cache.stats.return_value = {"size": 1, "hits": 3, "misses": 1, "hit_rate": 0.75}
+        
+        with patch.object(app.state, "recommender", mock_recommender):
+            response = self.client.get("/cache-stats")
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()["enabled"])
+        self.assertEqual(response.json()["hit_rate"], 0.75)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
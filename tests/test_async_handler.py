@@ -0,0 +1,53 @@
+import unittest
+import asyncio
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import async_handler
+
+
+class TestAsyncHandler(unittest.TestCase):
+
+    def tearDown(self):
+        async_handler.shutdown_executor()
+
+    def test_wrapper_runs_patched_function_off_the_event_loop(self):
+        calls = []
+        
+        def get_user_activity(user_id=None, limit=None):
+            calls.append((user_id, limit, threading.current_thread().name))
+            return [{"user_id": user_id}]
+        
+        with patch("src.database.storage.get_user_activity", get_user_activity):
+            result = asyncio.run(async_handler.get_user_activity(user_id="U0001", limit=5))
+        
+        self.assertEqual(result, [{"user_id": "U0001"}])
+        user_id, limit, thread_name = calls[0]
+        self.assertEqual((user_id, limit), ("U0001", 5))
+        self.assertTrue(thread_name.startswith("db"))
+
+    def test_slow_query_does_not_block_other_coroutines(self):
+        release = threading.Event()
+        
+        async def scenario():
+            slow = asyncio.ensure_future(async_handler.run_in_db_executor(release.wait, 5))
+            await asyncio.sleep(0)
+            # The event loop is still free while the query thread waits
+            self.assertFalse(slow.done())
+            release.set()
+            return await slow
+        
+        self.assertTrue(asyncio.run(scenario()))
+
+    def test_exceptions_propagate(self):
+        with patch("src.database.storage.get_all_users", side_effect=RuntimeError("down")):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(async_handler.get_all_users())
+
+
+if __name__ == '__main__':
+    unittest.main()
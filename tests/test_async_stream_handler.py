@@ -0,0 +1,178 @@
+import unittest
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import async_handler
+from src.ingestion.stream_handler import StreamingService
+from src.ingestion.async_stream_handler import AsyncStreamingService, ReplayStream, shard_for_user, _write_batch
+
+
+def _activities(offsets, num_users=10):
+    start = datetime(2024, 1, 1)
+    return [
+        {"user_id": f"U{i % num_users:04d}", "product_id": f"P{i:04d}", "action_type": "VIEW",
+         "timestamp": (start + timedelta(seconds=offset)).isoformat()}
+        for i, offset in enumerate(offsets)
+    ]
+
+
+class TestAsyncStreamingService(unittest.TestCase):
+
+    def setUp(self):
+        self.written = []
+        self.lock = threading.Lock()
+        
+        def insert_activities(activities, ordered=True):
+            with self.lock:
+                self.written.append(list(activities))
+            return True
+        
+        patchers = [
+            patch("src.ingestion.async_stream_handler.insert_activities", insert_activities),
+            patch("src.ingestion.async_stream_handler.publish_activity")
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        async_handler.shutdown_executor()
+
+    def _service(self, offsets, **kwargs):
+        source = StreamingService(load_mode="memory")
+        source.activities = _activities(offsets)
+        return AsyncStreamingService(source, **kwargs)
+
+    def test_as_fast_as_possible_sharded_by_user(self):
+        service = self._service(range(50), shards=3, read_batch=7)
+        
+        async def scenario():
+            self.assertTrue(await service.start(speed_factor=0))
+            self.assertFalse(await service.start(speed_factor=0))
+            await service.wait()
+        
+        asyncio.run(scenario())
+        
+        activities = [activity for batch in self.written for activity in batch]
+        self.assertEqual(sorted(a["product_id"] for a in activities), [f"P{i:04d}" for i in range(50)])
+        
+        # Every user's activities go to a single shard, in timestamp order
+        for user_id in {a["user_id"] for a in activities}:
+            user_timestamps = [a["timestamp"] for a in activities if a["user_id"] == user_id]
+            self.assertEqual(user_timestamps, sorted(user_timestamps))
+        
+        status = service.status()
+        self.assertFalse(status["running"])
+        self.assertEqual(status["events"], 50)
+        self.assertEqual(len(status["streams"]), 3)
+        for stream in status["streams"]:
+            self.assertEqual(stream["state"], "completed")
+            expected = sum(1 for i in range(10) if shard_for_user(f"U{i:04d}", 3) == stream["shard"]) * 5
+            self.assertEqual(stream["events"], expected)
+
+    def test_stop_drains_buffered_activities(self):
+        # The second activity is due 100 s in, so it is still buffered when stop is called
+        service = self._service([0, 100], shards=1)
+        
+        async def scenario():
+            await service.start(speed_factor=1)
+            await asyncio.sleep(0.2)
+            self.assertEqual(len(self.written), 1)
+            self.assertTrue(await service.stop(drain=True, timeout=5))
+        
+        asyncio.run(scenario())
+        
+        self.assertEqual([len(batch) for batch in self.written], [1, 1])
+        status = service.status()
+        self.assertEqual(status["events"], 2)
+        self.assertEqual(status["streams"][0]["state"], "stopped")
+
+    def test_stop_without_drain_drops_buffered_activities(self):
+        service = self._service([0, 100], shards=1)
+        
+        async def scenario():
+            await service.start(speed_factor=1)
+            await asyncio.sleep(0.2)
+            self.assertTrue(await service.stop(drain=False, timeout=5))
+            self.assertFalse(await service.stop())
+        
+        asyncio.run(scenario())
+        
+        self.assertEqual([len(batch) for batch in self.written], [1])
+        self.assertEqual(service.status()["events"], 1)
+
+    def test_paced_replay_reports_lag(self):
+        # 0.1 s of simulated time per activity at 10x: about 0.1 s in total
+        service = self._service([i * 0.1 for i in range(11)], shards=2, batch_window=0.02)
+        
+        async def scenario():
+            start = asyncio.get_running_loop().time()
+            await service.start(speed_factor=10)
+            await service.wait()
+            return asyncio.get_running_loop().time() - start
+        
+        elapsed = asyncio.run(scenario())
+        
+        self.assertGreaterEqual(elapsed, 0.1)
+        status = service.status()
+        self.assertEqual(status["events"], 11)
+        for stream in status["streams"]:
+            self.assertIsNotNone(stream["lag_seconds"])
+            self.assertLess(stream["max_lag_seconds"], 0.5)
+
+    def test_invalid_shards_are_rejected(self):
+        service = self._service(range(5))
+        
+        for shards in (0, -1):
+            with self.assertRaises(ValueError):
+                asyncio.run(service.start(speed_factor=0, shards=shards))
+        self.assertFalse(service.running)
+        self.assertEqual(self.written, [])
+
+    def test_item_taken_after_stop_is_drained(self):
+        activity = _activities([0])[0]
+        
+        def run(drain):
+            service = self._service([0], shards=1)
+            
+            async def scenario():
+                # Stop has been requested by the time the stream takes the item off its queue
+                service._stop_event = asyncio.Event()
+                service._stop_event.set()
+                service._drain = drain
+                service._started_at = time.perf_counter()
+                queue = asyncio.Queue()
+                await queue.put((activity, datetime.fromisoformat(activity["timestamp"]), 0.0))
+                await queue.put(None)
+                stream = ReplayStream(0)
+                await service._run_stream(stream, queue)
+                return stream
+            
+            return asyncio.run(scenario())
+        
+        stream = run(drain=True)
+        self.assertEqual([[a["product_id"] for a in batch] for batch in self.written], [[activity["product_id"]]])
+        self.assertEqual(stream.events, 1)
+        self.assertEqual(stream.state, "stopped")
+        
+        self.written.clear()
+        stream = run(drain=False)
+        self.assertEqual(self.written, [])
+        self.assertEqual(stream.events, 0)
+
+    def test_failed_batch_is_not_published(self):
+        with patch("src.ingestion.async_stream_handler.insert_activities", side_effect=Exception("write failed")), \
+                patch("src.ingestion.async_stream_handler.publish_activity") as mock_publish:
+            self.assertEqual(_write_batch(_activities([0, 1])), 0)
+        
+        mock_publish.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.cache import RecommendationCache
+
+
+class TestRecommendationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = RecommendationCache(max_size=3, ttl_seconds=60)
+        self.result = {"user_id": "U0001", "recommended_products": []}
+
+    def test_hit_and_miss(self):
+        self.assertIsNone(self.cache.get("U0001", 10))
+        
+        self.cache.put("U0001", 10, self.result)
+        
+        self.assertIs(self.cache.get("U0001", 10), self.result)
+        self.assertIsNone(self.cache.get("U0001", 5))
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["size"], 1)
+
+    def test_lru_eviction(self):
+        for user_id in ["U1", "U2", "U3"]:
+            self.cache.put(user_id, 10, user_id)
+        self.cache.get("U1", 10)
+        
+        self.cache.put("U4", 10, "U4")
+        
+        self.assertIsNone(self.cache.get("U2", 10))
+        self.assertEqual(self.cache.get("U1", 10), "U1")
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    @patch('src.models.cache.time.monotonic')
+    def test_ttl_expiry(self, mock_monotonic):
+        mock_monotonic.return_value = 100.0
+        self.cache.put("U0001", 10, self.result)
+        
+        mock_monotonic.return_value = 161.0
+        
+        self.assertIsNone(self.cache.get("U0001", 10))
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_invalidate_user(self):
+        self.cache.put("U0001", 5, "a")
+        self.cache.put("U0001", 10, "b")
+        self.cache.put("U0002", 10, "c")
+        
+        removed = self.cache.invalidate_user("U0001")
+        
+        self.assertEqual(removed, 2)
+        self.assertIsNone(self.cache.get("U0001", 5))
+        self.assertEqual(self.cache.get("U0002", 10), "c")
+
+
+    def test_put_after_invalidation_is_skipped(self):
+        generation = self.cache.generation("U0001")
+        self.cache.invalidate_user("U0001")
+        
+        self.assertFalse(self.cache.put("U0001", 10, self.result, generation=generation))
+        self.assertIsNone(self.cache.get("U0001", 10))
+        self.assertEqual(self.cache.stats()["stale_puts"], 1)
+        
+        # Other users and results computed after the invalidation are cached
+        self.assertTrue(self.cache.put("U0002", 10, self.result, generation=generation))
+        self.assertTrue(self.cache.put("U0001", 10, self.result, generation=self.cache.generation("U0001")))
+
+    def test_forgotten_invalidations_stay_conservative(self):
+        generation = self.cache.generation("U0001")
+        for user_id in ["U0001", "U2", "U3", "U4"]:
+            self.cache.invalidate_user(user_id)
+        
+        # U0001's counter was dropped (max_size 3); an older generation is still refused
+        self.assertFalse(self.cache.put("U0001", 10, self.result, generation=generation))
+        self.assertTrue(self.cache.put("U0001", 10, self.result, generation=self.cache.generation("U0001")))
+
+if __name__ == '__main__':
+    unittest.main()
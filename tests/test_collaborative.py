@@ -2,6 +2,8 @@ import unittest
 import os
 import sys
 import random
+import threading
+import numpy as np
 from unittest.mock import patch, MagicMock
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -102,6 +104,285 @@ class TestCollaborativeFilteringRecommender(unittest.TestCase):
         self.assertFalse(result)
         self.assertFalse(self.recommender.is_trained)
 
+    def test_sparse_training_matches_dense(self):
+        matrix = self.recommender._create_user_item_matrix(self.mock_activities)
+        self.recommender.global_mean = np.mean(matrix.data)
+        
+        _, dense_sigma, _ = self.recommender._factorize_dense(matrix)
+        _, sparse_sigma, _ = self.recommender._factorize_sparse(matrix)
+        
+        np.testing.assert_allclose(np.sort(sparse_sigma), np.sort(dense_sigma), rtol=1e-6)
+
+    def test_bulk_matrix_matches_per_activity_matrix(self):
+        expected = self.recommender._create_user_item_matrix(self.mock_activities)
+        expected_users = dict(self.recommender.user_id_to_index)
+        
+        user_index, product_index = {}, {}
+        rows, cols, data = [], [], []
+        for activity in self.mock_activities:
+            rows.append(user_index.setdefault(activity["user_id"], len(user_index)))
+            cols.append(product_index.setdefault(activity["product_id"], len(product_index)))
+            data.append(5.0 if activity["action_type"] == "BUY" else 1.0)
+        
+        bulk = self.recommender._create_user_item_matrix_from_arrays(
+            list(user_index), list(product_index),
+            np.array(rows), np.array(cols), np.array(data)
+        )
+        
+        self.assertEqual(self.recommender.user_id_to_index, expected_users)
+        self.assertEqual((bulk != expected).nnz, 0)
+
+    @patch('src.models.collaborative.get_all_users')
+    @patch('src.models.collaborative.load_interaction_arrays')
+    def test_train_bulk_load(self, mock_load, mock_get_all_users):
+        mock_load.return_value = (
+            ["U0002", "U0001", "U0003"],
+            ["P0003", "P0001", "P0002"],
+            np.array([0, 1, 1, 2, 2]),
+            np.array([0, 1, 2, 0, 2]),
+            np.array([1.0, 5.0, 1.0, 1.0, 5.0])
+        )
+        
+        recommender = CollaborativeFilteringRecommender(num_factors=2, bulk_load=True)
+        
+        self.assertTrue(recommender.train())
+        mock_get_all_users.assert_not_called()
+        self.assertEqual(recommender.user_id_to_index, {"U0001": 0, "U0002": 1, "U0003": 2})
+        self.assertEqual(recommender.user_item_matrix[0, recommender.product_id_to_index["P0001"]], 5.0)
+
+    def _set_trained_state(self, num_factors=4):
+        rng = np.random.default_rng(0)
+        self.recommender.user_item_matrix = self.recommender._create_user_item_matrix(self.mock_activities)
+        num_users, num_products = self.recommender.user_item_matrix.shape
+        self.recommender.user_factors = rng.normal(size=(num_users, num_factors))
+        self.recommender.item_factors = rng.normal(size=(num_products, num_factors))
+        self.recommender.global_mean = 1.5
+        self.recommender.is_trained = True
+
+    def test_recommend_batch_matches_naive_ranking(self):
+        self._set_trained_state()
+        rec = self.recommender
+        
+        results = rec.recommend_batch(self.user_ids + ["U9999"], top_k=5, batch_size=7)
+        
+        self.assertEqual(results["U9999"], [])
+        for user_id in self.user_ids:
+            user_idx = rec.user_id_to_index[user_id]
+            seen = set(rec.user_item_matrix[user_idx].indices)
+            predicted = rec.global_mean + rec.user_factors[user_idx] @ rec.item_factors.T
+            expected = [i for i in np.argsort(-predicted) if i not in seen][:5]
+            
+            self.assertEqual(
+                [r["product_id"] for r in results[user_id]],
+                [rec.index_to_product_id[i] for i in expected]
+            )
+
+    def test_recommend_excludes_seen_when_catalog_small(self):
+        self._set_trained_state()
+        user_id = self.user_ids[0]
+        num_seen = self.recommender.user_item_matrix[self.recommender.user_id_to_index[user_id]].nnz
+        num_products = self.recommender.item_factors.shape[0]
+        
+        recommendations = self.recommender.recommend(user_id, top_k=num_products)
+        
+        self.assertEqual(len(recommendations), num_products - num_seen)
+
+    def test_large_score_buffers_are_not_kept(self):
+        self._set_trained_state()
+        rec = self.recommender
+        row_bytes = rec.item_factors.shape[0] * rec.item_factors.itemsize
+        rec.score_buffer_max_bytes = 2 * row_bytes
+        
+        small = rec._get_score_buffer(2)
+        self.assertIs(rec._get_score_buffer(1).base, small.base)
+        
+        large = rec._get_score_buffer(3)
+        self.assertEqual(large.shape, (3, rec.item_factors.shape[0]))
+        self.assertIsNot(rec._get_score_buffer(3), large)
+        self.assertEqual(rec._buffers.scores.shape[0], 2)
+        
+        # Batches over the cap score the same as small ones
+        results = rec.recommend_batch(self.user_ids, top_k=5, batch_size=7)
+        for user_id in self.user_ids[:3]:
+            single = rec.recommend_batch([user_id], top_k=5)[user_id]
+            self.assertEqual([r["product_id"] for r in results[user_id]], [r["product_id"] for r in single])
+            for batched, alone in zip(results[user_id], single):
+                self.assertAlmostEqual(batched["score"], alone["score"])
+
+    def _train_on_mock_activities(self):
+        user_index, product_index = {}, {}
+        rows, cols, data = [], [], []
+        for activity in self.mock_activities:
+            rows.append(user_index.setdefault(activity["user_id"], len(user_index)))
+            cols.append(product_index.setdefault(activity["product_id"], len(product_index)))
+            data.append(5.0 if activity["action_type"] == "BUY" else 1.0)
+        
+        with patch('src.models.collaborative.load_interaction_arrays') as mock_load:
+            mock_load.return_value = (
+                list(user_index), list(product_index), np.array(rows), np.array(cols), np.array(data)
+            )
+            self.assertTrue(self.recommender.train())
+
+    def test_fold_in_reproduces_trained_user_vector(self):
+        self._train_on_mock_activities()
+        user_id = self.user_ids[3]
+        trained_vector = self.recommender.user_factors[self.recommender.user_id_to_index[user_id]].copy()
+        
+        activities = [a for a in self.mock_activities if a["user_id"] == user_id]
+        self.assertTrue(self.recommender.fold_in_user(user_id, activities))
+        
+        folded_vector, _ = self.recommender._user_state(user_id)
+        np.testing.assert_allclose(folded_vector, trained_vector, atol=1e-8)
+
+    def test_recommend_folds_in_new_user(self):
+        self._train_on_mock_activities()
+        # Products are sampled at random; take one the model was trained on
+        known_product = self.mock_activities[0]["product_id"]
+        self.assertIn(known_product, self.recommender.product_id_to_index)
+        new_activity = [
+            {"user_id": "U9999", "product_id": known_product, "action_type": "BUY"},
+            {"user_id": "U9999", "product_id": "P9999", "action_type": "VIEW"}
+        ]
+        
+        recommendations = self.recommender.recommend("U9999", top_k=5, user_activity=new_activity)
+        
+        self.assertEqual(len(recommendations), 5)
+        self.assertNotIn(known_product, [r["product_id"] for r in recommendations])
+        self.assertEqual(self.recommender.unknown_product_interactions, 1)
+
+    def test_fold_in_activity_updates_seen_items_and_drift(self):
+        self._train_on_mock_activities()
+        user_id = self.user_ids[0]
+        _, seen_before = self.recommender._user_state(user_id)
+        unseen = next(pid for pid, idx in self.recommender.product_id_to_index.items() if idx not in set(seen_before))
+        
+        self.assertTrue(self.recommender.fold_in_activity({"user_id": user_id, "product_id": unseen, "action_type": "VIEW"}))
+        
+        _, seen_after = self.recommender._user_state(user_id)
+        self.assertIn(self.recommender.product_id_to_index[unseen], set(seen_after))
+        self.assertNotIn(unseen, [r["product_id"] for r in self.recommender.recommend(user_id, top_k=50)])
+        self.assertFalse(self.recommender.needs_retrain())
+        
+        with patch('src.models.collaborative.get_user_activity', return_value=[]):
+            for i in range(5):
+                self.recommender.fold_in_activity({"user_id": f"NEW{i}", "product_id": unseen, "action_type": "VIEW"})
+        self.assertGreater(self.recommender.drift_report()["new_user_ratio"], 0.1)
+        self.assertTrue(self.recommender.needs_retrain())
+
+
+    def test_fold_in_activity_seeds_new_user_with_history(self):
+        self._train_on_mock_activities()
+        self.recommender.interaction_store = None
+        first, second, third = list(self.recommender.product_id_to_index)[:3]
+        history = [
+            {"product_id": first, "action_type": "BUY", "timestamp": "2024-01-02T10:00:00"},
+            {"product_id": second, "action_type": "VIEW", "timestamp": "2024-01-02T11:00:00"}
+        ]
+        
+        with patch('src.models.collaborative.get_user_activity', return_value=list(history)) as mock_history:
+            # Already stored by a synchronous insert: not counted twice
+            self.recommender.fold_in_activity(dict(history[1], user_id="U9999"))
+            # Still buffered: added to the history
+            self.recommender.fold_in_activity({"user_id": "U9998", "product_id": third, "action_type": "VIEW",
+                                               "timestamp": "2024-01-02T12:00:00"})
+        
+        index = self.recommender.product_id_to_index
+        self.assertEqual(self.recommender._row_weights("U9999"), {index[first]: 5.0, index[second]: 1.0})
+        self.assertEqual(self.recommender._row_weights("U9998"),
+                         {index[first]: 5.0, index[second]: 1.0, index[third]: 1.0})
+        self.assertEqual(mock_history.call_count, 2)
+        
+        # Once seeded, later events only update the row
+        self.recommender.fold_in_activity({"user_id": "U9999", "product_id": third, "action_type": "BUY"})
+        self.assertEqual(self.recommender._row_weights("U9999")[index[third]], 5.0)
+
+    def test_drift_counts_only_new_interactions(self):
+        self._train_on_mock_activities()
+        user_id = self.user_ids[0]
+        activities = [a for a in self.mock_activities if a["user_id"] == user_id]
+        
+        # Refolding a trained user's own history adds nothing new
+        self.recommender.fold_in_user(user_id, activities)
+        self.recommender.fold_in_user(user_id, activities)
+        self.assertEqual(self.recommender.drift_report()["folded_interactions"], 0)
+        
+        self.recommender.fold_in_user("U9999", activities)
+        self.recommender.fold_in_user("U9999", activities)
+        report = self.recommender.drift_report()
+        self.assertEqual(report["folded_interactions"], len({a["product_id"] for a in activities}))
+        self.assertEqual(report["folded_new_users"], 1)
+
+    def test_user_with_only_unknown_products_is_folded_in_once(self):
+        self._train_on_mock_activities()
+        activity = [{"user_id": "U9999", "product_id": "P9999", "action_type": "VIEW"}]
+        
+        with patch('src.models.collaborative.get_user_activity', return_value=activity) as mock_history:
+            for _ in range(5):
+                self.assertEqual(self.recommender.recommend("U9999", top_k=5), [])
+        
+        self.assertEqual(mock_history.call_count, 1)
+        report = self.recommender.drift_report()
+        self.assertEqual((report["folded_interactions"], report["folded_new_users"]), (1, 0))
+        
+        # A later event on a known product gives the user a vector
+        known_product = self.mock_activities[0]["product_id"]
+        self.recommender.fold_in_activity({"user_id": "U9999", "product_id": known_product, "action_type": "BUY"})
+        self.assertEqual(len(self.recommender.recommend("U9999", top_k=5)), 5)
+        self.assertEqual(self.recommender.drift_report()["folded_new_users"], 1)
+
+    def test_unknown_product_ratio_needs_enough_folded_interactions(self):
+        self._train_on_mock_activities()
+        user_id = self.user_ids[0]
+        
+        self.recommender.fold_in_activity({"user_id": user_id, "product_id": "P9999", "action_type": "VIEW"})
+        self.assertEqual(self.recommender.drift_report()["unknown_product_ratio"], 1.0)
+        self.assertFalse(self.recommender.needs_retrain())
+        
+        with patch('src.models.collaborative.COLLAB_DRIFT_MIN_FOLDED_INTERACTIONS', 1):
+            self.assertTrue(self.recommender.needs_retrain())
+
+    def test_folded_users_are_bounded(self):
+        self._train_on_mock_activities()
+        self.recommender.max_folded_users = 3
+        known_products = list(self.recommender.product_id_to_index)
+        
+        for i in range(5):
+            self.recommender.fold_in_user(f"NEW{i}", [
+                {"product_id": known_products[i], "action_type": "VIEW"}
+            ])
+        # Folding again makes NEW2 the most recent
+        self.recommender.fold_in_user("NEW2", [{"product_id": known_products[0], "action_type": "BUY"}])
+        self.recommender.fold_in_user("NEW5", [{"product_id": known_products[5], "action_type": "VIEW"}])
+        
+        self.assertEqual(list(self.recommender._folded_rows), ["NEW4", "NEW2", "NEW5"])
+        self.assertEqual(set(self.recommender._folded_factors), {"NEW4", "NEW2", "NEW5"})
+        report = self.recommender.drift_report()
+        self.assertEqual((report["folded_users"], report["folded_evictions"]), (3, 3))
+        self.assertTrue(self.recommender.needs_retrain())
+        
+        self._train_on_mock_activities()
+        self.assertEqual(self.recommender.drift_report()["folded_users"], 0)
+        self.assertFalse(self.recommender.needs_retrain())
+
+    def test_concurrent_fold_in_activity_keeps_every_event(self):
+        self._train_on_mock_activities()
+        user_id = self.user_ids[0]
+        product_id = self.mock_activities[0]["product_id"]
+        product_idx = self.recommender.product_id_to_index[product_id]
+        before = self.recommender._row_weights(user_id).get(product_idx, 0.0)
+        
+        def fold_events():
+            for _ in range(200):
+                self.recommender.fold_in_activity({"user_id": user_id, "product_id": product_id, "action_type": "VIEW"})
+        
+        threads = [threading.Thread(target=fold_events) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(self.recommender._row_weights(user_id)[product_idx], before + 800)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
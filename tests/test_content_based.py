@@ -2,6 +2,8 @@ import unittest
 import os
 import sys
 import random
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
 from unittest.mock import patch, MagicMock
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -100,6 +102,87 @@ class TestContentBasedRecommender(unittest.TestCase):
         self.assertFalse(result)
         self.assertFalse(self.recommender.is_trained)
 
+    @patch('src.models.content_based.get_user_activity')
+    @patch('src.models.content_based.get_all_products')
+    def test_recommend_matches_dense_cosine(self, mock_get_all_products, mock_get_user_activity):
+        mock_get_all_products.return_value = self.mock_products
+        mock_get_user_activity.return_value = self.mock_activities
+        
+        self.recommender.train()
+        features = self.recommender.product_features
+        
+        profile = (1.0 * features[0].toarray() + 3.0 * features[1].toarray()) / 4.0
+        expected = cosine_similarity(profile, features).ravel()
+        expected[[0, 1]] = -np.inf
+        expected_ids = [self.recommender.index_to_product_id[i] for i in np.argsort(-expected, kind="stable")[:5]]
+        
+        recommendations = self.recommender.recommend(self.user_id, top_k=5)
+        
+        self.assertEqual(len(recommendations), 5)
+        scores = self.recommender._profile_similarities([0, 1], [1.0, 3.0])
+        np.testing.assert_allclose(scores, cosine_similarity(profile, features).ravel(), atol=1e-9)
+        self.assertEqual(
+            sorted(expected[self.recommender.product_id_to_index[pid]] for pid in expected_ids),
+            sorted(expected[self.recommender.product_id_to_index[r["product_id"]]] for r in recommendations)
+        )
+
+    @patch('src.models.content_based.get_all_products')
+    def test_neighbor_index_matches_brute_force(self, mock_get_all_products):
+        mock_get_all_products.return_value = self.mock_products
+        recommender = ContentBasedRecommender(retrieval="neighbors", num_neighbors=5)
+        recommender.train()
+        
+        recommender.build_neighbor_index(block_bytes=8 * 100 * 7)
+        
+        similarities = cosine_similarity(recommender.product_features)
+        for i in [0, 17, 99]:
+            row = similarities[i].copy()
+            row[i] = -np.inf
+            start, end = recommender.neighbor_indptr[i], recommender.neighbor_indptr[i + 1]
+            self.assertEqual(end - start, 5)
+            np.testing.assert_allclose(
+                np.sort(recommender.neighbor_scores[start:end]),
+                np.sort(row)[-5:],
+                rtol=1e-5
+            )
+
+    @patch('src.models.content_based.get_user_activity')
+    @patch('src.models.content_based.get_all_products')
+    def test_recommend_neighbors_mode(self, mock_get_all_products, mock_get_user_activity):
+        mock_get_all_products.return_value = self.mock_products
+        mock_get_user_activity.return_value = self.mock_activities
+        recommender = ContentBasedRecommender(retrieval="neighbors", num_neighbors=10)
+        recommender.train()
+        
+        recommendations = recommender.recommend(self.user_id, top_k=5)
+        
+        self.assertLessEqual(len(recommendations), 5)
+        self.assertGreater(len(recommendations), 0)
+        recommended_ids = [r["product_id"] for r in recommendations]
+        self.assertNotIn("P0001", recommended_ids)
+        self.assertNotIn("P0002", recommended_ids)
+        for rec in recommendations:
+            self.assertEqual(rec["reason"], "Content-based similarity")
+            self.assertGreaterEqual(rec["score"], 0)
+            self.assertLessEqual(rec["score"], 1)
+
+    @patch('src.models.content_based.get_all_products')
+    def test_recommend_batch_matches_single(self, mock_get_all_products):
+        mock_get_all_products.return_value = self.mock_products
+        self.recommender.train()
+        
+        other_activities = [dict(a, user_id="U0002", product_id="P0050") for a in self.mock_activities[:1]]
+        batch = self.recommender.recommend_batch(
+            {self.user_id: self.mock_activities, "U0002": other_activities, "U0003": []},
+            top_k=5, batch_size=1
+        )
+        
+        self.assertEqual(batch["U0003"], [])
+        for user_id, activities in ((self.user_id, self.mock_activities), ("U0002", other_activities)):
+            single = self.recommender.recommend(user_id, top_k=5, user_activity=activities)
+            self.assertEqual([r["product_id"] for r in batch[user_id]], [r["product_id"] for r in single])
+            np.testing.assert_allclose([r["score"] for r in batch[user_id]], [r["score"] for r in single])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
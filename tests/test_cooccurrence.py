@@ -0,0 +1,257 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import storage
+from src.database.backends import InMemoryBackend
+from src.models.cooccurrence import CoOccurrenceRecommender
+from src.models.hybrid import HybridRecommender
+
+DAY = 24 * 3600
+
+
+def _activity(user_id, product_id, action_type="VIEW", timestamp="2025-01-01T00:00:00"):
+    return {"user_id": user_id, "product_id": product_id, "action_type": action_type, "timestamp": timestamp}
+
+
+def _ago(seconds):
+    return (datetime.now() - timedelta(seconds=seconds)).isoformat()
+
+
+class TestCoOccurrenceRecommender(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.previous = storage.set_backend(self.backend)
+        self.model = CoOccurrenceRecommender(history_size=5, max_neighbors=3, half_life=DAY,
+                                             prune_every=1000, min_score=0.05, interaction_store=None)
+        self.now = self.model._epoch
+
+    def tearDown(self):
+        storage.set_backend(self.previous)
+
+    def _record(self, user_id, product_id, action_type="VIEW", age=0):
+        self.model.record_activity(_activity(user_id, product_id, action_type), now=self.now + age)
+
+    def test_pairs_are_counted_both_ways_and_weighted(self):
+        self._record("U1", "P1")
+        self._record("U1", "P2", "BUY")
+        
+        self.assertEqual(self.model.neighbors["P1"], {"P2": 3.0})
+        self.assertEqual(self.model.neighbors["P2"], {"P1": 1.0})
+        
+        # Buying an already viewed product only adds the upgrade
+        self._record("U1", "P1", "BUY")
+        self.assertEqual(self.model.neighbors["P1"], {"P2": 3.0})
+        self.assertEqual(self.model.neighbors["P2"], {"P1": 3.0})
+        
+        # Viewing it again adds nothing
+        self._record("U1", "P1")
+        self.assertEqual(self.model.neighbors["P2"], {"P1": 3.0})
+
+    def test_new_events_change_recommendations_immediately(self):
+        self.assertEqual(self.model.recommend("U9"), [])
+        
+        self._record("U1", "P1")
+        self._record("U1", "P2")
+        self._record("U2", "P1")
+        self._record("U2", "P3", "BUY")
+        
+        self._record("U3", "P1")
+        recs = self.model.recommend("U3", top_k=5)
+        self.assertEqual([rec["product_id"] for rec in recs], ["P3", "P2"])
+        self.assertEqual(recs[0]["score"], 1.0)
+        self.assertEqual(recs[0]["reason"], "Frequently chosen together")
+        
+        self._record("U4", "P1")
+        self._record("U4", "P2", "BUY")
+        self._record("U5", "P1")
+        self._record("U5", "P2", "BUY")
+        self.assertEqual([rec["product_id"] for rec in self.model.recommend("U3", top_k=5)], ["P2", "P3"])
+
+    def test_excludes_products_already_seen(self):
+        self._record("U1", "P1")
+        self._record("U1", "P2")
+        self._record("U1", "P3")
+        
+        self._record("U2", "P1")
+        self._record("U2", "P2")
+        self.assertEqual([rec["product_id"] for rec in self.model.recommend("U2")], ["P3"])
+        
+        recs = self.model.recommend("U3", user_activity=[_activity("U3", "P1"), _activity("U3", "P3")])
+        self.assertEqual([rec["product_id"] for rec in recs], ["P2"])
+
+    def test_unknown_user_falls_back_to_stored_activity(self):
+        self._record("U1", "P1")
+        self._record("U1", "P2")
+        self.backend.insert_activities([_activity("U7", "P1")])
+        
+        self.assertEqual([rec["product_id"] for rec in self.model.recommend("U7")], ["P2"])
+        self.assertEqual(self.model.recommend_batch(["U7", "U8"], user_activities={"U7": []}), {"U7": [], "U8": []})
+
+    def test_empty_model_makes_no_queries(self):
+        with patch.object(self.backend, "get_user_activity", side_effect=AssertionError("queried")):
+            self.assertEqual(self.model.recommend("U1"), [])
+            self.assertEqual(self.model.recommend_batch(["U1"]), {"U1": []})
+
+    def test_old_pairs_decay_and_are_pruned(self):
+        self._record("U1", "P1")
+        self._record("U1", "P2")
+        
+        # A pair from a week ago is worth 1/128 of one made now
+        self._record("U2", "P1", age=7 * DAY)
+        self._record("U2", "P3", age=7 * DAY)
+        self.assertAlmostEqual(self.model.neighbors["P1"]["P3"] / self.model.neighbors["P1"]["P2"], 128.0)
+        self.assertEqual([rec["product_id"] for rec in self.model.recommend("U3", user_activity=[_activity("U3", "P1")])],
+                         ["P3", "P2"])
+        
+        self.model.prune(now=self.now + 7 * DAY)
+        self.assertEqual(self.model.neighbors["P1"], {"P3": self.model.neighbors["P1"]["P3"]})
+        self.assertNotIn("P2", self.model.neighbors)
+        
+        # Rescaling to a later epoch keeps relative scores
+        self.model._rescale(self.now + 7 * DAY)
+        self.assertAlmostEqual(self.model.neighbors["P1"]["P3"], 1.0)
+
+    def test_neighbors_are_bounded(self):
+        for i in range(20):
+            for j in range(i + 1):
+                self._record(f"U{i}-{j}", "P0")
+                self._record(f"U{i}-{j}", f"Q{i}", "BUY")
+        
+        # Trimmed back to the strongest three whenever it exceeds six
+        counts = self.model.neighbors["P0"]
+        self.assertLessEqual(len(counts), 2 * self.model.max_neighbors)
+        self.assertEqual(max(counts, key=counts.get), "Q19")
+        self.assertTrue(all(int(product_id[1:]) >= 10 for product_id in counts))
+
+    def test_history_is_bounded(self):
+        self.model.max_users = 2
+        for product_id in ["P1", "P2", "P3", "P4", "P5", "P6", "P7"]:
+            self._record("U1", product_id)
+        self._record("U2", "P1")
+        self._record("U3", "P1")
+        
+        self.assertEqual(list(self.model.histories), ["U2", "U3"])
+        # P7 was paired with the five products before it, not P1
+        self.assertEqual(sorted(self.model.neighbors["P7"]), ["P2", "P3", "P4", "P5", "P6"])
+
+    def test_train_from_storage(self):
+        # Inserted out of order; U1 must still pair P1-P2 and P2-P3 by time
+        self.backend.insert_activities([
+            _activity("U1", "P3", timestamp=_ago(10)), _activity("U1", "P1", timestamp=_ago(30)),
+            _activity("U1", "P2", "BUY", timestamp=_ago(20)),
+            _activity("U2", "P1", timestamp=_ago(20)), _activity("U2", "P2", timestamp=_ago(10))
+        ])
+        self.model.history_size = 1
+        
+        self.assertTrue(self.model.train())
+        self.assertEqual(set(self.model.neighbors["P1"]), {"P2"})
+        self.assertAlmostEqual(self.model.neighbors["P1"]["P2"], 4.0, places=2)
+        self.assertAlmostEqual(self.model.neighbors["P2"]["P1"], 2.0, places=2)
+        self.assertAlmostEqual(self.model.neighbors["P3"]["P2"], 3.0, places=2)
+        self.assertEqual(self.model.stats()["users"], 2)
+
+    def test_train_applies_decay_to_history(self):
+        self.backend.insert_activities([
+            _activity("U1", "P1", timestamp=_ago(2 * DAY)), _activity("U1", "P2", timestamp=_ago(2 * DAY)),
+            _activity("U2", "P1", timestamp=_ago(60)), _activity("U2", "P3", timestamp=_ago(60)),
+            # A year old: decayed below min_score and pruned
+            _activity("U3", "P4", timestamp="2020-01-01T00:00:00"), _activity("U3", "P5", timestamp="2020-01-01T00:00:00")
+        ])
+        
+        self.assertTrue(self.model.train())
+        self.assertNotIn("P4", self.model.neighbors)
+        
+        scores = self.model.neighbors["P1"]
+        self.assertAlmostEqual(scores["P3"] / scores["P2"], 4.0, places=2)
+
+    def test_events_during_train_are_kept(self):
+        self.backend.insert_activities([_activity("U1", "P1", timestamp=_ago(60))])
+        
+        def fetch_while_recording(**kwargs):
+            self.model.record_activity(_activity("U1", "P2"))
+            return InMemoryBackend.iter_activity_batches(self.backend, **kwargs)
+        
+        with patch.object(self.backend, "iter_activity_batches", side_effect=fetch_while_recording):
+            self.assertTrue(self.model.train())
+        
+        self.assertEqual(set(self.model.neighbors["P1"]), {"P2"})
+        self.assertIsNone(self.model._backlog)
+
+    def test_live_model_serves_while_rebuilding(self):
+        self.model.record_activity(_activity("U1", "P1"))
+        self.model.record_activity(_activity("U1", "P2"))
+        self.backend.insert_activities([
+            _activity("U2", "P3", timestamp=_ago(60)), _activity("U2", "P4", timestamp=_ago(30)),
+            _activity("U3", "P5", timestamp=_ago(20))
+        ])
+        during_build = []
+        
+        def read_while_serving(**kwargs):
+            for batch in InMemoryBackend.iter_activity_batches(self.backend, **kwargs):
+                # The lock is free and the old counts still answer
+                during_build.append([r["product_id"] for r in self.model.recommend("U9", user_activity=[
+                    _activity("U9", "P1")
+                ])])
+                yield batch
+        
+        with patch.object(self.backend, "iter_activity_batches", side_effect=read_while_serving), \
+                patch("src.models.cooccurrence.TRAIN_BATCH_SIZE", 2):
+            self.assertTrue(self.model.train())
+        
+        self.assertEqual(during_build, [["P2"], ["P2"]])
+        self.assertNotIn("P1", self.model.neighbors)
+        self.assertEqual(set(self.model.neighbors["P3"]), {"P4"})
+
+    def test_train_without_activity(self):
+        self.assertFalse(self.model.train())
+        self.assertFalse(self.model.is_trained)
+
+
+class TestHybridCoOccurrence(unittest.TestCase):
+
+    def test_scores_are_added_to_the_blend(self):
+        recommender = HybridRecommender(concurrent=False, use_cache=False, interaction_store=None)
+        content = [{"product_id": "P1", "score": 1.0, "reason": "Content-based similarity"}]
+        collab = [{"product_id": "P2", "score": 1.0, "reason": "Collaborative filtering similarity"}]
+        cooccurrence = [{"product_id": "P2", "score": 1.0, "reason": "Frequently chosen together"},
+                        {"product_id": "P3", "score": 0.5, "reason": "Frequently chosen together"},
+                        {"product_id": "P4", "score": 0.0, "reason": "Frequently chosen together"}]
+        
+        without, counts = recommender._combine_recommendations(content, collab, 10)
+        self.assertEqual([(rec["product_id"], rec["score"]) for rec in without], [("P1", 0.6), ("P2", 0.4)])
+        self.assertEqual(counts, (1, 1, 0, 0))
+        
+        recs, counts = recommender._combine_recommendations(content, collab, 10, cooccurrence)
+        scores = {rec["product_id"]: rec["score"] for rec in recs}
+        self.assertAlmostEqual(scores["P2"], 0.6)
+        self.assertAlmostEqual(scores["P3"], 0.1)
+        self.assertEqual(recs[-1]["reason"], "Frequently chosen together")
+        self.assertEqual(counts, (1, 1, 0, 2))
+
+    def test_shared_model_is_not_rebuilt_by_train(self):
+        shared = CoOccurrenceRecommender(interaction_store=None)
+        recommender = HybridRecommender(use_cache=False, interaction_store=None, cooccurrence_recommender=shared)
+        with patch.object(recommender, "content_recommender"), patch.object(recommender, "collaborative_recommender"), \
+                patch.object(shared, "train") as train:
+            recommender.train()
+        
+        train.assert_not_called()
+        self.assertIs(recommender.cooccurrence_recommender, shared)
+
+    def test_record_activity_updates_cooccurrence(self):
+        recommender = HybridRecommender(concurrent=False, use_cache=False, interaction_store=None)
+        with patch.object(recommender, "collaborative_recommender"):
+            recommender.record_activity(_activity("U1", "P1"))
+            recommender.record_activity(_activity("U1", "P2"))
+        
+        self.assertAlmostEqual(recommender.cooccurrence_recommender.neighbors["P1"]["P2"], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
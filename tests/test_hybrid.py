@@ -1,11 +1,13 @@
 import unittest
 import os
 import sys
+from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.models.hybrid import HybridRecommender
+from src.database.storage import INTERACTION_FIELDS, PRODUCT_DISPLAY_FIELDS
 
 
 class TestHybridRecommender(unittest.TestCase):
@@ -47,9 +49,10 @@ class TestHybridRecommender(unittest.TestCase):
         self.assertGreater(self.recommender.collab_weight, 0)
         self.assertAlmostEqual(self.recommender.content_weight + self.recommender.collab_weight, 1.0, places=1)
 
+    @patch('src.models.hybrid.CoOccurrenceRecommender')
     @patch('src.models.hybrid.ContentBasedRecommender')
     @patch('src.models.hybrid.CollaborativeFilteringRecommender')
-    def test_train(self, MockCollabRecommender, MockContentRecommender):
+    def test_train(self, MockCollabRecommender, MockContentRecommender, MockCoOccurrenceRecommender):
         mock_content = MagicMock()
         mock_content.train.return_value = True
         MockContentRecommender.return_value = mock_content
@@ -64,6 +67,7 @@ class TestHybridRecommender(unittest.TestCase):
         
         mock_content.train.assert_called_once()
         mock_collab.train.assert_called_once()
+        MockCoOccurrenceRecommender.return_value.train.assert_called_once()
         self.assertTrue(result)
 
     def test_normalize_scores(self):
@@ -108,6 +112,53 @@ class TestHybridRecommender(unittest.TestCase):
         
         self.assertTrue(has_hybrid, "Should contain a hybrid recommendation for product P0003")
 
+    @patch('src.models.hybrid.get_user_activity')
+    def test_recommend_concurrent_fetches_activity_once(self, mock_get_activity):
+        activity = [{"user_id": self.user_id, "product_id": "P0010", "action_type": "VIEW"}]
+        mock_get_activity.return_value = activity
+        
+        self.recommender.content_recommender = MagicMock()
+        self.recommender.content_recommender.recommend.return_value = self.mock_content_recs
+        self.recommender.collaborative_recommender = MagicMock()
+        self.recommender.collaborative_recommender.recommend.return_value = self.mock_collab_recs
+        
+        sequential = self.recommender.recommend(self.user_id, top_k=5)
+        self.recommender.concurrent = True
+        concurrent = self.recommender.recommend(self.user_id, top_k=5)
+        
+        mock_get_activity.assert_called_once_with(user_id=self.user_id, fields=INTERACTION_FIELDS, sort=False)
+        self.recommender.content_recommender.recommend.assert_called_with(
+            self.user_id, top_k=10, user_activity=activity
+        )
+        self.assertEqual(concurrent, sequential)
+
+    @patch('src.models.hybrid.save_recommendations_bulk')
+    @patch('src.models.hybrid.get_product_details')
+    @patch('src.models.hybrid.get_users_activity')
+    def test_get_formatted_batch_recommendations(self, mock_get_users_activity, mock_get_details, mock_save_bulk):
+        user_ids = [self.user_id, "U0002"]
+        mock_get_users_activity.return_value = {user_id: [] for user_id in user_ids}
+        mock_get_details.return_value = self.mock_product_details
+        
+        self.recommender.content_recommender = MagicMock()
+        self.recommender.content_recommender.recommend_batch.return_value = {self.user_id: self.mock_content_recs}
+        self.recommender.collaborative_recommender = MagicMock()
+        self.recommender.collaborative_recommender.recommend_batch.return_value = {
+            self.user_id: self.mock_collab_recs, "U0002": self.mock_collab_recs[:2]
+        }
+        
+        results = self.recommender.get_formatted_batch_recommendations(user_ids, top_k=3)
+        
+        mock_get_users_activity.assert_called_once_with(user_ids, fields=INTERACTION_FIELDS, sort=False)
+        mock_get_details.assert_called_once()
+        self.assertEqual(mock_get_details.call_args.kwargs["fields"], PRODUCT_DISPLAY_FIELDS)
+        mock_save_bulk.assert_called_once()
+        self.assertEqual([r["user_id"] for r in results], user_ids)
+        self.assertEqual(len(results[0]["recommended_products"]), 3)
+        self.assertEqual(
+            [r["product_id"] for r in results[1]["recommended_products"]], ["P0003", "P0006"]
+        )
+
     @patch('src.models.hybrid.save_recommendations')
     def test_generate_recommendations(self, mock_save):
         self.recommender.recommend = MagicMock()
@@ -118,7 +169,7 @@ class TestHybridRecommender(unittest.TestCase):
         result = self.recommender.generate_recommendations(self.user_id, top_k=3)
         
         self.recommender.recommend.assert_called_once_with(self.user_id, top_k=3)
-        mock_save.assert_called_once()
+        mock_save.assert_called_once_with(self.user_id, self.mock_content_recs[:3], top_k=3)
         self.assertEqual(result, self.mock_content_recs[:3])
 
     @patch('src.models.hybrid.get_product_details')
@@ -140,6 +191,118 @@ class TestHybridRecommender(unittest.TestCase):
         self.assertEqual(first_rec["price"], 100)
         self.assertEqual(first_rec["reason"], "Content-based similarity")
 
+    def _stored_doc(self, age_seconds):
+        stored_at = datetime.now() - timedelta(seconds=age_seconds)
+        return {
+            "user_id": self.user_id,
+            "recommended_products": self.mock_content_recs,
+            "timestamp": stored_at.isoformat()
+        }
+
+    @patch('src.models.hybrid.get_last_activity_timestamp')
+    @patch('src.models.hybrid.get_recommendations')
+    def test_serve_stored_within_ttl(self, mock_get_recs, mock_last_activity):
+        mock_get_recs.return_value = self._stored_doc(age_seconds=10)
+        self.recommender.recommendation_ttl = 60
+        
+        result = self.recommender._get_fresh_stored_recommendations(self.user_id, top_k=3)
+        
+        self.assertEqual(result, self.mock_content_recs[:3])
+        mock_last_activity.assert_not_called()
+
+    @patch('src.models.hybrid.get_last_activity_timestamp')
+    @patch('src.models.hybrid.get_recommendations')
+    def test_serve_stored_after_ttl_checks_activity(self, mock_get_recs, mock_last_activity):
+        mock_get_recs.return_value = self._stored_doc(age_seconds=120)
+        self.recommender.recommendation_ttl = 60
+        
+        mock_last_activity.return_value = (datetime.now() - timedelta(seconds=300)).isoformat()
+        self.assertEqual(
+            self.recommender._get_fresh_stored_recommendations(self.user_id, top_k=3),
+            self.mock_content_recs[:3]
+        )
+        
+        mock_last_activity.return_value = (datetime.now() - timedelta(seconds=30)).isoformat()
+        self.assertIsNone(self.recommender._get_fresh_stored_recommendations(self.user_id, top_k=3))
+        
+        self.assertIsNone(self.recommender._get_fresh_stored_recommendations(self.user_id, top_k=10))
+
+    @patch('src.models.hybrid.get_last_activity_timestamp')
+    @patch('src.models.hybrid.get_recommendations')
+    def test_serve_stored_shorter_than_requested_top_k(self, mock_get_recs, mock_last_activity):
+        # Generated for top_k=10, but the user only had two candidates
+        stored = self._stored_doc(age_seconds=10)
+        stored["recommended_products"] = self.mock_content_recs[:2]
+        stored["top_k"] = 10
+        mock_get_recs.return_value = stored
+        self.recommender.recommendation_ttl = 60
+        
+        for top_k in (3, 10):
+            self.assertEqual(
+                self.recommender._get_fresh_stored_recommendations(self.user_id, top_k=top_k),
+                self.mock_content_recs[:2]
+            )
+        self.assertIsNone(self.recommender._get_fresh_stored_recommendations(self.user_id, top_k=20))
+
+    @patch('src.models.hybrid.get_product_details')
+    @patch('src.models.hybrid.get_recommendations')
+    def test_get_formatted_recommendations_read_through(self, mock_get_recs, mock_get_details):
+        mock_get_recs.return_value = self._stored_doc(age_seconds=1)
+        mock_get_details.return_value = self.mock_product_details
+        self.recommender.serve_stored = True
+        self.recommender.generate_recommendations = MagicMock()
+        
+        result = self.recommender.get_formatted_recommendations(self.user_id, top_k=3)
+        
+        self.recommender.generate_recommendations.assert_not_called()
+        self.assertEqual(len(result["recommended_products"]), 3)
+
+    def test_get_formatted_recommendations_cached_until_invalidated(self):
+        self.recommender._build_formatted_recommendations = MagicMock(return_value={
+            "user_id": self.user_id, "recommended_products": [{"product_id": "P0001"}]
+        })
+        
+        self.recommender.get_formatted_recommendations(self.user_id, top_k=3)
+        self.recommender.get_formatted_recommendations(self.user_id, top_k=3)
+        self.assertEqual(self.recommender._build_formatted_recommendations.call_count, 1)
+        
+        self.recommender.invalidate_user(self.user_id)
+        self.recommender.get_formatted_recommendations(self.user_id, top_k=3)
+        self.assertEqual(self.recommender._build_formatted_recommendations.call_count, 2)
+
+    def test_results_invalidated_while_computing_are_not_cached(self):
+        def build(user_id, top_k):
+            # New activity for the user arrives while the result is computed
+            self.recommender.invalidate_user(user_id)
+            return {"user_id": user_id, "recommended_products": [{"product_id": "P0001"}]}
+        
+        self.recommender._build_formatted_recommendations = MagicMock(side_effect=build)
+        self.recommender.get_formatted_recommendations(self.user_id, top_k=3)
+        
+        self.assertIsNone(self.recommender.cache.get(self.user_id, 3))
+
+    def test_empty_results_are_not_cached(self):
+        self.recommender._build_formatted_recommendations = MagicMock(return_value={
+            "user_id": self.user_id, "recommended_products": []
+        })
+        
+        self.recommender.get_formatted_recommendations(self.user_id, top_k=3)
+        self.recommender.get_formatted_recommendations(self.user_id, top_k=3)
+        self.assertEqual(self.recommender._build_formatted_recommendations.call_count, 2)
+
+    def test_record_activity_fold_in_can_be_disabled(self):
+        activity = {"user_id": self.user_id, "product_id": "P0001", "action_type": "VIEW"}
+        
+        for enabled in (True, False):
+            recommender = HybridRecommender(use_cache=False, fold_in_activity=enabled)
+            recommender.collaborative_recommender = MagicMock()
+            recommender.cooccurrence_recommender = MagicMock()
+            
+            recommender.record_activity(activity)
+            
+            self.assertEqual(recommender.collaborative_recommender.fold_in_activity.called, enabled)
+            recommender.cooccurrence_recommender.record_activity.assert_called_once_with(activity)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,116 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import storage
+from src.database.backends import InMemoryBackend
+from src.models.hybrid import HybridRecommender
+from src.models.interaction_store import InteractionStore
+
+
+def _activity(user_id, product_id, action_type="VIEW"):
+    return {"user_id": user_id, "product_id": product_id, "action_type": action_type,
+            "timestamp": "2025-01-01T00:00:00"}
+
+
+class TestInteractionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.backend.insert_products([
+            {"product_id": f"P{i:04d}", "product_name": f"Product {i}", "category": category,
+             "brand": "BrandA", "price": 10.0 * i, "description": f"{category} item number {i}"}
+            for i, category in enumerate(["Electronics", "Clothing", "Electronics", "Books", "Clothing", "Books"])
+        ])
+        self.backend.insert_activities([
+            _activity("U0001", "P0000"), _activity("U0001", "P0000"), _activity("U0001", "P0001", "BUY"),
+            _activity("U0001", "P0000", "BUY"),
+            _activity("U0002", "P0001"), _activity("U0002", "P0002", "BUY"), _activity("U0002", "P0003"),
+            _activity("U0003", "P0002"), _activity("U0003", "P0004"), _activity("U0003", "P0005", "BUY")
+        ])
+        self.previous = storage.set_backend(self.backend)
+        
+        self.store = InteractionStore()
+
+    def tearDown(self):
+        storage.set_backend(self.previous)
+
+    def test_load_deduplicates_and_weights(self):
+        self.assertTrue(self.store.load())
+        
+        self.assertEqual(self.store.product_weights("U0001", 3.0, 1.0), {"P0000": 5.0, "P0001": 3.0})
+        self.assertEqual(self.store.product_weights("U0001", 5.0, 1.0), {"P0000": 7.0, "P0001": 5.0})
+        self.assertEqual(sorted(self.store.seen_products("U0003")), ["P0002", "P0004", "P0005"])
+        self.assertEqual(self.store.product_weights("U9999", 3.0, 1.0), {})
+        self.assertEqual(self.store.stats()["loaded_pairs"], 8)
+
+    def test_record_activity(self):
+        self.assertFalse(self.store.record_activity(_activity("U0001", "P0002")))
+        self.store.load()
+        
+        self.store.record_activity(_activity("U0001", "P0002"))
+        self.store.record_activity(_activity("U0001", "P0000", "BUY"))
+        self.store.record_activity(_activity("U0009", "P0099", "BUY"))
+        
+        self.assertEqual(self.store.product_weights("U0001", 3.0, 1.0), {"P0000": 8.0, "P0001": 3.0, "P0002": 1.0})
+        self.assertEqual(self.store.product_weights("U0009", 3.0, 1.0), {"P0099": 3.0})
+        # Rows of other users are untouched
+        self.assertEqual(self.store.product_weights("U0002", 3.0, 1.0), {"P0001": 1.0, "P0002": 3.0, "P0003": 1.0})
+        
+        stats = self.store.stats()
+        self.assertEqual(stats["users"], 4)
+        self.assertEqual(stats["updated_users"], 2)
+        self.assertEqual(stats["applied_activities"], 3)
+
+    def test_empty_storage(self):
+        storage.set_backend(InMemoryBackend())
+        self.assertFalse(self.store.load())
+        self.assertTrue(self.store.is_loaded)
+        self.assertEqual(self.store.product_weights("U0001", 3.0, 1.0), {})
+
+    def _assert_same_recommendations(self, actual, expected):
+        self.assertEqual([r["product_id"] for r in actual], [r["product_id"] for r in expected])
+        for a, e in zip(actual, expected):
+            self.assertAlmostEqual(a["score"], e["score"], places=6)
+
+    def test_recommenders_read_the_store_instead_of_the_database(self):
+        self.store.load()
+        recommender = HybridRecommender(use_cache=False, interaction_store=InteractionStore())
+        self.assertTrue(recommender.train())
+        
+        expected = recommender.recommend("U0002", top_k=3)
+        expected_batch = recommender.recommend_batch(["U0001", "U0002", "U9999"], top_k=3)
+        
+        # Same trained models, now reading interactions from the loaded store
+        for model in (recommender, recommender.content_recommender, recommender.collaborative_recommender,
+                      recommender.cooccurrence_recommender):
+            model.interaction_store = self.store
+        
+        with patch.object(self.backend, "get_user_activity", side_effect=AssertionError("queried")), \
+                patch.object(self.backend, "get_users_activity", side_effect=AssertionError("queried")):
+            self._assert_same_recommendations(recommender.recommend("U0002", top_k=3), expected)
+            batch = recommender.recommend_batch(["U0001", "U0002", "U9999"], top_k=3)
+        
+        self.assertEqual(set(batch), set(expected_batch))
+        for user_id, recommendations in batch.items():
+            self._assert_same_recommendations(recommendations, expected_batch[user_id])
+
+    def test_new_activity_is_masked_without_retraining(self):
+        self.store.load()
+        recommender = HybridRecommender(use_cache=False, interaction_store=self.store)
+        recommender.train()
+        collab = recommender.collaborative_recommender
+        
+        recommended = [r["product_id"] for r in collab.recommend("U0001", top_k=4)]
+        self.assertIn("P0002", recommended)
+        
+        self.store.record_activity(_activity("U0001", "P0002"))
+        recommended = [r["product_id"] for r in collab.recommend("U0001", top_k=4)]
+        self.assertNotIn("P0002", recommended)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import os
+import sys
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import mongo_handler
+from src.database.mongo_handler import (
+    insert_products, product_content_hash, get_user_activity, get_product_details, iter_activity_batches
+)
+
+
+class TestInsertProducts(unittest.TestCase):
+
+    def setUp(self):
+        self.products = [
+            {"product_id": f"P{i:03d}", "category": "Books", "price": float(i)}
+            for i in range(5)
+        ]
+        self.collection = MagicMock()
+        self.collection.find.return_value = []
+        db = MagicMock()
+        db.__getitem__.return_value = self.collection
+        
+        patcher = patch.object(mongo_handler, "db", db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_upserts_in_unordered_chunks(self):
+        self.assertTrue(insert_products(self.products, chunk_size=2))
+        
+        batches = self.collection.bulk_write.call_args_list
+        self.assertEqual([len(call.args[0]) for call in batches], [2, 2, 1])
+        self.assertTrue(all(call.kwargs["ordered"] is False for call in batches))
+        
+        operation = batches[0].args[0][0]
+        self.assertEqual(operation._filter, {"product_id": "P000"})
+        self.assertEqual(operation._doc["$set"]["content_hash"], product_content_hash(self.products[0]))
+        self.assertNotIn("content_hash", self.products[0])
+
+    def test_unchanged_products_are_skipped(self):
+        changed = dict(self.products[1], price=99.0)
+        self.collection.find.return_value = [
+            {"product_id": p["product_id"], "content_hash": product_content_hash(p)} for p in self.products
+        ]
+        
+        insert_products(self.products[:1] + [changed] + self.products[2:])
+        
+        operations = self.collection.bulk_write.call_args.args[0]
+        self.assertEqual([op._filter["product_id"] for op in operations], ["P001"])
+
+    def test_nothing_written_when_catalog_unchanged(self):
+        self.collection.find.return_value = [
+            {"product_id": p["product_id"], "content_hash": product_content_hash(p)} for p in self.products
+        ]
+        
+        self.assertTrue(insert_products(self.products))
+        self.collection.bulk_write.assert_not_called()
+
+    def test_hash_ignores_mongo_id(self):
+        self.assertEqual(
+            product_content_hash(self.products[0]),
+            product_content_hash(dict(self.products[0], _id="abc", content_hash="stale"))
+        )
+
+
+class TestProjectedQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.collection = MagicMock()
+        db = MagicMock()
+        db.__getitem__.return_value = self.collection
+        
+        patcher = patch.object(mongo_handler, "db", db)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_full_documents_sorted_by_default(self):
+        get_user_activity(user_id="U0001")
+        
+        self.collection.find.assert_called_once_with({"user_id": "U0001"}, projection=None)
+        self.collection.find.return_value.sort.assert_called_once_with("timestamp", -1)
+
+    def test_fields_and_unsorted(self):
+        self.collection.find.return_value = [{"product_id": "P0001", "action_type": "VIEW"}]
+        
+        activities = get_user_activity(user_id="U0001", fields=["product_id", "action_type"], sort=False)
+        
+        self.collection.find.assert_called_once_with(
+            {"user_id": "U0001"}, projection={"_id": 0, "product_id": 1, "action_type": 1}
+        )
+        self.assertEqual(activities, [{"product_id": "P0001", "action_type": "VIEW"}])
+
+    def test_product_details_always_project_product_id(self):
+        self.collection.find.return_value = [{"product_id": "P0001", "category": "Books"}]
+        
+        details = get_product_details(["P0001"], fields=["category"])
+        
+        self.assertEqual(
+            self.collection.find.call_args.kwargs["projection"], {"_id": 0, "product_id": 1, "category": 1}
+        )
+        self.assertEqual(details, {"P0001": {"product_id": "P0001", "category": "Books"}})
+
+    def test_activity_batches_stream_oldest_first(self):
+        self.collection.find.return_value.sort.return_value = iter([{"product_id": f"P{i}"} for i in range(5)])
+        
+        batches = list(iter_activity_batches(fields=["product_id"], batch_size=2))
+        
+        self.collection.find.assert_called_once_with({}, projection={"_id": 0, "product_id": 1}, batch_size=2)
+        self.collection.find.return_value.sort.assert_called_once_with("timestamp", 1)
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import unittest
+import os
+import sys
+import json
+import random
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.als import ImplicitALSRecommender
+from src.models.collaborative import CollaborativeFilteringRecommender
+from src.models.content_based import ContentBasedRecommender
+from src.models.hybrid import HybridRecommender
+from src.models.persistence import read_manifest, MANIFEST_FILE
+
+
+class TestModelPersistence(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        rng = random.Random(7)
+        
+        self.products = [
+            {
+                "product_id": f"P{i:04d}",
+                "category": rng.choice(["Electronics", "Clothing", "Home"]),
+                "brand": rng.choice(["BrandA", "BrandB", "BrandC"]),
+                "price": rng.uniform(10, 1000),
+                "description": f"Product number {i} with {rng.choice(['red', 'blue', 'green'])} finish."
+            }
+            for i in range(60)
+        ]
+        
+        self.activities = []
+        for u in range(15):
+            for product in rng.sample(self.products, 6):
+                self.activities.append({
+                    "user_id": f"U{u:04d}",
+                    "product_id": product["product_id"],
+                    "action_type": "BUY" if rng.random() < 0.3 else "VIEW"
+                })
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def _train_collaborative(self, recommender):
+        user_index, product_index = {}, {}
+        rows, cols, data = [], [], []
+        for activity in self.activities:
+            rows.append(user_index.setdefault(activity["user_id"], len(user_index)))
+            cols.append(product_index.setdefault(activity["product_id"], len(product_index)))
+            data.append(5.0 if activity["action_type"] == "BUY" else 1.0)
+        
+        with patch('src.models.collaborative.load_interaction_arrays') as mock_load:
+            mock_load.return_value = (
+                list(user_index), list(product_index), np.array(rows), np.array(cols), np.array(data)
+            )
+            self.assertTrue(recommender.train())
+        return recommender
+
+    def test_collaborative_round_trip_is_memory_mapped(self):
+        for model_cls in (CollaborativeFilteringRecommender, ImplicitALSRecommender):
+            path = os.path.join(self.tmp_dir, model_cls.__name__)
+            original = self._train_collaborative(model_cls(num_factors=4))
+            
+            self.assertTrue(original.save(path))
+            loaded = model_cls.load(path)
+            
+            self.assertIsInstance(loaded.item_factors, np.memmap)
+            self.assertEqual(loaded.user_id_to_index, original.user_id_to_index)
+            self.assertEqual(loaded.recommend("U0003", top_k=5), original.recommend("U0003", top_k=5))
+
+    @patch('src.models.content_based.get_all_products')
+    def test_content_round_trip(self, mock_get_all_products):
+        mock_get_all_products.return_value = self.products
+        original = ContentBasedRecommender(retrieval="neighbors", num_neighbors=5)
+        original.train()
+        path = os.path.join(self.tmp_dir, "content")
+        history = [a for a in self.activities if a["user_id"] == "U0001"]
+        
+        self.assertTrue(original.save(path))
+        loaded = ContentBasedRecommender.load(path)
+        
+        self.assertIsInstance(loaded.neighbor_indices, np.memmap)
+        self.assertEqual(loaded.tfidf_vectorizer.vocabulary_, original.tfidf_vectorizer.vocabulary_)
+        self.assertEqual(
+            loaded.recommend("U0001", top_k=5, user_activity=history),
+            original.recommend("U0001", top_k=5, user_activity=history)
+        )
+
+    def test_unsupported_format_version(self):
+        path = os.path.join(self.tmp_dir, "collab")
+        self._train_collaborative(CollaborativeFilteringRecommender(num_factors=4)).save(path)
+        
+        with open(os.path.join(path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        manifest["format_version"] = 999
+        with open(os.path.join(path, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+        
+        with self.assertRaises(ValueError):
+            read_manifest(path)
+
+    @patch('src.models.content_based.get_all_products')
+    def test_hybrid_snapshot(self, mock_get_all_products):
+        mock_get_all_products.return_value = self.products
+        hybrid = HybridRecommender(use_cache=False)
+        hybrid.content_recommender.train()
+        self._train_collaborative(hybrid.collaborative_recommender)
+        
+        self.assertFalse(HybridRecommender.snapshot_exists(self.tmp_dir))
+        self.assertTrue(hybrid.save(self.tmp_dir))
+        self.assertTrue(HybridRecommender.snapshot_exists(self.tmp_dir))
+        
+        loaded = HybridRecommender.load(self.tmp_dir)
+        self.assertTrue(loaded.content_recommender.is_trained)
+        self.assertTrue(loaded.collaborative_recommender.is_trained)
+
+
+if __name__ == '__main__':
+    unittest.main()
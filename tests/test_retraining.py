@@ -0,0 +1,106 @@
+import unittest
+import os
+import sys
+import threading
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models.retraining import RetrainingScheduler
+
+
+class TestRetrainingScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.swapped = []
+        self.model = MagicMock()
+        self.model.train.return_value = True
+        self.scheduler = RetrainingScheduler(
+            lambda: self.model, self.swapped.append,
+            interval_seconds=0, activity_threshold=3, poll_seconds=0.01
+        )
+
+    def test_retrain_now_swaps_trained_model(self):
+        self.scheduler.record_activity({"user_id": "U0001"})
+        
+        self.assertTrue(self.scheduler.retrain_now())
+        
+        self.assertEqual(self.swapped, [self.model])
+        status = self.scheduler.status()
+        self.assertEqual(status["trainings_completed"], 1)
+        self.assertEqual(status["pending_activities"], 0)
+        self.assertIsNotNone(status["last_training_duration_seconds"])
+        self.assertGreaterEqual(status["model_age_seconds"], 0)
+
+    def test_failed_training_keeps_current_model(self):
+        self.model.train.return_value = False
+        
+        self.assertFalse(self.scheduler.retrain_now())
+        
+        self.assertEqual(self.swapped, [])
+        self.assertEqual(self.scheduler.status()["trainings_failed"], 1)
+
+    def test_failures_back_off(self):
+        self.model.train.return_value = False
+        self.scheduler.retry_seconds = 60
+        for _ in range(3):
+            self.scheduler.record_activity({"user_id": "U0001"})
+        
+        self.assertTrue(self.scheduler._is_due())
+        self.scheduler.retrain_now()
+        self.assertFalse(self.scheduler._is_due())
+        self.assertAlmostEqual(self.scheduler.status()["next_retry_in_seconds"], 60, delta=1)
+        
+        # Each consecutive failure doubles the wait
+        self.scheduler._retry_at = 0
+        self.scheduler.retrain_now()
+        self.assertAlmostEqual(self.scheduler.status()["next_retry_in_seconds"], 120, delta=1)
+        
+        self.model.train.return_value = True
+        self.scheduler._retry_at = 0
+        self.assertTrue(self.scheduler._is_due())
+        self.scheduler.retrain_now()
+        status = self.scheduler.status()
+        self.assertEqual(status["consecutive_failures"], 0)
+        self.assertIsNone(status["next_retry_in_seconds"])
+
+    def test_interval_counts_from_start_without_training(self):
+        self.scheduler.activity_threshold = 0
+        self.scheduler.interval_seconds = 3600
+        self.assertFalse(self.scheduler._is_due())
+        
+        self.scheduler.start()
+        self.scheduler.stop(timeout=2)
+        self.assertFalse(self.scheduler._is_due())
+        
+        self.scheduler._started_at -= 3600
+        self.assertTrue(self.scheduler._is_due())
+
+    def test_activity_threshold_triggers_background_retrain(self):
+        swapped = threading.Event()
+        self.scheduler.on_swap = lambda model: swapped.set()
+        self.scheduler.start()
+        
+        try:
+            for _ in range(3):
+                self.scheduler.record_activity({"user_id": "U0001"})
+            self.assertTrue(swapped.wait(timeout=2))
+        finally:
+            self.scheduler.stop(timeout=2)
+        
+        self.assertFalse(self.scheduler.status()["running"])
+
+    def test_drift_check_triggers_retrain(self):
+        self.scheduler.activity_threshold = 0
+        self.scheduler.drift_check_seconds = 0
+        self.scheduler.drift_check = MagicMock(return_value=False)
+        
+        self.assertFalse(self.scheduler._is_due())
+        
+        self.scheduler.drift_check.return_value = True
+        self.assertTrue(self.scheduler._is_due())
+        self.assertEqual(self.scheduler.status()["drift_retrains"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.models import snapshots
+from src.models.snapshots import (
+    SnapshotWatcher, RetrainLeader, current_snapshot, publish_snapshot, SNAPSHOTS_DIR
+)
+
+
+class FakeRecommender:
+
+    def __init__(self, name):
+        self.name = name
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "name.txt"), "w") as f:
+            f.write(self.name)
+        return True
+
+
+def load_fake(path):
+    with open(os.path.join(path, "name.txt")) as f:
+        return FakeRecommender(f.read())
+
+
+class TestModelSnapshots(unittest.TestCase):
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.model_dir)
+
+    def test_publish_points_current_at_new_version(self):
+        self.assertEqual(current_snapshot(self.model_dir), (None, None))
+        
+        version = publish_snapshot(self.model_dir, FakeRecommender("first"))
+        
+        current, path = current_snapshot(self.model_dir)
+        self.assertEqual(current, version)
+        self.assertEqual(load_fake(path).name, "first")
+
+    def test_old_versions_are_pruned(self):
+        versions = [publish_snapshot(self.model_dir, FakeRecommender(str(i)), keep=2) for i in range(4)]
+        
+        remaining = sorted(os.listdir(os.path.join(self.model_dir, SNAPSHOTS_DIR)))
+        self.assertEqual(remaining, versions[-2:])
+        self.assertEqual(current_snapshot(self.model_dir)[0], versions[-1])
+
+    def test_watcher_swaps_to_published_snapshot_once(self):
+        swapped = []
+        watcher = SnapshotWatcher(self.model_dir, swapped.append, loader=load_fake)
+        
+        self.assertFalse(watcher.check_now())
+        
+        version = publish_snapshot(self.model_dir, FakeRecommender("retrained"))
+        self.assertTrue(watcher.check_now())
+        self.assertFalse(watcher.check_now())
+        
+        self.assertEqual([r.name for r in swapped], ["retrained"])
+        self.assertEqual(watcher.status()["version"], version)
+        self.assertEqual(watcher.status()["reloads"], 1)
+
+    def test_watcher_skips_version_it_published(self):
+        swapped = []
+        watcher = SnapshotWatcher(self.model_dir, swapped.append, loader=load_fake)
+        
+        watcher.mark_loaded(publish_snapshot(self.model_dir, FakeRecommender("own")))
+        
+        self.assertFalse(watcher.check_now())
+        self.assertEqual(swapped, [])
+
+    def test_failed_load_keeps_current_model(self):
+        swapped = []
+        watcher = SnapshotWatcher(self.model_dir, swapped.append, loader=FakeRecommender.__init__)
+        publish_snapshot(self.model_dir, FakeRecommender("broken"))
+        
+        self.assertFalse(watcher.check_now())
+        
+        self.assertEqual(swapped, [])
+        self.assertEqual(watcher.status()["reload_failures"], 1)
+
+    @unittest.skipIf(snapshots.fcntl is None, "file locks not available")
+    def test_single_retrain_leader(self):
+        first, second = RetrainLeader(self.model_dir), RetrainLeader(self.model_dir)
+        
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        
+        first.release()
+        self.assertTrue(second.acquire())
+        second.release()
+
+    @unittest.skipIf(snapshots.fcntl is None, "file locks not available")
+    def test_follower_takes_over_retraining(self):
+        leader, follower = RetrainLeader(self.model_dir), RetrainLeader(self.model_dir)
+        took_over = []
+        watcher = SnapshotWatcher(self.model_dir, [].append, loader=load_fake,
+                                  leader=follower, on_leader=lambda: took_over.append(True))
+        
+        self.assertTrue(leader.acquire())
+        self.assertFalse(watcher.check_leader())
+        
+        leader.release()
+        self.assertTrue(watcher.check_leader())
+        self.assertFalse(watcher.check_leader())
+        self.assertEqual(took_over, [True])
+        follower.release()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import unittest
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.database import storage
+from src.database.backends import InMemoryBackend, MongoBackend, StorageBackend
+from src.models.hybrid import HybridRecommender
+
+
+class TestInMemoryBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = InMemoryBackend()
+        self.backend.insert_products([
+            {"product_id": "P0001", "product_name": "Phone", "category": "Electronics", "brand": "BrandA",
+             "price": 500.0, "description": "Smartphone with a great camera"},
+            {"product_id": "P0002", "product_name": "Shirt", "category": "Clothing", "brand": "BrandB",
+             "price": 20.0, "description": "Cotton shirt"},
+            {"product_id": "P0003", "product_name": "Laptop", "category": "Electronics", "brand": "BrandA",
+             "price": 900.0, "description": "Laptop with a great screen"}
+        ])
+        self.backend.insert_activities([
+            {"user_id": "U0001", "product_id": "P0001", "action_type": "VIEW", "timestamp": "2025-01-02T00:00:00"},
+            {"user_id": "U0001", "product_id": "P0002", "action_type": "BUY", "timestamp": "2025-01-01T00:00:00"},
+            {"user_id": "U0002", "product_id": "P0002", "action_type": "VIEW", "timestamp": "2025-01-03T00:00:00"}
+        ])
+        self.previous = storage.set_backend(self.backend)
+
+    def tearDown(self):
+        storage.set_backend(self.previous)
+
+    def test_user_activity_is_newest_first(self):
+        activities = storage.get_user_activity(user_id="U0001")
+        
+        self.assertEqual([a["product_id"] for a in activities], ["P0001", "P0002"])
+        self.assertEqual(len(storage.get_user_activity(user_id="U0001", limit=1)), 1)
+        self.assertEqual(storage.get_user_activity(user_id="U9999"), [])
+        self.assertEqual(storage.get_last_activity_timestamp("U0001"), "2025-01-02T00:00:00")
+
+    def test_projection_and_unsorted_reads(self):
+        activities = storage.get_user_activity(user_id="U0001", fields=storage.INTERACTION_FIELDS, sort=False)
+        
+        self.assertEqual(
+            sorted(activities, key=lambda a: a["product_id"]),
+            [{"product_id": "P0001", "action_type": "VIEW"}, {"product_id": "P0002", "action_type": "BUY"}]
+        )
+        by_user = storage.get_users_activity(["U0002"], fields=["product_id"], sort=False)
+        self.assertEqual(by_user["U0002"], [{"user_id": "U0002", "product_id": "P0002"}])
+        self.assertEqual(
+            storage.get_product_details(["P0002"], fields=["price"]),
+            {"P0002": {"product_id": "P0002", "price": 20.0}}
+        )
+        self.assertEqual(set(storage.get_all_products(fields=["product_id"])[0]), {"product_id"})
+
+    def test_activity_batches_are_oldest_first(self):
+        batches = list(storage.iter_activity_batches(fields=("product_id",), batch_size=2))
+        
+        self.assertEqual(batches, [[{"product_id": "P0002"}, {"product_id": "P0001"}], [{"product_id": "P0002"}]])
+
+    def test_out_of_order_insert_stays_sorted(self):
+        storage.insert_activity({"user_id": "U0001", "product_id": "P0003", "action_type": "VIEW",
+                                 "timestamp": "2025-01-01T12:00:00"})
+        
+        activities = storage.get_users_activity(["U0001", "U0003"])
+        
+        self.assertEqual([a["product_id"] for a in activities["U0001"]], ["P0001", "P0003", "P0002"])
+        self.assertEqual(activities["U0003"], [])
+
+    def test_reads_return_copies(self):
+        storage.get_user_activity(user_id="U0001")[0]["product_id"] = "changed"
+        storage.get_product_details(["P0001"])["P0001"]["price"] = 0
+        
+        self.assertEqual(storage.get_user_activity(user_id="U0001")[0]["product_id"], "P0001")
+        self.assertEqual(storage.get_product_details(["P0001"])["P0001"]["price"], 500.0)
+
+    def test_products_are_upserted(self):
+        storage.insert_products([{"product_id": "P0001", "price": 450.0}])
+        
+        product = storage.get_product_details(["P0001", "P9999"])
+        self.assertEqual(list(product), ["P0001"])
+        self.assertEqual(product["P0001"]["price"], 450.0)
+        self.assertEqual(product["P0001"]["product_name"], "Phone")
+        self.assertEqual(len(storage.get_all_products()), 3)
+
+    def test_interaction_arrays_in_first_seen_order(self):
+        user_ids, product_ids, rows, cols, data = storage.load_interaction_arrays({"BUY": 5.0, "VIEW": 1.0})
+        
+        self.assertEqual(user_ids, ["U0001", "U0002"])
+        self.assertEqual(product_ids, ["P0001", "P0002"])
+        np.testing.assert_array_equal(rows, [0, 0, 1])
+        np.testing.assert_array_equal(cols, [0, 1, 1])
+        np.testing.assert_array_equal(data, [1.0, 5.0, 1.0])
+
+    def test_recommendations_round_trip(self):
+        self.assertFalse(storage.save_recommendations("U0001", []))
+        storage.save_recommendations_bulk({"U0001": [{"product_id": "P0003"}], "U0002": []})
+        
+        self.assertEqual(storage.get_recommendations("U0001")["recommended_products"], [{"product_id": "P0003"}])
+        self.assertIsNone(storage.get_recommendations("U0002"))
+        self.assertEqual(storage.get_recommendation_user_ids(), ["U0001"])
+        self.assertNotIn("top_k", storage.get_recommendations("U0001"))
+        
+        storage.save_recommendations("U0001", [{"product_id": "P0004"}], top_k=5)
+        self.assertEqual(storage.get_recommendations("U0001")["top_k"], 5)
+
+    def test_hybrid_pipeline_runs_without_a_database(self):
+        recommender = HybridRecommender(use_cache=False)
+        self.assertTrue(recommender.train())
+        
+        result = recommender.get_formatted_recommendations("U0001", top_k=2)
+        
+        self.assertEqual(result["user_id"], "U0001")
+        self.assertNotIn("P0001", [r["product_id"] for r in result["recommended_products"]])
+
+
+class TestBackendSelection(unittest.TestCase):
+
+    def test_known_backends(self):
+        self.assertIsInstance(storage.create_backend("memory"), InMemoryBackend)
+        self.assertIsInstance(storage.create_backend("mongo"), MongoBackend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            storage.create_backend("sqlite")
+
+    def test_incomplete_backend_fails_on_creation(self):
+        class ReadOnlyBackend(StorageBackend):
+            def get_user_activity(self, user_id=None, limit=None, fields=None, sort=True):
+                return []
+        
+        with self.assertRaises(TypeError):
+            ReadOnlyBackend()
+
+
+if __name__ == '__main__':
+    unittest.main()
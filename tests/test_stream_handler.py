@@ -0,0 +1,122 @@
+import unittest
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.ingestion.stream_handler import StreamingService
+
+
+def _activities(offsets):
+    start = datetime(2024, 1, 1)
+    return [
+        {"user_id": f"U{i:04d}", "product_id": "P0001", "action_type": "VIEW",
+         "timestamp": (start + timedelta(seconds=offset)).isoformat()}
+        for i, offset in enumerate(offsets)
+    ]
+
+
+@patch('src.ingestion.stream_handler.publish_activity')
+@patch('src.ingestion.stream_handler.insert_activity')
+@patch('src.ingestion.stream_handler.insert_activities')
+class TestBatchedReplay(unittest.TestCase):
+
+    def _service(self, offsets, **kwargs):
+        service = StreamingService(load_mode="memory", **kwargs)
+        service.activities = _activities(offsets)
+        service.streaming = True
+        return service
+
+    def test_as_fast_as_possible(self, mock_insert_activities, mock_insert_activity, mock_publish):
+        service = self._service(range(7), batch_max_events=3)
+        service._stream_activities(speed_factor=0)
+        
+        sizes = [len(call.args[0]) for call in mock_insert_activities.call_args_list]
+        self.assertEqual(sizes, [3, 3, 1])
+        for call in mock_insert_activities.call_args_list:
+            self.assertEqual(call.kwargs, {"ordered": False})
+            self.assertIn("ingestion_timestamp", call.args[0][0])
+        mock_insert_activity.assert_not_called()
+        self.assertEqual(mock_publish.call_count, 7)
+        
+        stats = service.replay_stats()
+        self.assertEqual(stats["replay_mode"], "batched")
+        self.assertEqual(stats["events"], 7)
+        self.assertEqual(stats["batches"], 3)
+        self.assertIsNone(stats["lag_seconds"])
+        self.assertGreater(stats["events_per_second"], 0)
+        self.assertFalse(stats["streaming"])
+
+    def test_paced_buckets(self, mock_insert_activities, mock_insert_activity, mock_publish):
+        # At 100x, activities are due at 0, 10, 20, 100 and 110 ms: two 50 ms buckets
+        service = self._service([0, 1, 2, 10, 11], batch_window=0.05)
+        
+        start = datetime.now()
+        service._stream_activities(speed_factor=100, replay_mode="batched")
+        elapsed = (datetime.now() - start).total_seconds()
+        
+        sizes = [len(call.args[0]) for call in mock_insert_activities.call_args_list]
+        self.assertEqual(sizes, [3, 2])
+        self.assertGreaterEqual(elapsed, 0.1)
+        
+        stats = service.replay_stats()
+        self.assertEqual(stats["events"], 5)
+        self.assertIsNotNone(stats["lag_seconds"])
+        self.assertEqual(stats["simulated_timestamp"], "2024-01-01T00:00:11")
+
+    def test_event_mode_tracks_lag(self, mock_insert_activities, mock_insert_activity, mock_publish):
+        service = self._service([0, 1, 2])
+        service._stream_activities(speed_factor=1000, replay_mode="event")
+        
+        self.assertEqual(mock_insert_activity.call_count, 3)
+        mock_insert_activities.assert_not_called()
+        stats = service.replay_stats()
+        self.assertEqual(stats["events"], 3)
+        self.assertEqual(stats["batches"], 3)
+        self.assertIsNotNone(stats["max_lag_seconds"])
+
+    def test_event_mode_publishes_only_written_activities(self, mock_insert_activities, mock_insert_activity,
+                                                          mock_publish):
+        mock_insert_activity.side_effect = [True, False, True]
+        service = self._service([0, 1, 2])
+        service._stream_activities(speed_factor=1000, replay_mode="event")
+        
+        published = [call.args[0]["user_id"] for call in mock_publish.call_args_list]
+        self.assertEqual(published, ["U0000", "U0002"])
+        stats = service.replay_stats()
+        self.assertEqual(stats["events"], 2)
+        self.assertEqual(stats["dropped_events"], 1)
+
+    def test_batched_mode_publishes_only_written_batches(self, mock_insert_activities, mock_insert_activity,
+                                                         mock_publish):
+        mock_insert_activities.side_effect = [True, Exception("write failed"), True]
+        service = self._service(range(7), batch_max_events=3)
+        service._stream_activities(speed_factor=0)
+        
+        self.assertEqual(mock_publish.call_count, 4)
+        stats = service.replay_stats()
+        self.assertEqual(stats["events"], 4)
+        self.assertEqual(stats["dropped_events"], 3)
+
+    def test_event_mode_leaves_publishing_to_a_running_writer(self, mock_insert_activities, mock_insert_activity,
+                                                              mock_publish):
+        writer = MagicMock(is_running=True)
+        writer.submit.side_effect = [True, False, True]
+        service = self._service([0, 1, 2], activity_writer=writer)
+        service._stream_activities(speed_factor=1000, replay_mode="event")
+        
+        self.assertEqual(writer.submit.call_count, 3)
+        mock_insert_activity.assert_not_called()
+        mock_publish.assert_not_called()
+        stats = service.replay_stats()
+        self.assertEqual((stats["events"], stats["dropped_events"]), (2, 1))
+
+    def test_unknown_replay_mode(self, mock_insert_activities, mock_insert_activity, mock_publish):
+        service = StreamingService()
+        self.assertFalse(service.start_streaming(replay_mode="bogus"))
+
+
+if __name__ == '__main__':
+    unittest.main()